@@ -0,0 +1,23 @@
+import streamlit as st
+
+from app_data import start_preload
+
+# ---- MULTIPAGE APP SHELL ----
+# Run with: streamlit run app.py
+# Pages share app_data/dtr_data, so workbooks are parsed once per server process;
+# Plotly and the Excel readers are only imported by the code paths that need them.
+st.set_page_config(page_title="DTR Outage KPIs Dashboard", layout="wide")
+start_preload()
+
+pages = [
+    st.Page("app_pages/kpis.py", title="DTR KPIs", icon="⚡", default=True),
+    st.Page("app_pages/ranking.py", title="Worst DTRs", icon="🏁"),
+    st.Page("app_pages/master_diff.py", title="Master Diff", icon="🧾"),
+]
+st.navigation(pages).run()
+
+st.markdown("""
+    <div style='text-align:center;margin-top:24px;font-size:17px;color:#7f8c8d;'>
+        🚀 <b>Power Analytics Dashboard</b> | <i>Esyasoft</i>
+    </div>
+""", unsafe_allow_html=True)
@@ -0,0 +1,96 @@
+import hashlib
+import os
+import tempfile
+import threading
+
+import streamlit as st
+
+from data_quality import dtr_issues, quality_report
+from dtr_data import cached, cached_consumption, cached_dtr_lists, dtr_info, dtr_version, feeder_to_dtrs
+from population_cube import cached_cube
+from reconciliation import dtr_reconciliation
+
+
+# ---- SHARED DATA FOR ALL APP PAGES ----
+# Everything goes through the process-wide cache in dtr_data, so every session and
+# page reuses the same parsed workbooks until a file changes on disk.
+
+def _warm():
+    for key in dtr_info:
+        try:
+            cached_dtr_lists(key)
+        except Exception:
+            pass  # the page that needs this DTR will surface the error
+    try:
+        quality_report()
+    except Exception:
+        pass
+
+
+@st.cache_resource
+def start_preload():
+    """Parse all DTR workbooks once per server process, in the background."""
+    thread = threading.Thread(target=_warm, name="dtr-preload", daemon=True)
+    thread.start()
+    return thread
+
+
+def dtr_lists(key):
+    return cached_dtr_lists(key)
+
+
+def dtr_kpis(key):
+    return dtr_reconciliation(key).kpis()
+
+
+def dtr_quality(key):
+    """Data-quality issues for one DTR, read from the report built once per data version."""
+    return dtr_issues(key, quality_report())
+
+
+def population_cube():
+    """Feeder × DTR × phase × location × status meter counts, built once per data version."""
+    return cached_cube()
+
+
+def dtr_consumption(key):
+    """Daily DLP table for the trend: memory-mapped store first, workbook otherwise (None if neither)."""
+    from consumption_store import ConsumptionStore  # pyarrow is only needed once a trend is drawn
+    df_cons = ConsumptionStore().dlp_table(key)
+    return df_cons if df_cons is not None else cached_consumption(key)
+
+
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), "dtr_exports")
+
+
+def feeder_workbook(feeder):
+    """
+    Path of the feeder-wide Excel export (lists + suggested corrections), rebuilt
+    only when a DTR file changes. The workbook stays on disk; the cache holds the
+    path and the previous file is removed when a new version replaces it.
+    """
+    from excel_export import export_feeder  # xlsxwriter is only needed once an export is requested
+    keys = feeder_to_dtrs()[feeder]
+    version = '|'.join(dtr_version(k) for k in keys)
+
+    def build():
+        path = os.path.join(EXPORT_DIR, f"Feeder_{feeder}_{hashlib.sha1(version.encode()).hexdigest()[:12]}.xlsx")
+        export_feeder(feeder, path, keys)
+        return path
+
+    def update(old_path):
+        path = build()
+        if old_path != path and os.path.exists(old_path):
+            os.remove(old_path)
+        return path
+    return cached('xlsx', feeder, version, build, update)
+
+
+def outage_window(key):
+    """This session's date-window reconciler for a DTR; kept across reruns so slider moves are incremental."""
+    from outage_window import WindowReconciler, cached_index
+    index = cached_index()
+    window = st.session_state.get('outage_window')
+    if window is None or window.dtr_key != key or window.index is not index:
+        window = st.session_state['outage_window'] = WindowReconciler(index, key)
+    return window
@@ -0,0 +1,126 @@
+import datetime
+
+import streamlit as st
+
+from app_data import (dtr_consumption, dtr_kpis, dtr_lists, dtr_quality, feeder_workbook, outage_window,
+                      population_cube)
+from detail_table import detail_table
+from dtr_data import dtr_info, dtr_version, feeder_to_dtrs
+from population_cube import rollup, slice_cube
+
+# --- SIDEBAR FOR SELECTION ---
+dtrs_by_feeder = feeder_to_dtrs()
+st.sidebar.title("🔌 Select Feeder & DTR")
+selected_feeder = st.sidebar.selectbox("Feeder", sorted(dtrs_by_feeder))
+selected_dtr = st.sidebar.selectbox("DTR", sorted(dtr_info[k]['dtr'] for k in dtrs_by_feeder[selected_feeder]))
+dtr_selection = f"{selected_feeder}-{selected_dtr}"
+
+# Feeder-wide Excel export, built on request only (field teams work in Excel)
+if st.sidebar.button("📥 Prepare feeder workbook", key="prepare_xlsx"):
+    st.session_state['xlsx_feeder'] = selected_feeder
+if st.session_state.get('xlsx_feeder') == selected_feeder:
+    with open(feeder_workbook(selected_feeder), 'rb') as xlsx:
+        st.sidebar.download_button(
+            "Download feeder workbook (.xlsx)",
+            data=xlsx,
+            file_name=f"Feeder_{selected_feeder}_export.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            key="download_xlsx"
+        )
+
+st.markdown(f"""
+    <h1 style='color:#1e3799;font-weight:700;margin-bottom:6px'>
+        ⚡ DTR Outage KPIs Dashboard <span style='font-size:18px;'>[Feeder: {selected_feeder}, DTR: {selected_dtr}]</span>
+    </h1>
+    <div style='color:#555;font-size:18px;margin-bottom:24px'>
+        Consumer mapping, outage verification, and correction dashboard for <b>DTR {selected_feeder}-{selected_dtr}</b>.
+    </div>
+""", unsafe_allow_html=True)
+
+# --- KPI Cards (first paint: no chart or table code has run yet) ---
+try:
+    kpis = dtr_kpis(dtr_selection)
+except Exception as e:
+    st.error(f"Error loading data for {dtr_selection}: {e}")
+    st.stop()
+
+st.markdown("### 🏆 Core KPIs at a Glance")
+col1, col2, col3, col4, col5 = st.columns(5)
+col1.metric("📒 Master Tagged Consumers", kpis['master_tagged'])
+col2.metric("🟢 Connected (Outage File)", kpis['connected_outage'])
+col3.metric("🚫 Untagged (Master Only)", kpis['untagged'])
+col4.metric("🔄 Wrongly Mapped (Other DTR, Same Feeder)", kpis['wrongly_mapped'])
+col5.metric("🏆 Total After Correction", kpis['total_corrected'])
+
+# --- Data quality (from the ingest-time report, not re-checked here) ---
+issues = dtr_quality(dtr_selection)
+if len(issues):
+    st.warning(f"⚠️ {len(issues)} data-quality issue(s) affect this DTR's KPIs "
+               f"({', '.join(sorted(issues['check'].unique()))}).")
+    with st.expander("Data-quality issues"):
+        st.dataframe(issues, use_container_width=True)
+else:
+    st.caption("✅ No duplicate, conflicting or malformed serials found for this DTR.")
+
+# --- Outage window (membership unioned over every event in the chosen dates) ---
+window = outage_window(dtr_selection)
+dates = [datetime.date.fromisoformat(d) for d in window.dates()]
+if len(dates) > 1:
+    st.markdown("### 📅 Outage Window Reconciliation")
+    start, end = st.slider("Outage date window", min_value=dates[0], max_value=dates[-1],
+                           value=(dates[0], dates[-1]), key="outage_window_range")
+    w = window.set_window(start, end)
+    wcol1, wcol2, wcol3, wcol4 = st.columns(4)
+    wcol1.metric("🗓️ Events in Window", w['events'])
+    wcol2.metric("🟢 Connected (Any Event)", w['connected'])
+    wcol3.metric("🚫 Untagged (No Event)", w['untagged'])
+    wcol4.metric("🔄 Wrongly Mapped (Any Event)", w['wrongly_mapped'])
+elif dates:
+    st.caption(f"📅 One outage event on record ({dates[0]}); window reconciliation needs more than one event date.")
+
+# --- Bar Chart (Plotly imported only now) ---
+from dtr_charts import cached_kpi_bar, trend_figure, trend_table  # noqa: E402
+
+st.plotly_chart(cached_kpi_bar(dtr_selection, dtr_version(dtr_selection), kpis,
+                               f"DTR Outage KPIs Breakdown ({dtr_selection})"), use_container_width=True)
+
+# --- Details download ---
+st.markdown("### 🗂️ Downloadable Detailed Lists")
+lists = dtr_lists(dtr_selection)
+sections = [
+    ('master', "Master Tagged Consumers (filtered for selected DTR)", "master_tagged_consumers"),
+    ('outage', "Connected (Outage File)", "connected_outage"),
+    ('untagged', "Untagged (Master Only)", "untagged_master"),
+    ('wrongly_mapped', "Wrongly Mapped (Other DTR, Same Feeder)", "wrongly_mapped"),
+]
+for name, title, suffix in sections:
+    with st.expander(title):
+        detail_table((dtr_selection, name), key=f"detail_{dtr_selection}_{name}")
+        st.download_button(
+            "Download as CSV",
+            data=lists[name].to_csv(index=False),
+            file_name=f"{dtr_selection}_{suffix}.csv",
+            mime="text/csv",
+            key=f"download_{name}"
+        )
+
+# --- Drill-down by phase & location (slices of the pre-built cube) ---
+with st.expander("🔎 Drill-down by Phase & Location"):
+    cube = slice_cube(population_cube(), feeder=selected_feeder, dtr=selected_dtr)
+    phases = ["All"] + sorted(cube['phase'].astype(str).unique())
+    phase = st.selectbox("Phase", phases, key="drill_phase")
+    pivot = rollup(cube, ['location', 'status'], phase=None if phase == "All" else phase)
+    st.dataframe(pivot, use_container_width=True)
+
+# --------- CONSUMPTION TREND PLOT ---------
+df_cons = dtr_consumption(dtr_selection)
+table_df = trend_table(df_cons) if df_cons is not None else None
+if table_df is not None:
+    st.markdown("### 📈 Meter Count and Loss % Trend (Daily)")
+    st.plotly_chart(trend_figure(table_df, f"{dtr_selection} Meter Count and Loss % Trend"), use_container_width=True)
+    st.markdown("#### 📋 Daily Meter Count & Loss % Table")
+    st.dataframe(table_df, use_container_width=True)
+elif df_cons is not None:
+    st.info("Consumption file found but required columns (`date`, `meter_count`, `%Loss_DLP`) not detected.")
+else:
+    st.info("No consumption data found for this DTR.")
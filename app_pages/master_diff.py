@@ -0,0 +1,58 @@
+import streamlit as st
+import pandas as pd
+
+from dtr_data import dtr_info
+from master_diff import diff_masters
+
+
+@st.cache_data
+def read_master_file(path_or_buffer, name):
+    if name.lower().endswith('.csv'):
+        return pd.read_csv(path_or_buffer)
+    return pd.read_excel(path_or_buffer)
+
+
+# ---- SIDEBAR ----
+st.sidebar.title("🧾 Master Version Diff")
+master_files = sorted(set(v['master_file'] for v in dtr_info.values()))
+old_file = st.sidebar.selectbox("Current master (old)", master_files)
+new_upload = st.sidebar.file_uploader("New master export (xlsx/csv)", type=['xlsx', 'csv'])
+
+st.markdown("""
+    <h1 style='color:#1e3799;font-weight:700;margin-bottom:6px'>⚡ Master Version Diff</h1>
+    <div style='color:#555;font-size:18px;margin-bottom:24px'>
+        Meters added, retired and re-tagged between two master exports, and the DTRs whose KPIs they invalidate.
+    </div>
+""", unsafe_allow_html=True)
+
+if new_upload is None:
+    st.info("Upload the new master export in the sidebar to compare it with the current master.")
+    st.stop()
+
+old = read_master_file(old_file, old_file)
+new = read_master_file(new_upload, new_upload.name)
+diff = diff_masters(old, new)
+
+# --- KPI Cards ---
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("🆕 New Meters", len(diff['added']))
+col2.metric("🗑️ Retired Meters", len(diff['retired']))
+col3.metric("🔄 Re-tagged Meters", len(diff['changed']))
+col4.metric("⚠️ DTRs Invalidated", len(diff['invalidated']))
+
+sections = [
+    ('invalidated', "DTRs with Invalidated KPIs"),
+    ('changed', "Re-tagged Meters (dtrcode / Feedercode / phase changed)"),
+    ('added', "New Meters"),
+    ('retired', "Retired Meters"),
+]
+for name, title in sections:
+    with st.expander(f"{title} ({len(diff[name])})", expanded=(name == 'invalidated')):
+        st.dataframe(diff[name], use_container_width=True)
+        st.download_button(
+            "Download as CSV",
+            data=diff[name].to_csv(index=False),
+            file_name=f"master_diff_{name}.csv",
+            mime="text/csv",
+            key=f"download_{name}"
+        )
@@ -0,0 +1,62 @@
+import streamlit as st
+
+from dtr_ranking import RANK_METRICS, rank_dtrs
+
+
+@st.cache_data
+def load_ranking(n, with_loss):
+    top = rank_dtrs(n, with_loss=with_loss)
+    return {metric: top.ranking(metric) for metric in top.heaps}
+
+
+# ---- SIDEBAR ----
+st.sidebar.title("🏁 Worst DTR Ranking")
+top_n = st.sidebar.slider("Top N", min_value=5, max_value=100, value=20, step=5)
+metric = st.sidebar.selectbox("Rank by", list(RANK_METRICS), format_func=RANK_METRICS.get)
+with_loss = st.sidebar.checkbox("Include Loss % (reads consumption files)", value=True)
+
+rankings = load_ranking(top_n, with_loss)
+ranking = rankings[metric]
+
+st.markdown(f"""
+    <h1 style='color:#1e3799;font-weight:700;margin-bottom:6px'>
+        ⚡ Worst-Tagged DTRs <span style='font-size:18px;'>[by {RANK_METRICS[metric]}]</span>
+    </h1>
+    <div style='color:#555;font-size:18px;margin-bottom:24px'>
+        Utility-wide list for field crews, worst first.
+    </div>
+""", unsafe_allow_html=True)
+
+if ranking.empty:
+    st.info("No DTRs have data for this metric.")
+    st.stop()
+
+# --- Bar Chart (Plotly imported only once there is something to plot) ---
+import plotly.graph_objs as go  # noqa: E402
+
+fig = go.Figure(data=[
+    go.Bar(
+        x=ranking['dtr_key'],
+        y=ranking[metric],
+        marker_color='#e74c3c',
+        text=ranking[metric].round(2),
+        textposition='auto'
+    )
+])
+fig.update_layout(
+    title=f"Top {len(ranking)} DTRs by {RANK_METRICS[metric]}",
+    yaxis_title=RANK_METRICS[metric],
+    xaxis_title="DTR (Feeder-DTR)",
+    xaxis_type='category',
+    bargap=0.3
+)
+st.plotly_chart(fig, use_container_width=True)
+
+# --- Table & download ---
+st.dataframe(ranking, use_container_width=True)
+st.download_button(
+    "Download as CSV",
+    data=ranking.to_csv(index=False),
+    file_name=f"worst_dtrs_{metric}.csv",
+    mime="text/csv"
+)
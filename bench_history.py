@@ -0,0 +1,13 @@
+import csv
+import os
+
+
+def append_row(path, row, fields):
+    """Append one measurement to a CSV history, writing the header (and directory) when the file is new."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    new_file = not os.path.exists(path)
+    with open(path, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        if new_file:
+            writer.writeheader()
+        writer.writerow(row)
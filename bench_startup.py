@@ -0,0 +1,71 @@
+import argparse
+import datetime
+import json
+import os
+import subprocess
+import sys
+
+from bench_history import append_row
+
+# Runs in a fresh interpreter so nothing is pre-imported or pre-cached
+PROBE = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import pandas, streamlit  # noqa: E401,F401  (framework cost, paid by any page)
+t_framework = time.perf_counter() - t0
+before = set(sys.modules)
+t0 = time.perf_counter()
+import app_data  # noqa: F401
+t_import = time.perf_counter() - t0
+eager = sorted(m for m in ('plotly', 'openpyxl', 'pyarrow', 'consumption_store', 'dtr_charts')
+               if m in sys.modules and m not in before)
+
+from streamlit.testing.v1 import AppTest
+t1 = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=120).run()
+t_cold = time.perf_counter() - t1
+ok = not at.exception and len(at.metric) > 0
+t2 = time.perf_counter()
+at.run()
+t_warm = time.perf_counter() - t2
+print(json.dumps({'framework_import_s': t_framework, 'import_s': t_import, 'eager_imports': ' '.join(eager),
+                  'cold_first_run_s': t_cold, 'warm_rerun_s': t_warm, 'ok': ok}))
+"""
+
+FIELDS = ['timestamp', 'commit', 'python', 'app', 'framework_import_s', 'import_s', 'eager_imports',
+          'cold_first_run_s', 'warm_rerun_s', 'ok']
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def measure(app="app.py"):
+    """One startup measurement in a fresh interpreter: import cost, first full run, warm rerun."""
+    out = subprocess.run([sys.executable, '-c', PROBE, app], capture_output=True, text=True, check=True)
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    return {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': _commit(),
+        'python': sys.version.split()[0],
+        'app': app,
+        **result,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Startup benchmark for the multipage dashboard")
+    parser.add_argument("--app", default="app.py")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", default=os.path.join("results", "startup_bench.csv"), help="CSV history to append to")
+    args = parser.parse_args()
+
+    for _ in range(args.repeat):
+        row = measure(args.app)
+        append_row(args.out, row, FIELDS)
+        print(f"framework {row['framework_import_s']:.3f}s | app modules {row['import_s']:.3f}s | "
+              f"first run {row['cold_first_run_s']:.3f}s | warm rerun {row['warm_rerun_s']:.3f}s | eager: {row['eager_imports'] or '-'} | ok={row['ok']}")
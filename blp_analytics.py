@@ -0,0 +1,107 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from consumption_store import ConsumptionStore, read_consumption_workbook
+from dtr_data import consumption_files
+
+POWER_FACTOR = 0.9
+
+
+def load_blp(keys=None, series='blp_dtr', store=None):
+    """
+    Block-load rows (dtr_key, ts, value = kWh in the block) for the given DTRs.
+
+    Read from the consumption store when it has the DTR, otherwise straight from
+    the BLP sheets of the consumption workbook.
+    """
+    store = store or ConsumptionStore()
+    frames = []
+    for key in keys or list(consumption_files):
+        df = store.dtr_frame(key, series)
+        if df.empty:
+            df = read_consumption_workbook(key)
+            df = df[df['series'] == series]
+        frames.append(df[['dtr_key', 'ts', 'value']])
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['dtr_key', 'ts', 'value'])
+    return df.dropna(subset=['ts', 'value']).sort_values(['dtr_key', 'ts'], ignore_index=True)
+
+
+def with_demand(blp):
+    """Add block_hours (per-DTR median spacing of readings) and demand_kw = kWh / block hours."""
+    df = blp.astype({'dtr_key': 'category'}).sort_values(['dtr_key', 'ts'], ignore_index=True)
+    step = df.groupby('dtr_key', observed=True)['ts'].diff().dt.total_seconds() / 3600
+    df['block_hours'] = step.groupby(df['dtr_key'], observed=True).transform('median').fillna(24.0)
+    df['demand_kw'] = df['value'] / df['block_hours']
+    return df
+
+
+def resample_blocks(blp, freq='h'):
+    """Energy per DTR summed into `freq` buckets ('h' hourly, 'D' daily), all DTRs in one groupby."""
+    out = (blp.groupby(['dtr_key', pd.Grouper(key='ts', freq=freq)])['value']
+           .agg(['sum', 'count'])
+           .rename(columns={'sum': 'kwh', 'count': 'blocks'})
+           .reset_index())
+    return out[out['blocks'] > 0].reset_index(drop=True)
+
+
+def _rated_series(keys, rated_kva):
+    if rated_kva is None:
+        return pd.Series(np.nan, index=keys)
+    if isinstance(rated_kva, dict):
+        return pd.Series(rated_kva, dtype=float).reindex(keys)
+    return pd.Series(float(rated_kva), index=keys)
+
+
+def load_curve_stats(blp, rated_kva=None, threshold=1.0, power_factor=POWER_FACTOR):
+    """
+    Per-DTR peak demand, load factor and overload hours.
+
+    rated_kva: scalar or {dtr_key: kVA}; a block counts as overloaded when its kVA
+    (demand_kw / power_factor) exceeds threshold * rated kVA.
+    """
+    df = with_demand(blp)
+    keys = df['dtr_key'].unique()
+    rated = df['dtr_key'].map(_rated_series(keys, rated_kva))
+    df['kva'] = df['demand_kw'] / power_factor
+    df['overload_h'] = np.where(df['kva'] > threshold * rated, df['block_hours'], 0.0)
+
+    stats = df.groupby('dtr_key', observed=True).agg(
+        start=('ts', 'min'),
+        end=('ts', 'max'),
+        blocks=('ts', 'size'),
+        block_hours=('block_hours', 'first'),
+        energy_kwh=('value', 'sum'),
+        peak_kw=('demand_kw', 'max'),
+        avg_kw=('demand_kw', 'mean'),
+        overload_hours=('overload_h', 'sum'),
+    )
+    stats['peak_time'] = df.loc[df.groupby('dtr_key', observed=True)['demand_kw'].idxmax(), ['dtr_key', 'ts']].set_index('dtr_key')['ts']
+    stats['load_factor'] = (stats['avg_kw'] / stats['peak_kw']).where(stats['peak_kw'] > 0)
+    stats['rated_kva'] = _rated_series(stats.index, rated_kva)
+    stats['peak_utilisation_pct'] = stats['peak_kw'] / power_factor / stats['rated_kva'] * 100
+    stats.loc[stats['rated_kva'].isna(), 'overload_hours'] = np.nan
+    return stats.reset_index()
+
+
+def load_duration_curves(blp):
+    """Demand sorted high to low per DTR with the % of time each level is equalled or exceeded."""
+    df = with_demand(blp)[['dtr_key', 'demand_kw']]
+    df = df.sort_values(['dtr_key', 'demand_kw'], ascending=[True, False], ignore_index=True)
+    rank = df.groupby('dtr_key', observed=True).cumcount() + 1
+    df['pct_time'] = rank / df.groupby('dtr_key', observed=True)['demand_kw'].transform('size') * 100
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="BLP load-curve analytics per DTR")
+    parser.add_argument("--dtr", action="append", help="Only these DTR keys")
+    parser.add_argument("--rated-kva", type=float, help="Rated kVA applied to every DTR")
+    parser.add_argument("--threshold", type=float, default=1.0, help="Overload threshold as a fraction of rating")
+    parser.add_argument("--freq", default="D", help="Resample frequency for the printed energy table")
+    args = parser.parse_args()
+
+    blp = load_blp(args.dtr)
+    print(load_curve_stats(blp, args.rated_kva, args.threshold).to_string(index=False))
+    print(resample_blocks(blp, args.freq).tail(10).to_string(index=False))
@@ -0,0 +1,141 @@
+import argparse
+import datetime
+import html
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from plotly.offline import get_plotlyjs
+
+from dtr_charts import kpi_bar_figure, trend_figure, trend_table
+from dtr_data import cached_consumption, cached_dtr_lists, cached_master, dtr_info
+from reconciliation import reconcile_lists
+
+LIST_TITLES = {
+    'master': "Master Tagged Consumers",
+    'outage': "Connected (Outage File)",
+    'untagged': "Untagged (Master Only)",
+    'wrongly_mapped': "Wrongly Mapped (Other DTR, Same Feeder)",
+}
+KPI_CARDS = [
+    ('master_tagged', "📒 Master Tagged Consumers"),
+    ('connected_outage', "🟢 Connected (Outage File)"),
+    ('untagged', "🚫 Untagged (Master Only)"),
+    ('wrongly_mapped', "🔄 Wrongly Mapped (Other DTR, Same Feeder)"),
+    ('total_corrected', "🏆 Total After Correction"),
+]
+
+PAGE_STYLE = """
+body{font-family:sans-serif;margin:24px;color:#2d3436}
+h1{color:#1e3799}
+.cards{display:flex;gap:12px;margin:16px 0}
+.card{flex:1;border:1px solid #dfe6e9;border-radius:8px;padding:12px}
+.card .v{font-size:28px;font-weight:700}
+table{border-collapse:collapse;font-size:13px}
+td,th{border:1px solid #dfe6e9;padding:3px 6px}
+details{margin:10px 0}
+"""
+
+
+def _page(title, body):
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{html.escape(title)}</title>
+<script src="plotly.min.js"></script><style>{PAGE_STYLE}</style></head>
+<body>{body}
+<div style='text-align:center;margin-top:24px;color:#7f8c8d;'>🚀 <b>Power Analytics Dashboard</b> | <i>Esyasoft</i></div>
+</body></html>"""
+
+
+def render_dtr(key, out_dir):
+    """Render one DTR's page and list attachments into out_dir. Runs in a worker process."""
+    start = time.perf_counter()
+    d = dtr_info[key]
+    lists = cached_dtr_lists(key)
+    kpis = reconcile_lists(key, lists, cached_master(d['feeder'])).kpis()
+    title = f"{d['feeder']}-{d['dtr']}"
+
+    cards = "".join(
+        f"<div class='card'><div>{label}</div><div class='v'>{kpis[k]}</div></div>" for k, label in KPI_CARDS
+    )
+    bar = kpi_bar_figure(kpis, f"DTR Outage KPIs Breakdown ({title})")
+    body = [
+        "<p><a href='index.html'>← All DTRs</a></p>",
+        f"<h1>⚡ DTR Outage KPIs [Feeder: {d['feeder']}, DTR: {d['dtr']}]</h1>",
+        f"<div class='cards'>{cards}</div>",
+        bar.to_html(full_html=False, include_plotlyjs=False),
+    ]
+
+    df_cons = cached_consumption(key)
+    table_df = trend_table(df_cons) if df_cons is not None else None
+    if table_df is not None:
+        body.append(trend_figure(table_df, f"{key} Meter Count and Loss % Trend")
+                    .to_html(full_html=False, include_plotlyjs=False))
+
+    body.append("<h2>🗂️ Detailed Lists</h2>")
+    for name, list_title in LIST_TITLES.items():
+        df = lists[name]
+        stem = f"{key}_{name}"
+        df.to_csv(os.path.join(out_dir, stem + ".csv"), index=False)
+        df.astype({c: str for c in df.columns if df[c].dtype == object}).to_parquet(
+            os.path.join(out_dir, stem + ".parquet"), index=False)
+        body.append(
+            f"<details><summary>{html.escape(list_title)} ({len(df)}) — "
+            f"<a href='{stem}.csv'>CSV</a> · <a href='{stem}.parquet'>Parquet</a></summary>"
+            f"{df.to_html(index=False, na_rep='')}</details>"
+        )
+
+    with open(os.path.join(out_dir, f"{key}.html"), "w", encoding="utf-8") as f:
+        f.write(_page(f"DTR {title}", "\n".join(body)))
+    return {'dtr_key': key, **kpis, 'seconds': time.perf_counter() - start}
+
+
+def build_bundle(out_root="reports", date=None, workers=None, keys=None):
+    """Render every DTR in parallel into <out_root>/<date>/ and write index.html. Returns (rows, failures)."""
+    date = date or datetime.date.today().isoformat()
+    out_dir = os.path.join(out_root, date)
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, "plotly.min.js"), "w", encoding="utf-8") as f:
+        f.write(get_plotlyjs())
+
+    rows, failures = [], {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(render_dtr, key, out_dir): key for key in (keys or list(dtr_info))}
+        for fut in as_completed(futures):
+            try:
+                rows.append(fut.result())
+            except Exception as e:
+                failures[futures[fut]] = f"{type(e).__name__}: {e}"
+    rows.sort(key=lambda r: r['dtr_key'])
+
+    index_rows = "".join(
+        f"<tr><td><a href='{r['dtr_key']}.html'>{r['dtr_key']}</a></td>"
+        + "".join(f"<td>{r[k]}</td>" for k, _ in KPI_CARDS) + "</tr>"
+        for r in rows
+    )
+    failed = "".join(f"<li>{html.escape(k)}: {html.escape(v)}</li>" for k, v in failures.items())
+    body = (
+        f"<h1>⚡ DTR Outage KPI Reports — {date}</h1>"
+        "<table><tr><th>DTR</th>" + "".join(f"<th>{label}</th>" for _, label in KPI_CARDS) + "</tr>"
+        f"{index_rows}</table>"
+        + (f"<h2>Failed</h2><ul>{failed}</ul>" if failures else "")
+    )
+    with open(os.path.join(out_dir, "index.html"), "w", encoding="utf-8") as f:
+        f.write(_page(f"DTR Reports {date}", body))
+    return rows, failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-render static HTML reports for every DTR")
+    parser.add_argument("--out", default="reports", help="Bundle root; each run writes <out>/<date>/")
+    parser.add_argument("--date", help="Bundle date label (default: today)")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--dtr", action="append", help="Only these DTR keys")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    rows, failures = build_bundle(args.out, args.date, args.workers, args.dtr)
+    for r in rows:
+        print(f"{r['dtr_key']}: {r['seconds']:.2f}s")
+    for key, err in failures.items():
+        print(f"{key}: FAILED {err}")
+    print(f"{len(rows)} DTR pages in {time.perf_counter() - t0:.2f}s")
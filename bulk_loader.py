@@ -0,0 +1,145 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+
+@dataclass
+class LoadResult:
+    name: object
+    path: str
+    data: object = None
+    seconds: float = 0.0
+    error: str = None
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+@dataclass
+class LoadReport:
+    timings: dict = field(default_factory=dict)
+    errors: dict = field(default_factory=dict)
+    wall_seconds: float = 0.0
+
+    def summary(self):
+        slowest = max(self.timings.values(), default=0.0)
+        return (f"{len(self.timings) - len(self.errors)} loaded, {len(self.errors)} failed in {self.wall_seconds:.2f}s "
+                f"(slowest file {slowest:.2f}s, sum {sum(self.timings.values()):.2f}s)")
+
+
+class IncompleteLoad(Exception):
+    """
+    Raised by the strict loaders when some files failed. Carries what did load
+    (`data`) and the LoadReport, so a caller can show the partial result while a
+    cache around the loader keeps nothing and the failed files are retried.
+    """
+
+    def __init__(self, data, report):
+        super().__init__(f"{len(report.errors)} file(s) failed to load")
+        self.data = data
+        self.report = report
+
+
+def _read(name, path, kwargs):
+    # Runs in a worker process: the openpyxl parse is CPU-bound, so threads would serialize on the GIL
+    start = time.perf_counter()
+    try:
+        data = pd.read_excel(path, **kwargs)
+        return LoadResult(name, path, data, time.perf_counter() - start)
+    except Exception as e:
+        return LoadResult(name, path, None, time.perf_counter() - start, f"{type(e).__name__}: {e}")
+
+
+def iter_workbooks(specs, workers=None):
+    """
+    Parse workbooks concurrently and yield a LoadResult for each as soon as it finishes.
+
+    specs: {name: path} or {name: (path, read_excel kwargs)}. A failing file yields a
+    result with `error` set; the others keep loading.
+    """
+    jobs = {name: (s, {}) if isinstance(s, str) else s for name, s in specs.items()}
+    if not jobs:
+        return
+    workers = workers or min(len(jobs), os.cpu_count() or 1)
+    if workers <= 1:
+        for name, (path, kwargs) in jobs.items():
+            yield _read(name, path, kwargs)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_read, name, path, kwargs) for name, (path, kwargs) in jobs.items()]
+        for fut in as_completed(futures):
+            yield fut.result()
+
+
+def load_workbooks(specs, workers=None, on_result=None, strict=False):
+    """
+    Load everything in specs; returns ({name: data} for the files that loaded, LoadReport).
+    With strict, failures raise IncompleteLoad instead.
+    """
+    start = time.perf_counter()
+    data, report = {}, LoadReport()
+    for res in iter_workbooks(specs, workers):
+        report.timings[res.name] = res.seconds
+        if res.ok:
+            data[res.name] = res.data
+        else:
+            report.errors[res.name] = res.error
+        if on_result:
+            on_result(res)
+    report.wall_seconds = time.perf_counter() - start
+    if strict and report.errors:
+        raise IncompleteLoad(data, report)
+    return data, report
+
+
+# Feeder masters and DTR outage workbooks of the serial-matching dashboards (dashboard.py, 2, 3)
+DASHBOARD_WORKBOOKS = {
+    ('7088', 'master'): 'Master_7088.xlsx',
+    ('7088', '57'): '7088-57.xlsx',
+    ('7088', '32'): '7088-32.xlsx',
+    ('7088', '86'): '7088-86.xlsx',
+    ('15631', 'master'): 'Master_Feeder_15631.xlsx',
+    ('15631', '34'): '15631-34.xlsx',
+}
+
+
+def nest(data):
+    """{(feeder, name): df} -> {feeder: {name: df}}, the layout the dashboards' load_data() returns."""
+    files = {}
+    for (feeder, name), df in data.items():
+        files.setdefault(feeder, {})[name] = df
+    return files
+
+
+def load_dashboard_files(specs=None, workers=None, strict=False):
+    """
+    The dashboards' {feeder: {'master': df, dtr: df}} layout, parsed in parallel.
+    A failing file is reported, not fatal; feeders left without their master or
+    without any DTR are dropped. Returns (files, LoadReport); with strict, failures
+    raise IncompleteLoad carrying that layout of the files that loaded.
+    """
+    try:
+        data, report = load_workbooks(DASHBOARD_WORKBOOKS if specs is None else specs, workers, strict=strict)
+    except IncompleteLoad as e:
+        raise IncompleteLoad(_complete_feeders(e.data), e.report) from None
+    return _complete_feeders(data), report
+
+
+def _complete_feeders(data):
+    return {f: v for f, v in nest(data).items() if 'master' in v and len(v) > 1}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parse workbooks in parallel and report per-file timing")
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+
+    _, report = load_workbooks({p: (p, {'sheet_name': None}) for p in args.paths}, args.workers,
+                               on_result=lambda r: print(f"{r.path}: {r.seconds:.2f}s {r.error or 'ok'}"))
+    print(report.summary())
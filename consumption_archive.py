@@ -0,0 +1,314 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from consumption_store import read_consumption_workbook
+from daily_consumption import workbook_readings
+from dtr_data import consumption_files, dtr_info, normalize_serials
+
+COLUMNS = ['dtr_key', 'series', 'msn', 'ts', 'value', 'meter_count']  # consumption_store.SCHEMA order
+UINTS = [np.uint8, np.uint16, np.uint32, np.uint64]
+
+
+# ---- INTEGER CODECS ----
+def _zigzag(x):
+    """Signed -> unsigned so small negative deltas stay small (0, -1, 1, -2 ... -> 0, 1, 2, 3 ...)."""
+    return ((x << 1) ^ (x >> 63)).astype(np.uint64)
+
+
+def _unzigzag(z):
+    z = z.astype(np.uint64)
+    return (z >> np.uint64(1)).astype(np.int64) ^ -(z & np.uint64(1)).astype(np.int64)
+
+
+def _narrow(u):
+    """Smallest unsigned dtype that holds every value."""
+    top = int(u.max()) if len(u) else 0
+    return u.astype(next(t for t in UINTS if top <= np.iinfo(t).max))
+
+
+def _run_deltas(x, starts):
+    """(first value of each run, deltas within runs with 0 at run starts)."""
+    d = np.diff(x, prepend=np.int64(0))
+    d[starts] = 0
+    return x[starts], d
+
+
+def _run_cumsum(firsts, d, starts):
+    run = np.cumsum(starts) - 1
+    cs = np.cumsum(d)
+    return cs - cs[starts][run] + firsts[run]
+
+
+def _encode_int(name, x, starts):
+    """Run firsts and in-run deltas as two zigzagged, narrowed columns (a large first value
+    would otherwise force every small delta to 8 bytes)."""
+    firsts, deltas = _run_deltas(x, starts)
+    return [(f'{name}_first', _narrow(_zigzag(firsts))), (name, _narrow(_zigzag(deltas)))]
+
+
+def _decode_int(cols, name, starts):
+    return _run_cumsum(_unzigzag(cols[f'{name}_first']), _unzigzag(cols[name]), starts)
+
+
+def _fixed_point(values, scale):
+    """Float column -> (int64 fixed point, null mask); nulls repeat the previous value so their deltas are 0."""
+    null = np.isnan(values)
+    filled = pd.Series(values).ffill().fillna(0).to_numpy()
+    return np.round(filled * scale).astype(np.int64), null
+
+
+# ---- CHUNKS ----
+def encode_chunk(df, decimals):
+    """
+    One DTR-month of tidy rows as a compressed chunk. Rows are sorted into runs
+    of (series, msn); ts, value and meter_count are delta-encoded within each
+    run, zigzagged, narrowed to the smallest integer width and zlib-compressed.
+    """
+    df = df.sort_values(['series', 'msn', 'ts'], kind='stable', na_position='first')
+    series_codes, series_names = pd.factorize(df['series'])
+    msn_codes, msn_names = pd.factorize(df['msn'].fillna(''))
+    starts = np.ones(len(df), dtype=bool)
+    starts[1:] = (series_codes[1:] != series_codes[:-1]) | (msn_codes[1:] != msn_codes[:-1])
+
+    ts = df['ts'].to_numpy('datetime64[s]').astype(np.int64)
+    value, value_null = _fixed_point(df['value'].to_numpy(np.float64), 10 ** decimals)
+    count, count_null = _fixed_point(pd.to_numeric(df['meter_count'], errors='coerce').to_numpy(np.float64), 1)
+    columns = [
+        ('series', _narrow(series_codes.astype(np.uint64))),
+        ('msn', _narrow(msn_codes.astype(np.uint64))),
+        *_encode_int('ts', ts, starts),
+        *_encode_int('value', value, starts),
+        ('value_null', np.packbits(value_null)),
+        *_encode_int('meter_count', count, starts),
+        ('meter_count_null', np.packbits(count_null)),
+    ]
+    header = json.dumps({
+        'rows': len(df),
+        'series': [str(s) for s in series_names],
+        'msn': [str(m) for m in msn_names],
+        'columns': [[name, arr.dtype.str, arr.nbytes] for name, arr in columns],
+    }).encode()
+    raw = struct.pack('<I', len(header)) + header + b''.join(arr.tobytes() for _, arr in columns)
+    return zlib.compress(raw, 9)
+
+
+def decode_chunk(blob, dtr_key, decimals):
+    raw = zlib.decompress(blob)
+    (header_len,) = struct.unpack_from('<I', raw)
+    header = json.loads(raw[4:4 + header_len])
+    pos, cols = 4 + header_len, {}
+    for name, dtype, nbytes in header['columns']:
+        cols[name] = np.frombuffer(raw, dtype=dtype, count=nbytes // np.dtype(dtype).itemsize, offset=pos)
+        pos += nbytes
+    n = header['rows']
+    series_codes = cols['series'].astype(np.int64)
+    msn_codes = cols['msn'].astype(np.int64)
+    starts = np.ones(n, dtype=bool)
+    starts[1:] = (series_codes[1:] != series_codes[:-1]) | (msn_codes[1:] != msn_codes[:-1])
+
+    value = _decode_int(cols, 'value', starts) / 10 ** decimals
+    value[np.unpackbits(cols['value_null'], count=n).astype(bool)] = np.nan
+    count = _decode_int(cols, 'meter_count', starts).astype(np.float64)
+    count[np.unpackbits(cols['meter_count_null'], count=n).astype(bool)] = np.nan
+    msn = np.array(header['msn'], dtype=object)[msn_codes]
+    msn[msn == ''] = None
+    return pd.DataFrame({
+        'dtr_key': dtr_key,
+        'series': np.array(header['series'], dtype=object)[series_codes],
+        'msn': msn,
+        'ts': _decode_int(cols, 'ts', starts).astype('datetime64[s]').astype('datetime64[ns]'),
+        'value': value,
+        'meter_count': count,
+    })
+
+
+# ---- ARCHIVE ----
+def write_archive(tidy, root="consumption_archive", decimals=3):
+    """
+    Write tidy consumption rows (consumption_store layout) as monthly chunks per DTR:
+      <root>/archive_<sha1>.bin  compressed chunks back to back, named after their checksum
+      <root>/index.json          {decimals, blob, sha1, size,
+                                  chunks: [{dtr_key, month, start, end, series, rows, offset, length}]}
+    The blob is written under a new name before index.json is replaced, so a reader
+    always pairs an index with the blob it describes. The previous blob is kept for
+    readers that loaded the old index; older ones are removed.
+    """
+    os.makedirs(root, exist_ok=True)
+    tidy = tidy.dropna(subset=['ts'])
+    month = pd.to_datetime(tidy['ts']).dt.strftime('%Y-%m')
+    chunks, offset, sha1 = [], 0, hashlib.sha1()
+    tmp = os.path.join(root, 'archive.bin.tmp')
+    with open(tmp, 'wb') as f:
+        for (key, m), rows in tidy.groupby([tidy['dtr_key'], month], sort=True):
+            blob = encode_chunk(rows, decimals)
+            f.write(blob)
+            sha1.update(blob)
+            chunks.append({
+                'dtr_key': key, 'month': m,
+                'start': str(rows['ts'].min()), 'end': str(rows['ts'].max()),
+                'series': sorted(rows['series'].unique().tolist()),
+                'rows': len(rows), 'offset': offset, 'length': len(blob),
+            })
+            offset += len(blob)
+    name = f"archive_{sha1.hexdigest()[:16]}.bin"
+    os.replace(tmp, os.path.join(root, name))
+    index_path = os.path.join(root, 'index.json')
+    keep = {name}
+    if os.path.exists(index_path):
+        with open(index_path) as f:
+            keep.add(json.load(f)['blob'])
+    with open(index_path + '.tmp', 'w') as f:
+        json.dump({'decimals': decimals, 'blob': name, 'sha1': sha1.hexdigest(), 'size': offset, 'chunks': chunks},
+                  f, indent=1)
+    os.replace(index_path + '.tmp', index_path)
+    for old in glob.glob(os.path.join(root, 'archive_*.bin')):
+        if os.path.basename(old) not in keep:
+            os.remove(old)
+    return chunks
+
+
+class ConsumptionArchive:
+    """Range reads over an archive: only the chunks of the DTR and months asked for are decompressed."""
+
+    def __init__(self, root="consumption_archive"):
+        self.root = root
+        with open(os.path.join(root, 'index.json')) as f:
+            index = json.load(f)
+        self.decimals = index['decimals']
+        self.chunks = index['chunks']
+        self.blob_path = os.path.join(root, index['blob'])
+        self.sha1, self.size = index['sha1'], index['size']
+
+    def chunks_for(self, dtr_key, start=None, end=None, series=None):
+        start = pd.Timestamp(start) if start is not None else None
+        end = pd.Timestamp(end) if end is not None else None
+        return [c for c in self.chunks
+                if c['dtr_key'] == dtr_key
+                and (start is None or pd.Timestamp(c['end']) >= start)
+                and (end is None or pd.Timestamp(c['start']) <= end)
+                and (series is None or series in c['series'])]
+
+    def query(self, dtr_key, start=None, end=None, series=None):
+        """Tidy rows of one DTR in [start, end], optionally one series only."""
+        chunks = self.chunks_for(dtr_key, start, end, series)
+        frames = []
+        with open(self.blob_path, 'rb') as f:
+            for c in chunks:
+                f.seek(c['offset'])
+                frames.append(decode_chunk(f.read(c['length']), dtr_key, self.decimals))
+        if not frames:
+            return pd.DataFrame(columns=COLUMNS)
+        df = pd.concat(frames, ignore_index=True)
+        mask = pd.Series(True, index=df.index)
+        if start is not None:
+            mask &= df['ts'] >= pd.Timestamp(start)
+        if end is not None:
+            mask &= df['ts'] <= pd.Timestamp(end)
+        if series is not None:
+            mask &= df['series'] == series
+        return df[mask].reset_index(drop=True)
+
+    def size_bytes(self):
+        return os.path.getsize(self.blob_path)
+
+    def verify(self):
+        """True if the blob has the size and checksum the index was written with."""
+        if os.path.getsize(self.blob_path) != self.size:
+            return False
+        sha1 = hashlib.sha1()
+        with open(self.blob_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                sha1.update(block)
+        return sha1.hexdigest() == self.sha1
+
+
+def register_readings(key):
+    """Per-meter daily register readings of a DTR's workbooks as tidy 'register' rows."""
+    frames = []
+    for path in (dtr_info[key]['outage_file'], consumption_files.get(key)):
+        if path and os.path.exists(path):
+            r = workbook_readings(path)
+            frames.append(pd.DataFrame({'dtr_key': key, 'series': 'register', 'msn': normalize_serials(r['msn']).to_numpy(),
+                                        'ts': r['ts'].to_numpy(), 'value': r['reading'].to_numpy(), 'meter_count': np.nan}))
+    return pd.concat(frames, ignore_index=True).drop_duplicates(['msn', 'ts']) if frames else pd.DataFrame(columns=COLUMNS)
+
+
+def build_archive(root="consumption_archive", keys=None, decimals=3):
+    """Archive the DLP/BLP series and per-meter register readings of the DTRs' workbooks."""
+    frames = []
+    for key in keys or list(dtr_info):
+        frames.append(read_consumption_workbook(key))
+        frames.append(register_readings(key))
+    tidy = pd.concat([f[COLUMNS] for f in frames if len(f)], ignore_index=True)
+    return tidy, write_archive(tidy, root, decimals)
+
+
+def _synthetic(meters, days, seed=0):
+    """Per-meter daily register readings and consumption for one DTR."""
+    rng = np.random.default_rng(seed)
+    ts = pd.date_range('2023-01-01', periods=days, freq='D')
+    daily = rng.gamma(2.0, 2.5, (meters, days)).round(3)
+    registers = (rng.uniform(1e5, 5e6, (meters, 1)) + np.cumsum(daily, axis=1)).round(3)
+    msn = np.repeat([f"EZ{1700000 + i:07d}" for i in range(meters)], days)
+    base = {'dtr_key': '7088-57', 'msn': msn, 'ts': np.tile(ts, meters), 'meter_count': np.nan}
+    return pd.concat([pd.DataFrame({**base, 'series': 'register', 'value': registers.ravel()}),
+                      pd.DataFrame({**base, 'series': 'daily_kwh', 'value': daily.ravel()})], ignore_index=True)[COLUMNS]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compressed monthly-chunked consumption archive")
+    parser.add_argument("--root", default="consumption_archive")
+    parser.add_argument("--decimals", type=int, default=3, help="Fixed-point precision of stored values")
+    parser.add_argument("--query", metavar="DTR", help="Query a DTR instead of building")
+    parser.add_argument("--start")
+    parser.add_argument("--end")
+    parser.add_argument("--series")
+    parser.add_argument("--bench", type=int, nargs=2, metavar=("METERS", "DAYS"),
+                        help="Compare with xlsx on synthetic per-meter daily data")
+    args = parser.parse_args()
+
+    if args.query:
+        archive = ConsumptionArchive(args.root)
+        t0 = time.perf_counter()
+        df = archive.query(args.query, args.start, args.end, args.series)
+        print(df.to_string(index=False, max_rows=40))
+        print(f"{len(df)} rows from {len(archive.chunks_for(args.query, args.start, args.end, args.series))} "
+              f"chunk(s) in {(time.perf_counter() - t0) * 1e3:.1f} ms")
+    elif args.bench:
+        tidy = _synthetic(*args.bench)
+        with tempfile.TemporaryDirectory() as tmp:
+            xlsx = os.path.join(tmp, 'bench.xlsx')
+            tidy.to_excel(xlsx, index=False, engine='xlsxwriter')
+            write_archive(tidy, os.path.join(tmp, 'archive'), args.decimals)
+            archive = ConsumptionArchive(os.path.join(tmp, 'archive'))
+            t0 = time.perf_counter()
+            pd.read_excel(xlsx)
+            t_xlsx = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            full = archive.query('7088-57')
+            t_full = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            month = archive.query('7088-57', '2023-03-01', '2023-03-31')
+            t_month = time.perf_counter() - t0
+            assert np.allclose(full.sort_values(['series', 'msn', 'ts'])['value'].to_numpy(),
+                               tidy.sort_values(['series', 'msn', 'ts'])['value'].to_numpy())
+            print(f"{len(tidy)} rows | xlsx {os.path.getsize(xlsx) / 2 ** 20:.2f} MB, read {t_xlsx:.2f}s | "
+                  f"archive {archive.size_bytes() / 2 ** 20:.2f} MB, full read {t_full:.3f}s, "
+                  f"one month {t_month * 1e3:.1f} ms ({len(month)} rows)")
+    else:
+        tidy, chunks = build_archive(args.root, decimals=args.decimals)
+        sources = {p for key in dtr_info for p in (dtr_info[key]['outage_file'], consumption_files.get(key))
+                   if p and os.path.exists(p)}
+        size = ConsumptionArchive(args.root).size_bytes()
+        print(f"{len(tidy)} rows in {len(chunks)} chunks: {size / 1024:.1f} KiB "
+              f"(source workbooks {sum(os.path.getsize(p) for p in sources) / 1024:.1f} KiB)")
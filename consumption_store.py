@@ -0,0 +1,207 @@
+import argparse
+import json
+import os
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from dtr_data import consumption_files, dtr_info, file_version, find_column, normalize_serials
+
+# Tidy long schema shared by every feeder file
+SCHEMA = pa.schema([
+    ('dtr_key', pa.string()),
+    ('series', pa.string()),
+    ('msn', pa.string()),          # null for DTR-level aggregates
+    ('ts', pa.timestamp('ns')),
+    ('value', pa.float64()),
+    ('meter_count', pa.float64()),
+])
+SORT_KEYS = ['dtr_key', 'series', 'msn', 'ts']
+
+
+def _series_frame(key, series, ts, value, meter_count=None, msn=None):
+    n = len(ts)
+    return pd.DataFrame({
+        'dtr_key': key,
+        'series': series,
+        'msn': None if msn is None else normalize_serials(msn).values,
+        'ts': pd.to_datetime(ts, errors='coerce').values,
+        'value': pd.to_numeric(value, errors='coerce').values,
+        'meter_count': pd.to_numeric(meter_count, errors='coerce').values if meter_count is not None else [None] * n,
+    })
+
+
+def tidy_consumption(key, sheets):
+    """
+    Normalize a DTR consumption workbook ({sheet name: DataFrame}) to the tidy schema.
+
+    Series produced:
+      dlp_dtr        diff_consumption_DTR per reading_date (with meter_count)
+      dlp_consumer   total_daily_consumption_consumer per reading_date (with meter_count)
+      dlp_loss_pct   %Loss_DLP per reading_date
+      blp_dtr        BLP DTR consumption (with msn_count)
+      blp_consumer   BLP consumer consumption, per msn when the sheet has one
+    """
+    parts = []
+    for name, df in sheets.items():
+        lname = name.lower()
+        if 'dlp' in lname:
+            date_col = find_column(df, "date")
+            meter_col = find_column(df, "meter_count", "meter count")
+            dtr_col = find_column(df, "consumption_dtr")
+            cons_col = find_column(df, "consumption_consumer")
+            loss_col = find_column(df, "loss")
+            if date_col is None:
+                continue
+            if dtr_col:
+                parts.append(_series_frame(key, 'dlp_dtr', df[date_col], df[dtr_col],
+                                           df[meter_col] if meter_col else None))
+            if cons_col:
+                parts.append(_series_frame(key, 'dlp_consumer', df[date_col], df[cons_col],
+                                           df[meter_col] if meter_col else None))
+            if loss_col:
+                parts.append(_series_frame(key, 'dlp_loss_pct', df[date_col], df[loss_col],
+                                           df[meter_col] if meter_col else None))
+        elif 'blp' in lname:
+            ts_col = find_column(df, "day", "date", "ts", "time")
+            cons_col = find_column(df, "cons")
+            if ts_col is None or cons_col is None:
+                continue
+            count_col = find_column(df, "msn_count", "meter_count")
+            msn_col = 'msn' if 'msn' in df.columns else None
+            series = 'blp_dtr' if 'dtr' in lname else 'blp_consumer'
+            parts.append(_series_frame(key, series, df[ts_col], df[cons_col],
+                                       df[count_col] if count_col else None,
+                                       df[msn_col] if msn_col else None))
+    if not parts:
+        return pd.DataFrame({f.name: pd.Series(dtype=object) for f in SCHEMA})
+    return pd.concat(parts, ignore_index=True).dropna(subset=['ts'])
+
+
+def read_consumption_workbook(key):
+    """All sheets of a DTR's consumption workbook in tidy form (empty frame if there is no file)."""
+    path = consumption_files.get(key)
+    if not path or not os.path.exists(path):
+        return tidy_consumption(key, {})
+    return tidy_consumption(key, pd.read_excel(path, sheet_name=None))
+
+
+# ---- WRITER ----
+def write_feeder_file(tidy, path, sources=None):
+    """
+    Sort a feeder's tidy frame and write it as an uncompressed Arrow IPC file
+    (compression would defeat memory mapping). The schema metadata carries the
+    index, {dtr_key: {series: [row offset, row count]}}, and the sources,
+    {dtr_key: file_version of the workbook it was built from}, so a single
+    os.replace swaps the rows and their offsets together.
+    """
+    tidy = tidy.sort_values(SORT_KEYS, na_position='first', kind='stable').reset_index(drop=True)
+    index = {}
+    if len(tidy):
+        groups = tidy.groupby(['dtr_key', 'series'], sort=False).indices
+        for (key, series), rows in groups.items():
+            index.setdefault(key, {})[series] = [int(rows[0]), int(len(rows))]
+    metadata = {'index': json.dumps(index), 'sources': json.dumps(sources or {})}
+    table = pa.Table.from_pandas(tidy, schema=SCHEMA, preserve_index=False).replace_schema_metadata(metadata)
+    tmp = path + ".tmp"
+    with pa.OSFile(tmp, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table, max_chunksize=64 * 1024)
+    os.replace(tmp, path)
+    return index
+
+
+def _source_version(key):
+    path = consumption_files.get(key)
+    return file_version(path) if path else None
+
+
+def build_store(root="consumption_store", keys=None):
+    """Convert the consumption workbooks into one Arrow IPC file per feeder. Returns {feeder: path}."""
+    os.makedirs(root, exist_ok=True)
+    by_feeder, sources = {}, {}
+    for key in keys or list(consumption_files):
+        feeder = dtr_info[key]['feeder']
+        sources.setdefault(feeder, {})[key] = _source_version(key)
+        by_feeder.setdefault(feeder, []).append(read_consumption_workbook(key))
+    written = {}
+    for feeder, frames in by_feeder.items():
+        path = os.path.join(root, f"{feeder}.arrow")
+        write_feeder_file(pd.concat(frames, ignore_index=True), path, sources[feeder])
+        written[feeder] = path
+    return written
+
+
+# ---- READER ----
+class ConsumptionStore:
+    """
+    Read side of the store. Feeder files are memory-mapped, so every session and
+    worker process shares the same OS pages; a DTR lookup is a zero-copy slice at
+    the offsets from the index, and only the pages of that slice are touched.
+
+    A DTR whose workbook changed since the store was built reads as not stored,
+    so callers fall back to the workbook until build_store is run again.
+    """
+
+    _maps = {}
+    _lock = threading.Lock()
+
+    def __init__(self, root="consumption_store"):
+        self.root = root
+
+    def _open(self, feeder):
+        path = os.path.join(self.root, f"{feeder}.arrow")
+        if not os.path.exists(path):
+            return None, {}, {}
+        stat = os.stat(path)
+        stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            hit = self._maps.get(path)
+            if hit is None or hit[0] != stamp:
+                table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+                metadata = table.schema.metadata
+                index, sources = json.loads(metadata[b'index']), json.loads(metadata[b'sources'])
+                hit = self._maps[path] = (stamp, table, index, sources)
+        return hit[1:]
+
+    def is_current(self, key):
+        """True if the DTR is stored and its workbook has not changed since."""
+        _, _, sources = self._open(dtr_info[key]['feeder'])
+        return key in sources and sources[key] == _source_version(key)
+
+    def series(self, key):
+        _, index, _ = self._open(dtr_info[key]['feeder'])
+        return sorted(index.get(key, {})) if self.is_current(key) else []
+
+    def dtr_slice(self, key, series, start=None, end=None):
+        """Arrow table of one DTR series, optionally limited to start <= ts <= end (empty if stale)."""
+        table, index, _ = self._open(dtr_info[key]['feeder'])
+        if table is None or series not in index.get(key, {}) or not self.is_current(key):
+            return SCHEMA.empty_table()
+        offset, length = index[key][series]
+        part = table.slice(offset, length)
+        if start is not None:
+            part = part.filter(pc.greater_equal(part['ts'], pa.scalar(pd.Timestamp(start), pa.timestamp('ns'))))
+        if end is not None:
+            part = part.filter(pc.less_equal(part['ts'], pa.scalar(pd.Timestamp(end), pa.timestamp('ns'))))
+        return part
+
+    def dtr_frame(self, key, series, start=None, end=None):
+        return self.dtr_slice(key, series, start, end).to_pandas()
+
+    def dlp_table(self, key, start=None, end=None):
+        """reading_date / meter_count / loss% frame like the DLP sheet, or None if the DTR is not stored."""
+        loss = self.dtr_frame(key, 'dlp_loss_pct', start, end)
+        if loss.empty:
+            return None
+        return pd.DataFrame({'reading_date': loss['ts'], 'meter_count': loss['meter_count'], 'loss%': loss['value']})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the memory-mapped consumption store")
+    parser.add_argument("--root", default="consumption_store")
+    parser.add_argument("--dtr", action="append", help="Only these DTR keys")
+    args = parser.parse_args()
+    for feeder, path in build_store(args.root, args.dtr).items():
+        print(f"Feeder {feeder}: {path}")
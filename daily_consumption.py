@@ -0,0 +1,161 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from dtr_data import consumption_files, dtr_info, find_column, normalize_serials
+
+# Quality flags on the derived per-meter daily table
+FLAGS = ('ok', 'interpolated', 'rollover', 'reset', 'gap_too_long')
+# Register capacity is 10 ** REGISTER_DIGITS counts (readings in these workbooks reach 8.1e6);
+# a drop only counts as a rollover from within ROLLOVER_MARGIN of capacity to below it
+REGISTER_DIGITS = 8
+ROLLOVER_MARGIN = 0.01
+
+
+def readings_from_pairs(df):
+    """
+    Long (msn, ts, reading, scale) rows from a present/next reading sheet.
+
+    Sheets like `total_cons_154_meters_dlp` or the DLP table carry two cumulative
+    register readings per row; the register-to-kWh scale of each meter is recovered
+    from the diff_consumption column where the sheet has one.
+    """
+    msn_col = 'msn' if 'msn' in df.columns else find_column(df, 'serial')
+    pres, nxt = find_column(df, 'present_day_cons'), find_column(df, 'next_day_cons')
+    if msn_col is None or pres is None or nxt is None:
+        return pd.DataFrame(columns=['msn', 'ts', 'reading', 'scale'])
+    pres_ts = find_column(df, 'present_day_ts', 'reading_date', 'date')
+    nxt_ts = find_column(df, 'next_day_ts')
+    diff_col = find_column(df, 'diff_consumption')
+
+    df = df[pd.to_numeric(df[pres], errors='coerce').notna()].copy()
+    df['msn'] = normalize_serials(df[msn_col]).values
+    start = pd.to_datetime(df[pres_ts], errors='coerce')
+    end = pd.to_datetime(df[nxt_ts], errors='coerce') if nxt_ts else start + pd.Timedelta(days=1)
+    p, n = pd.to_numeric(df[pres], errors='coerce'), pd.to_numeric(df[nxt], errors='coerce')
+    scale = pd.Series(np.nan, index=df.index)
+    if diff_col:
+        raw = n - p
+        scale = (pd.to_numeric(df[diff_col], errors='coerce') / raw).where(raw > 0)
+    scale = scale.groupby(df['msn']).transform('median')
+    return pd.concat([
+        pd.DataFrame({'msn': df['msn'], 'ts': start, 'reading': p, 'scale': scale}),
+        pd.DataFrame({'msn': df['msn'], 'ts': end, 'reading': n, 'scale': scale}),
+    ], ignore_index=True).dropna(subset=['ts', 'reading'])
+
+
+def derive_daily(readings, scale=None, max_gap_days=7, digits=REGISTER_DIGITS):
+    """
+    Per-meter daily consumption from cumulative register readings.
+
+    readings: (msn, ts, reading[, scale][, digits]); one sort, then a groupby-diff per meter.
+    - a drop from within ROLLOVER_MARGIN of the register capacity (10 ** digits,
+      scalar or per-msn via a 'digits' column) to within the margin of zero is a
+      rollover and wrapped; every other negative delta (meter reset or
+      replacement) is a reset and left NaN
+    - a delta spanning several days is spread evenly over them ('interpolated'),
+      up to max_gap_days; longer gaps are kept as one NaN row ('gap_too_long')
+    scale converts register units to kWh (scalar, or per-msn via a 'scale' column);
+    default 1 where neither is given.
+    """
+    extra = [c for c in ('scale', 'digits') if c in readings.columns]
+    df = readings[['msn', 'ts', 'reading'] + extra].copy()
+    df['date'] = pd.to_datetime(df['ts']).dt.normalize()
+    df = (df.sort_values(['msn', 'date', 'ts'])
+            .drop_duplicates(['msn', 'date'], keep='last')
+            .reset_index(drop=True))
+    if scale is not None:
+        df['scale'] = scale
+    df['scale'] = df['scale'].fillna(1.0) if 'scale' in df.columns else 1.0
+    df['digits'] = df['digits'].fillna(digits) if 'digits' in df.columns else digits
+
+    prev = df.groupby('msn')['reading'].shift()
+    delta = df['reading'] - prev
+    gap = df.groupby('msn')['date'].diff().dt.days
+
+    capacity = 10.0 ** df['digits']
+    margin = ROLLOVER_MARGIN * capacity
+    rollover = (delta < 0) & (prev >= capacity - margin) & (df['reading'] < margin)
+    reset = (delta < 0) & ~rollover
+    delta = delta.where(~rollover, delta + capacity).where(~reset)
+
+    flag = pd.Series('ok', index=df.index)
+    flag[gap > 1] = 'interpolated'
+    flag[gap > max_gap_days] = 'gap_too_long'
+    flag[rollover] = 'rollover'
+    flag[reset] = 'reset'
+
+    has_prev = prev.notna()
+    out = pd.DataFrame({
+        'msn': df['msn'][has_prev].to_numpy(),
+        'end_date': df['date'][has_prev].to_numpy(),
+        'gap': gap[has_prev].astype(int).to_numpy(),
+        'consumption_kwh': (delta * df['scale'])[has_prev].to_numpy(),
+        'flag': flag[has_prev].to_numpy(),
+    })
+    long_gap = out['gap'] > max_gap_days
+    out.loc[long_gap, 'consumption_kwh'] = np.nan
+    days = np.where(long_gap, 1, out['gap'])
+
+    # Spread each delta over the days it covers: one row per day, vectorized with repeat
+    idx = np.repeat(np.arange(len(out)), days)
+    offset = np.arange(len(idx)) - np.repeat(np.cumsum(days) - days, days)
+    daily = pd.DataFrame({
+        'msn': out['msn'].to_numpy()[idx],
+        'date': out['end_date'].to_numpy()[idx] - pd.to_timedelta(days[idx] - offset, unit='D'),
+        'consumption_kwh': out['consumption_kwh'].to_numpy()[idx] / days[idx],
+        'flag': out['flag'].to_numpy()[idx],
+    })
+    # Consumption of day D is the register movement from D to D+1, as in present_day/next_day sheets
+    daily['flag'] = pd.Categorical(daily['flag'], categories=FLAGS)
+    return daily.reset_index(drop=True)
+
+
+def workbook_readings(path):
+    """Readings from every sheet of a workbook that has present/next day register columns."""
+    frames = [readings_from_pairs(df) for df in pd.read_excel(path, sheet_name=None).values()]
+    frames = [f for f in frames if len(f)]
+    if not frames:
+        return pd.DataFrame(columns=['msn', 'ts', 'reading', 'scale'])
+    return pd.concat(frames, ignore_index=True).drop_duplicates(['msn', 'ts'])
+
+
+def build_daily_table(keys=None, out_path="daily_consumption.parquet"):
+    """
+    Derive the per-meter-per-day table for the DTRs' outage and consumption workbooks and write it.
+
+    A meter read in the workbooks of several DTRs (e.g. a wrongly mapped meter in
+    another DTR's outage file) keeps every mapping: dtr_key is the first DTR in
+    dtr_info order, dtr_keys lists all of them and multi_dtr flags such meters.
+    """
+    frames = []
+    for key in keys or list(dtr_info):
+        for path in (dtr_info[key]['outage_file'], consumption_files.get(key)):
+            if path and os.path.exists(path):
+                frames.append(workbook_readings(path).assign(dtr_key=key))
+    readings = pd.concat(frames, ignore_index=True)
+    mappings = readings[['msn', 'dtr_key']].drop_duplicates()
+    dtr_of_msn = mappings.drop_duplicates('msn').set_index('msn')['dtr_key']
+    dtrs_of_msn = mappings.groupby('msn', sort=False)['dtr_key'].agg(','.join)
+    daily = derive_daily(readings.drop(columns='dtr_key').drop_duplicates(['msn', 'ts']))
+    daily.insert(0, 'dtr_key', daily['msn'].map(dtr_of_msn).to_numpy())
+    daily.insert(1, 'dtr_keys', daily['msn'].map(dtrs_of_msn).to_numpy())
+    daily.insert(2, 'multi_dtr', daily['dtr_keys'].str.contains(',', regex=False).to_numpy())
+    daily.to_parquet(out_path, index=False)
+    return daily
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Derive per-meter daily consumption from register readings")
+    parser.add_argument("--dtr", action="append", help="Only these DTR keys")
+    parser.add_argument("--out", default="daily_consumption.parquet")
+    args = parser.parse_args()
+    daily = build_daily_table(args.dtr, args.out)
+    print(daily['flag'].value_counts().to_string())
+    print(f"{len(daily)} meter-days for {daily['msn'].nunique()} meters -> {args.out}")
+    shared = daily.loc[daily['multi_dtr'], ['msn', 'dtr_keys']].drop_duplicates()
+    if len(shared):
+        print(f"{len(shared)} meters read in several DTRs' workbooks:")
+        print(shared.to_string(index=False))
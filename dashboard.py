@@ -1,25 +1,23 @@
 import streamlit as st
-import pandas as pd
-import plotly.graph_objs as go
+
+from bulk_loader import IncompleteLoad, load_dashboard_files
+from dtr_charts import cached_figure
+from reconciliation import reconcile, rows_in
 
 # ---- LOAD DATA ----
 @st.cache_data
 def load_data():
-    files = {
-        '7088': {
-            'master': pd.read_excel('Master_7088.xlsx'),
-            '57': pd.read_excel('7088-57.xlsx'),
-            '32': pd.read_excel('7088-32.xlsx'),
-            '86': pd.read_excel('7088-86.xlsx'),
-        },
-        '15631': {
-            'master': pd.read_excel('Master_Feeder_15631.xlsx'),
-            '34': pd.read_excel('15631-34.xlsx')
-        }
-    }
-    return files
-
-files = load_data()
+    return load_dashboard_files(strict=True)  # raises on a failed file, so errors are never cached
+
+try:
+    files, load_report = load_data()
+except IncompleteLoad as e:
+    files, load_report = e.data, e.report
+for (feeder_name, file_name), error in load_report.errors.items():
+    st.sidebar.warning(f"Could not load {feeder_name}/{file_name}: {error}")
+if not files:
+    st.error("No feeder could be loaded: every master or DTR workbook failed.")
+    st.stop()
 
 # ---- SIDEBAR ----
 st.sidebar.title("DTR KPI Dashboard")
@@ -30,17 +28,12 @@ dtr_code = st.sidebar.selectbox("Select DTR", options=dtr_options)
 master = files[feeder]['master']
 dtr_data = files[feeder][dtr_code]
 
-# ---- FILTER MASTER FOR THIS DTR ----
-master_dtr = master[master['dtrcode'] == int(dtr_code)]
-feeder_customers = set(master['Meter_Serial_Number'])
-dtr_customers_master = set(master_dtr['Meter_Serial_Number'])
-dtr_customers_outage = set(dtr_data['Meter_Serial_Number'])
-
-# ---- KPI LOGIC ----
-correctly_tagged = dtr_customers_outage & dtr_customers_master
-not_mapped = dtr_customers_outage - dtr_customers_master
-other_feeder_customers = feeder_customers - dtr_customers_master
-total_tagged = len(dtr_customers_master)
+# ---- KPI LOGIC (shared reconciliation core, matched on normalized serials) ----
+result = reconcile(master, feeder, dtr_code, dtr_data['Meter_Serial_Number'], by='serial')
+correctly_tagged = result.connected
+not_mapped = result.serials('wrongly_mapped').tolist() + result.serials('not_in_feeder').tolist()
+other_feeder_customers = result.other_dtrs
+total_tagged = result.count('tagged')
 
 # ---- KPI CARDS ----
 st.markdown("## KPIs for Selected Feeder & DTR")
@@ -51,14 +44,11 @@ kpi3.metric("Other Feeder Customers", len(other_feeder_customers))
 kpi4.metric("Total Tagged to DTR (Master)", total_tagged)
 
 # ---- PLOTLY CHART ----
-fig = go.Figure(data=[
-    go.Bar(name='Count', x=[
-        "Correctly Tagged", "Not Mapped", "Other Feeder Customers", "Total Tagged"
-    ], y=[
-        len(correctly_tagged), len(not_mapped), len(other_feeder_customers), total_tagged
-    ], marker_color=['green', 'red', 'blue', 'orange'])
-])
-fig.update_layout(title="KPI Overview", showlegend=False)
+kpi_values = [len(correctly_tagged), len(not_mapped), len(other_feeder_customers), total_tagged]
+fig = cached_figure('overview_bar', f"{feeder}-{dtr_code}", tuple(kpi_values), [dict(
+    type='bar', name='Count', x=["Correctly Tagged", "Not Mapped", "Other Feeder Customers", "Total Tagged"],
+    y=kpi_values, marker=dict(color=['green', 'red', 'blue', 'orange'])
+)], dict(title="KPI Overview", showlegend=False))
 st.plotly_chart(fig, use_container_width=True)
 
 # ---- DETAIL TABLES ----
@@ -70,11 +60,11 @@ detail_type = st.radio(
 )
 
 if detail_type == "Correctly Tagged":
-    detail_df = dtr_data[dtr_data['Meter_Serial_Number'].isin(correctly_tagged)]
+    detail_df = rows_in(dtr_data, result, 'connected')
 elif detail_type == "Not Mapped (in Outage)":
-    detail_df = dtr_data[dtr_data['Meter_Serial_Number'].isin(not_mapped)]
+    detail_df = rows_in(dtr_data, result, 'wrongly_mapped', 'not_in_feeder')
 else:
-    detail_df = master[master['Meter_Serial_Number'].isin(other_feeder_customers)]
+    detail_df = rows_in(master, result, 'other_dtrs')
 
 st.dataframe(detail_df, use_container_width=True)
 
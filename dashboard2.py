@@ -1,24 +1,22 @@
 import streamlit as st
-import pandas as pd
-import plotly.graph_objs as go
+
+from bulk_loader import IncompleteLoad, load_dashboard_files
+from dtr_charts import cached_figure
+from reconciliation import reconcile, rows_in
 
 @st.cache_data
 def load_data():
-    files = {
-        '7088': {
-            'master': pd.read_excel('Master_7088.xlsx'),
-            '57': pd.read_excel('7088-57.xlsx'),
-            '32': pd.read_excel('7088-32.xlsx'),
-            '86': pd.read_excel('7088-86.xlsx'),
-        },
-        '15631': {
-            'master': pd.read_excel('Master_Feeder_15631.xlsx'),
-            '34': pd.read_excel('15631-34.xlsx')
-        }
-    }
-    return files
-
-files = load_data()
+    return load_dashboard_files(strict=True)  # raises on a failed file, so errors are never cached
+
+try:
+    files, load_report = load_data()
+except IncompleteLoad as e:
+    files, load_report = e.data, e.report
+for (feeder_name, file_name), error in load_report.errors.items():
+    st.sidebar.warning(f"Could not load {feeder_name}/{file_name}: {error}")
+if not files:
+    st.error("No feeder could be loaded: every master or DTR workbook failed.")
+    st.stop()
 
 # ---- SIDEBAR ----
 st.sidebar.title("🔌 DTR KPI Analytics Dashboard")
@@ -29,17 +27,15 @@ dtr_code = st.sidebar.selectbox("Select DTR", options=dtr_options, help="Choose
 master = files[feeder]['master']
 dtr_data = files[feeder][dtr_code]
 master_dtr = master[master['dtrcode'] == int(dtr_code)]
-feeder_customers = set(master['Meter_Serial_Number'])
-dtr_customers_master = set(master_dtr['Meter_Serial_Number'])
-dtr_customers_outage = set(dtr_data['Meter_Serial_Number'])
 
-# ---- KPI LOGIC ----
-correctly_tagged = dtr_customers_outage & dtr_customers_master
-not_mapped = dtr_customers_outage - dtr_customers_master
-other_feeder_customers = feeder_customers - dtr_customers_master
-currently_connected = dtr_customers_outage & dtr_customers_master  # same as correctly_tagged with current data
+# ---- KPI LOGIC (shared reconciliation core, matched on normalized serials) ----
+result = reconcile(master, feeder, dtr_code, dtr_data['Meter_Serial_Number'], by='serial')
+correctly_tagged = result.connected
+not_mapped = result.serials('wrongly_mapped').tolist() + result.serials('not_in_feeder').tolist()
+other_feeder_customers = result.other_dtrs
+currently_connected = result.connected  # same as correctly_tagged with current data
 
-total_tagged = len(dtr_customers_master)
+total_tagged = result.count('tagged')
 loss_pct = (1 - len(correctly_tagged)/total_tagged)*100 if total_tagged > 0 else 0
 
 # ---- TITLE & SUBTITLE ----
@@ -60,17 +56,18 @@ st.markdown(f"**Estimated Loss %:** <span style='color:red;font-size:1.2em'>{los
 # ---- PIE CHART ----
 pie_labels = ["Correctly Tagged", "Not Mapped", "Currently Connected", "Other Feeder Customers"]
 pie_values = [len(correctly_tagged), len(not_mapped), len(currently_connected), len(other_feeder_customers)]
-fig_pie = go.Figure(data=[go.Pie(labels=pie_labels, values=pie_values, hole=.4)])
-fig_pie.update_traces(textinfo='label+percent', pull=[0.08,0.08,0.08,0], marker=dict(line=dict(color='#000', width=2)))
-fig_pie.update_layout(title="Customer Tagging Breakdown")
+dtr_key = f"{feeder}-{dtr_code}"
+fig_pie = cached_figure('tagging_pie', dtr_key, tuple(pie_values), [dict(
+    type='pie', labels=pie_labels, values=pie_values, hole=.4, textinfo='label+percent',
+    pull=[0.08, 0.08, 0.08, 0], marker=dict(line=dict(color='#000', width=2))
+)], dict(title="Customer Tagging Breakdown"))
 st.plotly_chart(fig_pie, use_container_width=True)
 
 # ---- BAR CHART ----
-fig_bar = go.Figure(data=[
-    go.Bar(x=pie_labels, y=pie_values, marker_color=['#2ecc71', '#e74c3c', '#3498db', '#e67e22'],
-           text=pie_values, textposition='outside')
-])
-fig_bar.update_layout(title="Customer Counts by Category", yaxis_title="Count", xaxis_title="Customer Type")
+fig_bar = cached_figure('tagging_bar', dtr_key, tuple(pie_values), [dict(
+    type='bar', x=pie_labels, y=pie_values, marker=dict(color=['#2ecc71', '#e74c3c', '#3498db', '#e67e22']),
+    text=pie_values, textposition='outside'
+)], dict(title="Customer Counts by Category", yaxis_title="Count", xaxis_title="Customer Type"))
 st.plotly_chart(fig_bar, use_container_width=True)
 
 # ---- LOSS INFO CARD ----
@@ -84,13 +81,13 @@ detail_type = st.radio(
 )
 
 if detail_type == "Correctly Tagged":
-    detail_df = dtr_data[dtr_data['Meter_Serial_Number'].isin(correctly_tagged)]
+    detail_df = rows_in(dtr_data, result, 'connected')
 elif detail_type == "Not Mapped":
-    detail_df = dtr_data[dtr_data['Meter_Serial_Number'].isin(not_mapped)]
+    detail_df = rows_in(dtr_data, result, 'wrongly_mapped', 'not_in_feeder')
 elif detail_type == "Currently Connected":
-    detail_df = master_dtr[master_dtr['Meter_Serial_Number'].isin(currently_connected)]
+    detail_df = rows_in(master_dtr, result, 'connected')
 else:
-    detail_df = master[master['Meter_Serial_Number'].isin(other_feeder_customers)]
+    detail_df = rows_in(master, result, 'other_dtrs')
 
 st.dataframe(detail_df, use_container_width=True)
 
@@ -1,24 +1,22 @@
 import streamlit as st
-import pandas as pd
-import plotly.graph_objs as go
+
+from bulk_loader import IncompleteLoad, load_dashboard_files
+from dtr_charts import cached_figure
+from reconciliation import reconcile, rows_in
 
 @st.cache_data
 def load_data():
-    files = {
-        '7088': {
-            'master': pd.read_excel('Master_7088.xlsx'),
-            '57': pd.read_excel('7088-57.xlsx'),
-            '32': pd.read_excel('7088-32.xlsx'),
-            '86': pd.read_excel('7088-86.xlsx'),
-        },
-        '15631': {
-            'master': pd.read_excel('Master_Feeder_15631.xlsx'),
-            '34': pd.read_excel('15631-34.xlsx')
-        }
-    }
-    return files
-
-files = load_data()
+    return load_dashboard_files(strict=True)  # raises on a failed file, so errors are never cached
+
+try:
+    files, load_report = load_data()
+except IncompleteLoad as e:
+    files, load_report = e.data, e.report
+for (feeder_name, file_name), error in load_report.errors.items():
+    st.sidebar.warning(f"Could not load {feeder_name}/{file_name}: {error}")
+if not files:
+    st.error("No feeder could be loaded: every master or DTR workbook failed.")
+    st.stop()
 
 # ---- SIDEBAR FILTERS ----
 st.sidebar.title("🔌 Power Feeder/DTR Dashboard")
@@ -32,13 +30,12 @@ dtr_data = files[feeder][dtr_code]
 # --- Data Preparation ---
 # For DTR, filter master and get outage data
 master_dtr = master[master['dtrcode'] == int(dtr_code)]
-meters_master = set(master_dtr['Meter_Serial_Number'])
-meters_outage = set(dtr_data['Meter_Serial_Number'])
+result = reconcile(master, feeder, dtr_code, dtr_data['Meter_Serial_Number'], by='serial')
 
 # KPIs
 currently_connected = dtr_data  # All meters in outage file
-correctly_tagged = dtr_data[dtr_data['Meter_Serial_Number'].isin(meters_master)]
-not_mapped = dtr_data[~dtr_data['Meter_Serial_Number'].isin(meters_master)]
+correctly_tagged = rows_in(dtr_data, result, 'connected')
+not_mapped = rows_in(dtr_data, result, 'wrongly_mapped', 'not_in_feeder')
 total_tagged = master_dtr.shape[0]
 loss_pct = ((total_tagged - correctly_tagged.shape[0]) / total_tagged) * 100 if total_tagged > 0 else 0
 
@@ -75,42 +72,36 @@ pie_values = [
     total_tagged
 ]
 pie_colors = ['#00b894', '#0984e3', '#d63031', '#e67e22']
-fig_pie = go.Figure(
-    data=[go.Pie(
-        labels=pie_labels, 
-        values=pie_values, 
-        hole=.5, 
-        marker_colors=pie_colors, 
-        pull=[0.03, 0.05, 0.07, 0]
-    )]
-)
-fig_pie.update_traces(
-    textinfo='label+value+percent', 
-    textfont_size=14,
-    marker=dict(line=dict(color='#fff', width=2))
-)
-fig_pie.update_layout(
+dtr_key = f"{feeder}-{dtr_code}"
+fig_pie = cached_figure('live_pie', dtr_key, tuple(pie_values), [dict(
+    type='pie',
+    labels=pie_labels,
+    values=pie_values,
+    hole=.5,
+    pull=[0.03, 0.05, 0.07, 0],
+    textinfo='label+value+percent',
+    textfont=dict(size=14),
+    marker=dict(colors=pie_colors, line=dict(color='#fff', width=2))
+)], dict(
     title="Live Customer Connection & Tagging Breakdown",
     legend_title_text='Category'
-)
+))
 st.plotly_chart(fig_pie, use_container_width=True)
 
 # ---- BAR CHART ----
-fig_bar = go.Figure(data=[
-    go.Bar(
-        x=pie_labels, 
-        y=pie_values, 
-        marker_color=pie_colors, 
-        text=pie_values, 
-        textposition='outside'
-    )
-])
-fig_bar.update_layout(
+fig_bar = cached_figure('live_bar', dtr_key, tuple(pie_values), [dict(
+    type='bar',
+    x=pie_labels,
+    y=pie_values,
+    marker=dict(color=pie_colors),
+    text=pie_values,
+    textposition='outside'
+)], dict(
     title="Customer Counts by Category",
     yaxis_title="Count",
     xaxis_title="Category",
     bargap=0.5
-)
+))
 st.plotly_chart(fig_bar, use_container_width=True)
 
 # ---- SECTION TITLE ----
@@ -2,6 +2,8 @@ import streamlit as st
 import pandas as pd
 import plotly.graph_objs as go
 
+from reconciliation import reconcile, rows_in
+
 st.set_page_config(
     page_title="DTR Consumer Tagging Quality - Power Analytics",
     layout="wide"
@@ -15,25 +17,24 @@ dtr_code = 57
 feeder_code = 7088
 
 # --- FILTER master for selected DTR and Feeder ---
-master_dtr = master[(master['dtrcode'] == dtr_code) & (master['Feedercode'] == feeder_code)]
-outage_meters = set(outage['Meter_Serial_Number'])
-master_meters = set(master_dtr['Meter_Serial_Number'])
+master_feeder = master[master['Feedercode'] == feeder_code]
+master_dtr = master_feeder[master_feeder['dtrcode'] == dtr_code]
+result = reconcile(master_feeder, feeder_code, dtr_code, outage['Meter_Serial_Number'], by='serial')
 
 # 1. Live Connections on DTR (Consumers connected as per outage data)
-kpi1_live_connections = len(outage_meters)
+kpi1_live_connections = result.count('connected') + result.count('wrongly_mapped') + result.count('not_in_feeder')
 
 # 2. Master-Tagged Consumers Experiencing Outage
-kpi2_master_outage = len(master_meters & outage_meters)
+kpi2_master_outage = result.count('connected')
 
 # 3. Potentially Disconnected (Untagged in Outage)
-kpi3_unmapped = len(master_meters - outage_meters)
+kpi3_unmapped = result.count('untagged')
 
 # 4. Outage in Feeder-Mapped (Possibly Misassigned)
 #  - Meters in outage file but NOT belonging to this DTR as per master, but belong to the same feeder.
-wrongly_mapped = set(outage['Meter_Serial_Number']) - master_meters
 # Which of these are in master for feeder but other DTRs
-feeder_mapped = master[(master['Feedercode'] == feeder_code) & (master['Meter_Serial_Number'].isin(wrongly_mapped))]
-kpi4_wrongly_mapped = feeder_mapped.shape[0]
+feeder_mapped = rows_in(master_feeder, result, 'wrongly_mapped')
+kpi4_wrongly_mapped = result.count('wrongly_mapped')
 
 # 5. Total Effective Connections (Master-Tagged + Corrected)
 kpi5_total_effective = kpi2_master_outage + kpi4_wrongly_mapped
@@ -110,7 +111,7 @@ with st.expander("Live Connections on DTR (Outage File)"):
     )
 
 with st.expander("Master-Tagged Consumers Experiencing Outage"):
-    df_master_tagged_outage = master_dtr[master_dtr['Meter_Serial_Number'].isin(outage_meters)]
+    df_master_tagged_outage = rows_in(master_dtr, result, 'connected')
     st.dataframe(df_master_tagged_outage, use_container_width=True)
     st.download_button(
         "Download as CSV",
@@ -120,7 +121,7 @@ with st.expander("Master-Tagged Consumers Experiencing Outage"):
     )
 
 with st.expander("Potentially Disconnected (Untagged in Outage)"):
-    df_unmapped = master_dtr[~master_dtr['Meter_Serial_Number'].isin(outage_meters)]
+    df_unmapped = rows_in(master_dtr, result, 'untagged')
     st.dataframe(df_unmapped, use_container_width=True)
     st.download_button(
         "Download as CSV",
@@ -2,6 +2,8 @@ import streamlit as st
 import pandas as pd
 import plotly.graph_objs as go
 
+from reconciliation import reconcile, rows_in
+
 st.set_page_config(
     page_title="DTR Consumer Tagging Quality - Power Analytics",
     layout="wide"
@@ -19,27 +21,22 @@ master['Meter_Serial_Number'] = master['Meter_Serial_Number'].astype(str).str.st
 outage['Meter_Serial_Number'] = outage['Meter_Serial_Number'].astype(str).str.strip().str.upper()
 
 # --- FILTER master for selected DTR and Feeder ---
-master_dtr = master[(master['dtrcode'] == dtr_code) & (master['Feedercode'] == feeder_code)]
-outage_meters = set(outage['Meter_Serial_Number'])
-master_meters = set(master_dtr['Meter_Serial_Number'])
+master_feeder = master[master['Feedercode'] == feeder_code]
+master_dtr = master_feeder[master_feeder['dtrcode'] == dtr_code]
+result = reconcile(master_feeder, feeder_code, dtr_code, outage['Meter_Serial_Number'], by='serial')
 
 # 1. Live Connections on DTR
-kpi1_live_connections = len(outage_meters)
+kpi1_live_connections = result.count('connected') + result.count('wrongly_mapped') + result.count('not_in_feeder')
 
 # 2. Master-Tagged Consumers Experiencing Outage
-kpi2_master_outage = len(master_meters & outage_meters)
+kpi2_master_outage = result.count('connected')
 
 # 3. Potentially Disconnected (Untagged in Outage)
-kpi3_unmapped = len(master_meters - outage_meters)
+kpi3_unmapped = result.count('untagged')
 
 # 4. Outage in Feeder-Mapped (Possibly Misassigned)
-wrongly_mapped_meters = outage_meters - master_meters
-feeder_others = master[
-    (master['Feedercode'] == feeder_code) &
-    (master['dtrcode'] != dtr_code) &
-    (master['Meter_Serial_Number'].isin(wrongly_mapped_meters))
-]
-kpi4_wrongly_mapped = feeder_others.shape[0]
+feeder_others = rows_in(master_feeder, result, 'wrongly_mapped')
+kpi4_wrongly_mapped = result.count('wrongly_mapped')
 
 # 5. Total Effective Connections (Master-Tagged + Corrected)
 kpi5_total_effective = kpi2_master_outage + kpi4_wrongly_mapped
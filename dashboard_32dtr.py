@@ -2,6 +2,8 @@ import streamlit as st
 import pandas as pd
 import plotly.graph_objs as go
 
+from reconciliation import reconcile, rows_in
+
 st.set_page_config(
     page_title="DTR Consumer Tagging Quality - DTR 7088-32",
     layout="wide"
@@ -19,35 +21,29 @@ master['Meter_Serial_Number'] = master['Meter_Serial_Number'].astype(str).str.st
 outage['Meter_Serial_Number'] = outage['Meter_Serial_Number'].astype(str).str.strip().str.upper()
 
 # --- FILTER master for selected DTR and Feeder ---
-master_dtr = master[(master['dtrcode'] == dtr_code) & (master['Feedercode'] == feeder_code)]
-outage_meters = set(outage['Meter_Serial_Number'])
-master_meters = set(master_dtr['Meter_Serial_Number'])
+master_feeder = master[master['Feedercode'] == feeder_code]
+master_dtr = master_feeder[master_feeder['dtrcode'] == dtr_code]
+result = reconcile(master_feeder, feeder_code, dtr_code, outage['Meter_Serial_Number'], by='serial')
 
 # 1. How many consumer are connected to DTR (all in outage file)
-kpi1_connected = len(outage_meters)
+kpi1_connected = result.count('connected') + result.count('wrongly_mapped') + result.count('not_in_feeder')
 
 # 2. Out of master, how many consumer have got outage (intersection)
-kpi2_master_outage = len(master_meters & outage_meters)
+kpi2_master_outage = result.count('connected')
 
 # 3. Untagged customer (in master, not in outage)
-kpi3_untagged = len(master_meters - outage_meters)
+kpi3_untagged = result.count('untagged')
 
 # 4. Outage seen in customer in belonging to same feeder(wrongly mapped)
-# Outage meters not in this DTR as per master
-wrongly_mapped_meters = outage_meters - master_meters
-# These meters are found in master, same feeder, different DTR
-wrongly_mapped_df = master[
-    (master['Feedercode'] == feeder_code) &
-    (master['dtrcode'] != dtr_code) &
-    (master['Meter_Serial_Number'].isin(wrongly_mapped_meters))
-]
-kpi4_wrongly_mapped = wrongly_mapped_df.shape[0]
+# Outage meters not tagged to this DTR but found in master on the same feeder, different DTR
+wrongly_mapped_df = rows_in(master_feeder, result, 'wrongly_mapped')
+kpi4_wrongly_mapped = result.count('wrongly_mapped')
 
 # 5. Total consumer connected after correction (sum of KPI 2 and 4)
 kpi5_corrected = kpi2_master_outage + kpi4_wrongly_mapped
 
 # Loss %
-loss_percent = (kpi3_untagged / len(master_meters) * 100) if len(master_meters) > 0 else 0
+loss_percent = (kpi3_untagged / result.count('tagged') * 100) if result.count('tagged') > 0 else 0
 
 # ---- DASHBOARD ----
 
@@ -117,7 +113,7 @@ with st.expander("Live Connections on DTR (Outage File)"):
     )
 
 with st.expander("Master-Tagged Consumers with Outage"):
-    df_master_tagged_outage = master_dtr[master_dtr['Meter_Serial_Number'].isin(outage_meters)]
+    df_master_tagged_outage = rows_in(master_dtr, result, 'connected')
     st.dataframe(df_master_tagged_outage, use_container_width=True)
     st.download_button(
         "Download as CSV",
@@ -127,7 +123,7 @@ with st.expander("Master-Tagged Consumers with Outage"):
     )
 
 with st.expander("Untagged Customers (Master Only)"):
-    df_untagged = master_dtr[~master_dtr['Meter_Serial_Number'].isin(outage_meters)]
+    df_untagged = rows_in(master_dtr, result, 'untagged')
     st.dataframe(df_untagged, use_container_width=True)
     st.download_button(
         "Download as CSV",
@@ -3,59 +3,12 @@ import pandas as pd
 import plotly.graph_objs as go
 import os
 
-st.set_page_config(page_title="DTR Outage KPIs Dashboard", layout="wide")
-
-# === DTR info: sheet mapping as per your structure ===
-dtr_info = {
-    "7088-57": {
-        "master_file": "Master_7088.xlsx",
-        "master_sheet": "Sheet1",
-        "outage_file": "7088-57.xlsx",
-        "outage_sheet": "outage_154",
-        "untagged_sheet": "untagged_19_meters",
-        "wrongly_mapped_sheet": "wrongly_mapped_to_72",
-        "feeder": "7088",
-        "dtr": "57"
-    },
-    "7088-32": {
-        "master_file": "Master_7088.xlsx",
-        "master_sheet": "Sheet1",
-        "outage_file": "7088-32.xlsx",
-        "outage_sheet": "Outage_37",
-        "untagged_sheet": "Untagged_4",
-        "wrongly_mapped_sheet": "32_meters_wrongly_mapped",
-        "feeder": "7088",
-        "dtr": "32"
-    },
-    "7088-86": {
-        "master_file": "Master_7088.xlsx",
-        "master_sheet": "Sheet1",
-        "outage_file": "7088-86.xlsx",
-        "outage_sheet": "outage_164",
-        "untagged_sheet": "untagged_34_meters",
-        "wrongly_mapped_sheet": "26_meter_wrongly_mapped_to _82",
-        "feeder": "7088",
-        "dtr": "86"
-    },
-    "15631-34": {
-        "master_file": "Master_Feeder_15631.xlsx",
-        "master_sheet": "Sheet1",
-        "outage_file": "15631-34.xlsx",
-        "outage_sheet": "Outage_345",
-        "untagged_sheet": "Unmapped_67",
-        "wrongly_mapped_sheet": "wrongly_mapped_40",
-        "feeder": "15631",
-        "dtr": "34"
-    }
-}
+from bulk_loader import IncompleteLoad, load_workbooks
+from consumption_store import ConsumptionStore
+from detail_table import detail_table
+from dtr_data import cached, consumption_files, dtr_info, file_version
 
-# Consumption files mapping (file names only, all in current directory)
-consumption_files = {
-    "7088-57": "7088-57-consumption.xlsx",
-    "7088-32": "7088-32 consumption.xlsx",
-    "7088-86": "7088-86 consumption.xlsx",
-    "15631-34": "15631-34 consumption.xlsx"
-}
+st.set_page_config(page_title="DTR Outage KPIs Dashboard", layout="wide")
 
 # --- For dropdowns ---
 feeder_options = sorted(set(x['feeder'] for x in dtr_info.values()))
@@ -72,32 +25,28 @@ selected_dtr = st.sidebar.selectbox("DTR", sorted(feeder_to_dtr[selected_feeder]
 dtr_selection = f"{selected_feeder}-{selected_dtr}"
 d = dtr_info[dtr_selection]
 
-# --- LOAD DATA ---
+# --- LOAD DATA (sheets parsed in parallel, re-read only when a workbook changes or a sheet failed) ---
+sheet_specs = {
+    'master': (d['master_file'], {'sheet_name': d['master_sheet']}),
+    'outage': (d['outage_file'], {'sheet_name': d['outage_sheet']}),
+    'untagged': (d['outage_file'], {'sheet_name': d['untagged_sheet']}),
+    'wrongly mapped': (d['outage_file'], {'sheet_name': d['wrongly_mapped_sheet']}),
+}
 try:
-    master_all = pd.read_excel(d['master_file'], sheet_name=d['master_sheet'])
-except Exception as e:
-    st.error(f"Error loading master: {e}")
+    sheets, load_report = cached('dashboard_sheets', dtr_selection, file_version(d['master_file'], d['outage_file']),
+                                 lambda: load_workbooks(sheet_specs, strict=True))
+except IncompleteLoad as e:
+    sheets, load_report = e.data, e.report
+for name, error in load_report.errors.items():
+    st.error(f"Error loading {name} sheet: {error}")
+if load_report.errors:
     st.stop()
+master_all, outage, untagged, wrongly_mapped = (sheets[name] for name in sheet_specs)
 try:
     master = master_all[(master_all['dtrcode'] == int(d['dtr'])) & (master_all['Feedercode'] == int(d['feeder']))]
 except Exception as e:
     st.error(f"Error filtering master: {e}")
     st.stop()
-try:
-    outage = pd.read_excel(d['outage_file'], sheet_name=d['outage_sheet'])
-except Exception as e:
-    st.error(f"Error loading outage sheet: {e}")
-    st.stop()
-try:
-    untagged = pd.read_excel(d['outage_file'], sheet_name=d['untagged_sheet'])
-except Exception as e:
-    st.error(f"Error loading untagged sheet: {e}")
-    st.stop()
-try:
-    wrongly_mapped = pd.read_excel(d['outage_file'], sheet_name=d['wrongly_mapped_sheet'])
-except Exception as e:
-    st.error(f"Error loading wrongly mapped sheet: {e}")
-    st.stop()
 
 # --- Calculate KPIs ---
 kpi1_master_tagged = len(master)
@@ -162,7 +111,7 @@ st.plotly_chart(fig, use_container_width=True)
 st.markdown("### 🗂️ Downloadable Detailed Lists")
 
 with st.expander("Master Tagged Consumers (Sheet1, filtered for selected DTR)"):
-    st.dataframe(master, use_container_width=True)
+    detail_table(master, version=file_version(d['master_file']), key=f"{selected_feeder}-{selected_dtr}_master")
     st.download_button(
         "Download as CSV",
         data=master.to_csv(index=False),
@@ -171,7 +120,7 @@ with st.expander("Master Tagged Consumers (Sheet1, filtered for selected DTR)"):
     )
 
 with st.expander("Connected (Outage File)"):
-    st.dataframe(outage, use_container_width=True)
+    detail_table(outage, version=file_version(d['outage_file']), key=f"{selected_feeder}-{selected_dtr}_outage")
     st.download_button(
         "Download as CSV",
         data=outage.to_csv(index=False),
@@ -180,7 +129,7 @@ with st.expander("Connected (Outage File)"):
     )
 
 with st.expander("Untagged (Master Only)"):
-    st.dataframe(untagged, use_container_width=True)
+    detail_table(untagged, version=file_version(d['outage_file']), key=f"{selected_feeder}-{selected_dtr}_untagged")
     st.download_button(
         "Download as CSV",
         data=untagged.to_csv(index=False),
@@ -189,7 +138,7 @@ with st.expander("Untagged (Master Only)"):
     )
 
 with st.expander("Wrongly Mapped (Other DTR, Same Feeder)"):
-    st.dataframe(wrongly_mapped, use_container_width=True)
+    detail_table(wrongly_mapped, version=file_version(d['outage_file']), key=f"{selected_feeder}-{selected_dtr}_wrongly_mapped")
     st.download_button(
         "Download as CSV",
         data=wrongly_mapped.to_csv(index=False),
@@ -199,8 +148,12 @@ with st.expander("Wrongly Mapped (Other DTR, Same Feeder)"):
 
 # --------- CONSUMPTION TREND PLOT (ALWAYS FIRST SHEET) ---------
 consumption_file = consumption_files.get(dtr_selection)
-if consumption_file and os.path.exists(consumption_file):
+# Prefer the memory-mapped consumption store (see consumption_store.py), fall back to the workbook
+# when the DTR is not stored or its workbook changed since the store was built
+df_cons = ConsumptionStore().dlp_table(dtr_selection)
+if df_cons is None and consumption_file and os.path.exists(consumption_file):
     df_cons = pd.read_excel(consumption_file, sheet_name=0)
+if df_cons is not None:
     # Column detection (case insensitive)
     date_col = next((c for c in df_cons.columns if "date" in c.lower()), None)
     meter_col = next((c for c in df_cons.columns if "meter_count" in c.lower() or "meter count" in c.lower()), None)
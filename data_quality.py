@@ -0,0 +1,141 @@
+import argparse
+
+import pandas as pd
+
+from dtr_data import cached, cached_dtr_lists, cached_master, dtr_info, dtr_version, feeder_to_dtrs, normalize_serials
+
+# EZ meters (EZ + 7 digits) plus the all-digit serials of other makes found in the masters
+SERIAL_PATTERN = r'^(?:EZ\d{7}|\d{4,10})$'
+
+ISSUE_COLUMNS = ['check', 'source', 'feeder', 'dtrcode', 'serial', 'rows', 'detail']
+CHECKS = {
+    'duplicate_in_master': "Serial repeated under the same DTR in the master",
+    'conflicting_dtr': "Serial tagged to more than one DTR of a feeder",
+    'conflicting_feeder': "Serial present in more than one feeder master",
+    'null_dtrcode': "Master row without dtrcode",
+    'null_feedercode': "Master row without Feedercode",
+    'bad_serial': "Serial does not match SERIAL_PATTERN",
+    'duplicate_in_outage': "Serial repeated inside one outage list",
+}
+
+
+def _codes(values):
+    """DTR codes as nullable ints, so a null in the column doesn't turn 57 into 57.0."""
+    return pd.to_numeric(pd.Series(values), errors='coerce').astype('Int64')
+
+
+def _issues(check, source, df, detail=''):
+    """Rows of one check in the report layout (df has feeder/dtrcode/serial/rows columns)."""
+    out = pd.DataFrame({
+        'check': check,
+        'source': source,
+        'feeder': df['feeder'].astype(str).to_numpy(),
+        'dtrcode': df['dtrcode'].to_numpy(),
+        'serial': df['serial'].to_numpy(),
+        'rows': df['rows'].to_numpy(),
+        'detail': df['detail'].to_numpy() if 'detail' in df else detail,
+    })
+    return out[ISSUE_COLUMNS]
+
+
+def scan_masters(masters):
+    """Checks over all feeder masters ({feeder: master frame}) with one hash groupby per check."""
+    frames = []
+    for feeder, m in masters.items():
+        frames.append(pd.DataFrame({
+            'feeder': str(feeder),
+            'Feedercode': m['Feedercode'].to_numpy(),
+            'dtrcode': _codes(m['dtrcode']).array,
+            'serial': normalize_serials(m['Meter_Serial_Number']).to_numpy(),
+        }))
+    if not frames:
+        return pd.DataFrame(columns=ISSUE_COLUMNS)
+    rows = pd.concat(frames, ignore_index=True)
+    rows.loc[rows['serial'].isin(['NAN', 'NONE', '<NA>', '']), 'serial'] = None
+    issues = []
+
+    for col, check in (('dtrcode', 'null_dtrcode'), ('Feedercode', 'null_feedercode')):
+        null = rows[rows[col].isna()].assign(rows=1)
+        issues.append(_issues(check, 'master', null))
+
+    per_dtr = rows.dropna(subset=['serial', 'dtrcode']).groupby(['feeder', 'dtrcode', 'serial'], sort=False).size()
+    dup = per_dtr[per_dtr > 1].rename('rows').reset_index()
+    issues.append(_issues('duplicate_in_master', 'master', dup))
+
+    tagged = rows.dropna(subset=['serial', 'dtrcode'])
+    dtrs = tagged.groupby(['feeder', 'serial'], sort=False)['dtrcode'].agg(['nunique', 'size', lambda s: sorted(set(s))])
+    dtrs.columns = ['n', 'rows', 'dtrs']
+    conflict = dtrs[dtrs['n'] > 1].reset_index()
+    conflict = conflict.assign(dtrcode=None, detail="DTRs " + conflict['dtrs'].map(lambda d: ', '.join(map(str, d))))
+    issues.append(_issues('conflicting_dtr', 'master', conflict))
+
+    feeders = rows.dropna(subset=['serial']).groupby('serial', sort=False)['feeder'].agg(['nunique', 'size', lambda s: sorted(set(s))])
+    feeders.columns = ['n', 'rows', 'feeders']
+    conflict = feeders[feeders['n'] > 1].reset_index()
+    conflict = conflict.assign(feeder=conflict['feeders'].map(', '.join), dtrcode=None,
+                               detail="Feeders " + conflict['feeders'].map(', '.join))
+    issues.append(_issues('conflicting_feeder', 'master', conflict))
+
+    bad = rows[~rows['serial'].fillna('').str.match(SERIAL_PATTERN)].assign(rows=1)
+    issues.append(_issues('bad_serial', 'master', bad))
+    return pd.concat(issues, ignore_index=True)
+
+
+def scan_lists(key, lists):
+    """Checks over one DTR's outage and wrongly mapped lists."""
+    d = dtr_info[key]
+    issues = []
+    for name in ('outage', 'wrongly_mapped'):
+        df = lists[name]
+        if 'msn' not in df:
+            continue
+        serial = normalize_serials(df['msn'])
+        counts = serial.value_counts()
+        dup = counts[counts > 1].rename('rows').rename_axis('serial').reset_index()
+        issues.append(_issues('duplicate_in_outage', name, dup.assign(feeder=d['feeder'], dtrcode=int(d['dtr']))))
+        bad = serial[~serial.str.match(SERIAL_PATTERN)]
+        issues.append(_issues('bad_serial', name, pd.DataFrame(
+            {'serial': bad.to_numpy(), 'rows': 1, 'feeder': d['feeder'], 'dtrcode': int(d['dtr'])})))
+    return pd.concat(issues, ignore_index=True) if issues else pd.DataFrame(columns=ISSUE_COLUMNS)
+
+
+def build_report():
+    """Full data-quality report over every master and outage list in dtr_info."""
+    masters = {feeder: cached_master(feeder) for feeder in feeder_to_dtrs()}
+    parts = [scan_masters(masters)] + [scan_lists(key, cached_dtr_lists(key)) for key in dtr_info]
+    report = pd.concat(parts, ignore_index=True)
+    return report.sort_values(['check', 'feeder', 'serial'], kind='stable').reset_index(drop=True)
+
+
+def quality_report():
+    """The report, built once per data version and shared by all pages and sessions."""
+    version = '|'.join(dtr_version(key) for key in dtr_info)
+    return cached('quality', 'all', version, build_report)
+
+
+def dtr_issues(key, report=None):
+    """Issues that concern one DTR: its own rows, plus serials it shares with other DTRs or feeders."""
+    report = quality_report() if report is None else report
+    d = dtr_info[key]
+    serials = set(normalize_serials(cached_dtr_lists(key)['master']['Meter_Serial_Number']))
+    own = (report['feeder'] == d['feeder']) & (_codes(report['dtrcode']).astype(str) == d['dtr'])
+    shared = report['check'].isin(['conflicting_dtr', 'conflicting_feeder']) & report['serial'].isin(serials)
+    return report[own | shared]
+
+
+def summary(report):
+    """Issue and row counts per check."""
+    counts = report.groupby('check')['rows'].agg(issues='size', rows='sum').reindex(list(CHECKS), fill_value=0)
+    return counts.assign(description=[CHECKS[c] for c in counts.index])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Data-quality scan over all masters and outage lists")
+    parser.add_argument("--out", help="Write the full report to this CSV")
+    args = parser.parse_args()
+
+    report = build_report()
+    print(summary(report).to_string())
+    if args.out:
+        report.to_csv(args.out, index=False)
+        print(f"Wrote {len(report)} issues to {args.out}")
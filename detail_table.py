@@ -0,0 +1,144 @@
+import argparse
+import math
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from dtr_data import cached, cached_dtr_lists, dtr_info, dtr_version, find_column, normalize_serials
+
+PAGE_SIZES = [25, 50, 100, 250]
+MAX_FILTER_VALUES = 50  # columns with at most this many distinct values get a value filter
+SEARCH_COLUMN = '_serial'
+SERIAL_COLUMNS = ['Meter_Serial_Number', 'msn']
+
+
+def to_arrow(df):
+    """
+    Columnar copy of a detail list for server-side paging: object columns become
+    strings (nulls kept) so mixed int/str serials convert, plus a normalized
+    serial column for search.
+    """
+    columns = {}
+    for col in df.columns:
+        values = df[col]
+        if values.dtype == object:
+            values = values.where(values.isna(), values.astype(str))
+        columns[str(col)] = values
+    frame = pd.DataFrame(columns)
+    serial_col = next((c for c in SERIAL_COLUMNS if c in df.columns), None) or find_column(df, 'serial')
+    if serial_col is not None:
+        frame[SEARCH_COLUMN] = normalize_serials(df[serial_col]).to_numpy()
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    filterable = {}
+    for name in table.column_names:
+        if name == SEARCH_COLUMN:
+            continue
+        distinct = pc.unique(pc.cast(table[name], pa.string()).drop_null())
+        if 0 < len(distinct) <= MAX_FILTER_VALUES:
+            filterable[name] = sorted(distinct.to_pylist())
+    return table, filterable
+
+
+def arrow_list(key, name):
+    """A DTR's list as (Arrow table, filterable columns), converted once per data version."""
+    return cached('detail_table', (key, name), dtr_version(key), lambda: to_arrow(cached_dtr_lists(key)[name]))
+
+
+def filter_table(table, search=None, filters=None):
+    """Rows matching a serial substring search and equality filters ({column: value}), on the Arrow columns."""
+    mask = None
+    if search and SEARCH_COLUMN in table.column_names:
+        mask = pc.match_substring(table[SEARCH_COLUMN], search.strip().upper())
+    for col, value in (filters or {}).items():
+        cond = pc.equal(pc.cast(table[col], pa.string()), str(value))
+        mask = cond if mask is None else pc.and_(mask, cond)
+    return table if mask is None else table.filter(pc.fill_null(mask, False))
+
+
+def page_of(table, page=1, page_size=50, sort_by=None, descending=False):
+    """One page of a table as a DataFrame; when sorted, only the page's rows are taken out of the table."""
+    start = (max(page, 1) - 1) * page_size
+    if sort_by:
+        order = 'descending' if descending else 'ascending'
+        indices = pc.sort_indices(table, sort_keys=[(sort_by, order)], null_placement='at_end')
+        rows = table.take(indices.slice(start, page_size))
+    else:
+        rows = table.slice(start, page_size)
+    if SEARCH_COLUMN in rows.column_names:
+        rows = rows.drop_columns([SEARCH_COLUMN])
+    return rows.to_pandas()
+
+
+def query_page(table, page=1, page_size=50, sort_by=None, descending=False, search=None, filters=None):
+    """(page DataFrame, matching rows) after search, filters and sort."""
+    table = filter_table(table, search, filters)
+    return page_of(table, page, page_size, sort_by, descending), table.num_rows
+
+
+def detail_table(source, key, version=None):
+    """
+    Paginated Streamlit table kept on the server: search, filter and sort run on
+    the cached Arrow table and only the current page is sent to the browser.
+
+    source is a DataFrame or a (DTR key, list name) pair read from the shared
+    cache. DataFrames are converted once per `key` and version, which the caller
+    passes (e.g. file_version of the workbook the frame was read from).
+    """
+    import streamlit as st
+
+    if isinstance(source, tuple):
+        table, filterable = arrow_list(*source)
+    else:
+        if version is None:
+            raise ValueError("detail_table needs a version for DataFrame sources")
+        table, filterable = cached('detail_table', key, version, lambda: to_arrow(source))
+    columns = [c for c in table.column_names if c != SEARCH_COLUMN]
+
+    c1, c2, c3, c4 = st.columns([3, 3, 1, 1])
+    search = c1.text_input("Search serial", key=f"{key}_search") if SEARCH_COLUMN in table.column_names else ''
+    sort_by = c2.selectbox("Sort by", ["(file order)"] + columns, key=f"{key}_sort")
+    descending = c3.toggle("Desc", key=f"{key}_desc")
+    page_size = c4.selectbox("Rows", PAGE_SIZES, index=1, key=f"{key}_rows")
+    filters = {}
+    if filterable:
+        f1, f2 = st.columns(2)
+        filter_col = f1.selectbox("Filter column", ["(none)"] + list(filterable), key=f"{key}_filter_col")
+        if filter_col != "(none)":
+            filters[filter_col] = f2.selectbox("Value", filterable[filter_col], key=f"{key}_filter_value")
+
+    matching = filter_table(table, search, filters)
+    total = matching.num_rows
+    pages = max(math.ceil(total / page_size), 1)
+    page_key = f"{key}_page"
+    if st.session_state.get(page_key, 1) > pages:
+        st.session_state[page_key] = pages
+    page = st.number_input("Page", min_value=1, max_value=pages, step=1, key=page_key)
+    rows = page_of(matching, int(page), page_size, None if sort_by == "(file order)" else sort_by, descending)
+    st.dataframe(rows, use_container_width=True, hide_index=True)
+    first = (int(page) - 1) * page_size
+    st.caption(f"Rows {min(first + 1, total)}–{first + len(rows)} of {total} (page {int(page)} of {pages}, "
+               f"{table.num_rows} in list)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Page through a DTR list the way the dashboard detail tables do")
+    parser.add_argument("dtr", help="DTR key, e.g. 7088-57")
+    parser.add_argument("list", choices=['master', 'outage', 'untagged', 'wrongly_mapped'])
+    parser.add_argument("--page", type=int, default=1)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--sort")
+    parser.add_argument("--desc", action='store_true')
+    parser.add_argument("--search")
+    args = parser.parse_args()
+
+    if args.dtr not in dtr_info:
+        raise SystemExit(f"Unknown DTR {args.dtr}")
+    t0 = time.perf_counter()
+    table, _ = arrow_list(args.dtr, args.list)
+    t1 = time.perf_counter()
+    rows, total = query_page(table, args.page, args.page_size, args.sort, args.desc, args.search)
+    t2 = time.perf_counter()
+    print(rows.to_string())
+    print(f"{len(rows)} of {total} rows; convert {(t1 - t0) * 1e3:.1f} ms, page {(t2 - t1) * 1e3:.1f} ms")
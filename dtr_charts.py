@@ -0,0 +1,138 @@
+import pandas as pd
+import plotly.graph_objs as go
+import plotly.io as pio
+
+from dtr_data import cached, find_column
+
+# --- KPI bar chart labels/colors as in dashboard_final2.py ---
+KPI_LABELS = [
+    "Master Tagged",
+    "Connected (Outage)",
+    "Untagged",
+    "Wrongly Mapped",
+    "Total Corrected"
+]
+KPI_KEYS = ['master_tagged', 'connected_outage', 'untagged', 'wrongly_mapped', 'total_corrected']
+BAR_COLORS = ['#0984e3', '#27ae60', '#e74c3c', '#f39c12', '#9b59b6']
+
+
+def kpi_bar_traces(kpis):
+    kpi_values = [kpis[k] for k in KPI_KEYS]
+    return [dict(type='bar', x=KPI_LABELS, y=kpi_values, marker=dict(color=BAR_COLORS), text=kpi_values,
+                 textposition='auto')]
+
+
+def kpi_bar_layout(title):
+    return dict(title=title, yaxis_title="Number of Consumers", xaxis_title="KPI Category", bargap=0.3)
+
+
+def kpi_bar_figure(kpis, title):
+    """KPI breakdown bar chart for one DTR, from a KPI dict (reconciliation kpis())."""
+    return go.Figure(data=kpi_bar_traces(kpis), layout=kpi_bar_layout(title))
+
+
+# ---- FIGURE CACHE ----
+# Plotly template per theme ('streamlit' is registered when streamlit is imported and carries
+# its colorway and colorscales). Figures embed it pruned to what they draw; see figure_template.
+THEME_TEMPLATES = {
+    'streamlit': 'streamlit',
+    'plotly': 'plotly',
+    'plotly_white': 'plotly_white',
+    'plotly_dark': 'plotly_dark',
+}
+
+
+def figure_template(theme, traces):
+    """
+    The theme's template reduced to its layout defaults and the data defaults of
+    the trace types in traces (e.g. 1.4 KB instead of 3.5 KB per chart spec for
+    the streamlit template). None, i.e. plotly's default, if it is not registered.
+    """
+    name = THEME_TEMPLATES[theme]
+    if name not in pio.templates:
+        return None
+    template = pio.templates[name]
+    types = {t.get('type', 'scatter') for t in traces}
+    return go.layout.Template(layout=template.layout,
+                              data={t: template.data[t] for t in types if template.data[t]})
+
+
+def _changes(old, new):
+    """Properties of `new` that differ from `old` (dicts of trace or layout properties)."""
+    return {k: v for k, v in new.items() if old.get(k) != v}
+
+
+def cached_figure(kind, key, version, traces, layout, theme='streamlit'):
+    """
+    Figure of one chart kind for a DTR, cached per (DTR, data version, theme).
+
+    traces is a list of trace property dicts and layout a dict of layout
+    properties. The cached figure is already validated, so st.plotly_chart only
+    serializes it. When the version changes, the stale figure is copied and only
+    the trace and layout properties whose values changed are replaced; if
+    nothing changed the stale figure is reused as is. Pages without a data
+    version pass the plotted values themselves (e.g. a tuple of the counts), so
+    a rerun with the same counts reuses the figure.
+    """
+    def build():
+        fig = go.Figure(data=traces, layout=dict(layout, template=figure_template(theme, traces)))
+        return fig, traces, layout
+
+    def update(stale):
+        fig, old_traces, old_layout = stale
+        if [t.get('type') for t in old_traces] != [t.get('type') for t in traces] or old_layout.keys() != layout.keys():
+            return build()
+        trace_changes = [_changes(old, new) for old, new in zip(old_traces, traces)]
+        layout_changes = _changes(old_layout, layout)
+        if not any(trace_changes) and not layout_changes:
+            return fig, traces, layout
+        fig = go.Figure(fig)  # other sessions may still be serializing the stale figure
+        with fig.batch_update():
+            for trace, changes in zip(fig.data, trace_changes):
+                trace.update(changes)
+            fig.update_layout(layout_changes)
+        return fig, traces, layout
+
+    return cached(f'figure:{kind}:{theme}', key, version, build, update)[0]
+
+
+def cached_kpi_bar(key, version, kpis, title, theme='streamlit'):
+    return cached_figure('kpi_bar', key, version, kpi_bar_traces(kpis), kpi_bar_layout(title), theme)
+
+
+def trend_table(df_cons):
+    """Date / Meter Count / %Loss_DLP table from a consumption sheet, or None if columns are missing."""
+    date_col = find_column(df_cons, "date")
+    meter_col = find_column(df_cons, "meter_count", "meter count")
+    loss_col = find_column(df_cons, "loss")
+    if not (date_col and meter_col and loss_col):
+        return None
+    table_df = df_cons[[date_col, meter_col, loss_col]].copy()
+    table_df.columns = ['Date', 'Meter Count', '%Loss_DLP']
+    table_df['Date'] = pd.to_datetime(table_df['Date']).dt.date
+    return table_df
+
+
+def trend_figure(table_df, title):
+    """Dual-axis meter count / %Loss_DLP daily trend from a trend_table()."""
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=table_df['Date'], y=table_df['Meter Count'],
+        mode='lines+markers', name='Meter Count', line=dict(color='green', width=3)
+    ))
+    fig.add_trace(go.Scatter(
+        x=table_df['Date'], y=table_df['%Loss_DLP'],
+        mode='lines+markers', name='%Loss_DLP', line=dict(color='orange', width=3), yaxis='y2'
+    ))
+    fig.update_layout(
+        xaxis_title="Date",
+        yaxis=dict(title=dict(text="Meter Count", font=dict(color='green')), tickfont=dict(color='green')),
+        yaxis2=dict(title=dict(text="%Loss_DLP", font=dict(color='orange')), tickfont=dict(color='orange'),
+                    anchor="x", overlaying="y", side="right"),
+        legend=dict(x=0.5, y=1.1, orientation='h', xanchor='center'),
+        plot_bgcolor='#282828',
+        paper_bgcolor='#282828',
+        font=dict(color='#f5f6fa'),
+        title=title
+    )
+    return fig
@@ -0,0 +1,301 @@
+import contextlib
+import hashlib
+import os
+import threading
+
+import pandas as pd
+
+# === DTR info: sheet mapping as per your structure (same as dashboard_final2.py) ===
+dtr_info = {
+    "7088-57": {
+        "master_file": "Master_7088.xlsx",
+        "master_sheet": "Sheet1",
+        "outage_file": "7088-57.xlsx",
+        "outage_sheet": "outage_154",
+        "untagged_sheet": "untagged_19_meters",
+        "wrongly_mapped_sheet": "wrongly_mapped_to_72",
+        "feeder": "7088",
+        "dtr": "57"
+    },
+    "7088-32": {
+        "master_file": "Master_7088.xlsx",
+        "master_sheet": "Sheet1",
+        "outage_file": "7088-32.xlsx",
+        "outage_sheet": "Outage_37",
+        "untagged_sheet": "Untagged_4",
+        "wrongly_mapped_sheet": "32_meters_wrongly_mapped",
+        "feeder": "7088",
+        "dtr": "32"
+    },
+    "7088-86": {
+        "master_file": "Master_7088.xlsx",
+        "master_sheet": "Sheet1",
+        "outage_file": "7088-86.xlsx",
+        "outage_sheet": "outage_164",
+        "untagged_sheet": "untagged_34_meters",
+        "wrongly_mapped_sheet": "26_meter_wrongly_mapped_to _82",
+        "feeder": "7088",
+        "dtr": "86"
+    },
+    "15631-34": {
+        "master_file": "Master_Feeder_15631.xlsx",
+        "master_sheet": "Sheet1",
+        "outage_file": "15631-34.xlsx",
+        "outage_sheet": "Outage_345",
+        "untagged_sheet": "Unmapped_67",
+        "wrongly_mapped_sheet": "wrongly_mapped_40",
+        "feeder": "15631",
+        "dtr": "34"
+    }
+}
+
+# Consumption files mapping (file names only, all in current directory)
+consumption_files = {
+    "7088-57": "7088-57-consumption.xlsx",
+    "7088-32": "7088-32 consumption.xlsx",
+    "7088-86": "7088-86 consumption.xlsx",
+    "15631-34": "15631-34 consumption.xlsx"
+}
+
+# Master corrections (see master_corrections.py): corrections/<feeder>/log.jsonl plus one
+# marker file per touched DTR, so only remapped DTRs get a new data version
+CORRECTIONS_ROOT = "corrections"
+
+
+@contextlib.contextmanager
+def data_dir(path):
+    """
+    Within the block, every DTR workbook and the corrections root resolve under
+    `path` (same file names) instead of the current directory. Used by the load
+    test to run the app against synthetic workbooks.
+    """
+    global CORRECTIONS_ROOT
+    saved = ({k: dict(d) for k, d in dtr_info.items()}, dict(consumption_files), CORRECTIONS_ROOT)
+    for d in dtr_info.values():
+        for field in ('master_file', 'outage_file'):
+            d[field] = os.path.join(path, d[field])
+    for key, name in consumption_files.items():
+        consumption_files[key] = os.path.join(path, name)
+    CORRECTIONS_ROOT = os.path.join(path, CORRECTIONS_ROOT)
+    try:
+        yield path
+    finally:
+        for key, d in saved[0].items():
+            dtr_info[key].update(d)
+        consumption_files.update(saved[1])
+        CORRECTIONS_ROOT = saved[2]
+
+
+def feeder_to_dtrs():
+    """Feeder code -> list of DTR keys ("feeder-dtr"), in dtr_info order."""
+    feeders = {}
+    for key, v in dtr_info.items():
+        feeders.setdefault(v['feeder'], []).append(key)
+    return feeders
+
+
+def normalize_serials(values):
+    """Meter serials as clean upper-case strings (ints read as floats lose their '.0')."""
+    s = pd.Series(values).astype(str).str.strip().str.upper()
+    return s.str.replace(r'\.0$', '', regex=True)
+
+
+def find_column(df, *needles):
+    """First column whose lower-cased name contains any of the needles (case insensitive)."""
+    return next((c for c in df.columns if any(n in str(c).lower() for n in needles)), None)
+
+
+# ---- LOADERS ----
+def read_master(feeder):
+    """Full master sheet for a feeder (all DTRs)."""
+    d = dtr_info[feeder_to_dtrs()[feeder][0]]
+    return pd.read_excel(d['master_file'], sheet_name=d['master_sheet'])
+
+
+def _rows_like(rows, sheet):
+    """rows with the sheet's columns, in the sheet's dtypes where the values allow it."""
+    rows = rows[list(sheet.columns)].reset_index(drop=True)
+    for col in rows.columns:
+        if rows[col].dtype != sheet[col].dtype:
+            try:
+                rows[col] = rows[col].astype(sheet[col].dtype)
+            except (TypeError, ValueError):
+                pass
+    return rows
+
+
+def split_by_master(master, feeder_master, outage, untagged, wrongly_mapped):
+    """
+    Outage, untagged and wrongly mapped lists re-derived from the given master, so
+    a remap recorded in master_corrections moves meters between them: seen meters
+    (outage and wrongly mapped rows) tagged to the DTR are connected, seen meters
+    of other DTRs of the feeder are wrongly mapped (with their current DTR), and
+    tagged meters nobody saw are untagged. With the Excel master this reproduces
+    the sheets.
+    """
+    master_column = {'msn_id': 'MeterLookup_TblRefID', 'msn': 'Meter_Serial_Number'}  # untagged sheets use either
+    tagged = pd.to_numeric(master['MeterLookup_TblRefID'], errors='coerce')
+    feeder_ids = pd.to_numeric(feeder_master['MeterLookup_TblRefID'], errors='coerce')
+    seen_rows = pd.concat([outage, wrongly_mapped], ignore_index=True)
+    seen = pd.to_numeric(seen_rows['msn_id'], errors='coerce')
+    here = seen.isin(tagged).to_numpy()
+    elsewhere = ~here & seen.isin(feeder_ids).to_numpy()
+
+    wrong = _rows_like(seen_rows[elsewhere], wrongly_mapped)
+    current = feeder_master.assign(_id=feeder_ids).drop_duplicates('_id').set_index('_id')
+    wrong_ids = seen[elsewhere].to_numpy()
+    unseen = master[~tagged.isin(seen).to_numpy()]
+    for col in ('dtrcode', 'msn_id_dtr'):
+        if col in wrong and col in current:
+            wrong[col] = current[col].reindex(wrong_ids).to_numpy()
+    return {
+        'outage': _rows_like(seen_rows[here], outage),
+        'untagged': pd.DataFrame({c: unseen[master_column.get(c, c)].to_numpy()
+                                  for c in untagged.columns if master_column.get(c, c) in master}),
+        'wrongly_mapped': wrong,
+    }
+
+
+def load_dtr_lists(key, master_all=None):
+    """
+    Master-tagged, outage, untagged and wrongly mapped lists for one DTR. Given a
+    master (e.g. the corrected one from cached_master) the outage sheets are
+    re-split by it; without one the sheets are returned as read.
+    """
+    d = dtr_info[key]
+    sheets = pd.read_excel(
+        d['outage_file'],
+        sheet_name=[d['outage_sheet'], d['untagged_sheet'], d['wrongly_mapped_sheet']]
+    )
+    lists = {
+        'outage': sheets[d['outage_sheet']],
+        'untagged': sheets[d['untagged_sheet']],
+        'wrongly_mapped': sheets[d['wrongly_mapped_sheet']],
+    }
+    corrected = master_all is not None
+    if not corrected:
+        master_all = pd.read_excel(d['master_file'], sheet_name=d['master_sheet'])
+    feeder_master = master_all[master_all['Feedercode'] == int(d['feeder'])]
+    master = feeder_master[feeder_master['dtrcode'] == int(d['dtr'])]
+    if corrected:
+        lists = split_by_master(master, feeder_master, **lists)
+    return {'master': master, **lists}
+
+
+def sheet_kpis(lists):
+    """The five KPIs of the dashboard_final2.py KPI block, as plain ints."""
+    kpis = {
+        'master_tagged': len(lists['master']),
+        'connected_outage': len(lists['outage']),
+        'untagged': len(lists['untagged']),
+        'wrongly_mapped': len(lists['wrongly_mapped']),
+    }
+    kpis['total_corrected'] = kpis['connected_outage'] + kpis['wrongly_mapped']
+    return kpis
+
+
+def read_consumption(key):
+    """Daily DLP table (first sheet) of a DTR's consumption workbook, or None if there is none."""
+    consumption_file = consumption_files.get(key)
+    if not consumption_file or not os.path.exists(consumption_file):
+        return None
+    return pd.read_excel(consumption_file, sheet_name=0)
+
+
+# ---- SHARED CACHE ----
+def file_version(*paths):
+    """Short hash of the files' size and mtime; changes whenever any of them is rewritten."""
+    h = hashlib.sha1()
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            h.update(f"{path}:{stat.st_mtime_ns}:{stat.st_size};".encode())
+        except OSError:
+            h.update(f"{path}:missing;".encode())
+    return h.hexdigest()[:16]
+
+
+def correction_marker(key):
+    """File touched whenever a master correction moves a meter into or out of this DTR."""
+    d = dtr_info[key]
+    return os.path.join(CORRECTIONS_ROOT, d['feeder'], 'touched', d['dtr'])
+
+
+def dtr_version(key):
+    """Data version of one DTR: its master, outage and consumption workbooks and its master corrections."""
+    d = dtr_info[key]
+    return file_version(d['master_file'], d['outage_file'], consumption_files.get(key, ''), correction_marker(key))
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+_build_locks = {}  # (name, key) -> [lock, callers holding or waiting on it]; dropped when unused
+
+
+def cached(name, key, version, build, update=None):
+    """
+    Process-wide cache holding one value per (name, key), rebuilt when the version changes.
+
+    Stale versions are replaced rather than kept, so the cache stays bounded by the
+    number of DTRs times the number of cached result kinds. Concurrent callers of the
+    same entry wait for one build instead of each parsing the workbooks. When given,
+    update(stale value) derives the new value from the stale one instead of build().
+    """
+    with _cache_lock:
+        hit = _cache.get((name, key))
+        if hit is not None and hit[0] == version:
+            return hit[1]
+        entry = _build_locks.setdefault((name, key), [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            with _cache_lock:
+                hit = _cache.get((name, key))
+            if hit is not None and hit[0] == version:
+                return hit[1]
+            value = update(hit[1]) if hit is not None and update is not None else build()
+            with _cache_lock:
+                _cache[(name, key)] = (version, value)
+        return value
+    finally:
+        with _cache_lock:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _build_locks[(name, key)]
+
+
+def cached_value(name, key, version):
+    """The cached value of (name, key) if it is current, else None; never builds."""
+    with _cache_lock:
+        hit = _cache.get((name, key))
+    return hit[1] if hit is not None and hit[0] == version else None
+
+
+def invalidate(keys=None):
+    """Drop cached results for the given DTR keys (all if None)."""
+    with _cache_lock:
+        for cache_key in list(_cache):
+            if keys is None or cache_key[1] in keys:
+                del _cache[cache_key]
+
+
+def cached_master(feeder):
+    """Effective master of a feeder: base version + correction log, each cached by its own version."""
+    from master_corrections import CorrectionLog  # imports dtr_data itself
+    log = CorrectionLog(feeder)
+    base = cached('master_base', feeder, log.base_version(), log.read_base)
+    return cached('master', feeder, log.version(), lambda: log.effective(base))
+
+
+def cached_dtr_lists(key):
+    return cached('lists', key, dtr_version(key),
+                  lambda: load_dtr_lists(key, cached_master(dtr_info[key]['feeder'])))
+
+
+def cached_sheet(path, sheet):
+    """One sheet of a workbook, re-read only when the file changes."""
+    return cached('sheet', (path, sheet), file_version(path), lambda: pd.read_excel(path, sheet_name=sheet))
+
+
+def cached_consumption(key):
+    return cached('consumption', key, dtr_version(key), lambda: read_consumption(key))
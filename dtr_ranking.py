@@ -0,0 +1,114 @@
+import argparse
+import heapq
+import itertools
+
+import pandas as pd
+
+from dtr_data import feeder_to_dtrs, find_column, load_dtr_lists, read_consumption, read_master
+from reconciliation import reconcile_lists
+
+# Metrics a DTR can be ranked by (higher = worse)
+RANK_METRICS = {
+    "untagged_pct": "Untagged %",
+    "wrongly_mapped": "Wrongly Mapped",
+    "loss_pct": "Avg Loss %",
+}
+
+
+def avg_loss_pct(key):
+    """Average daily %Loss_DLP from the DTR's consumption workbook (None if not available)."""
+    df_cons = read_consumption(key)
+    if df_cons is None:
+        return None
+    loss_col = find_column(df_cons, "loss")
+    if loss_col is None:
+        return None
+    loss = pd.to_numeric(df_cons[loss_col], errors='coerce').dropna()
+    return float(loss.mean()) if len(loss) else None
+
+
+def iter_dtr_kpis(feeders=None, with_loss=True):
+    """
+    Yield one small KPI record per DTR, feeder by feeder.
+
+    The master is read once per feeder; each DTR's detail lists are dropped as
+    soon as they are counted, so only one DTR's lists are ever held in memory.
+    """
+    for feeder, keys in feeder_to_dtrs().items():
+        if feeders and feeder not in feeders:
+            continue
+        master_all = read_master(feeder)
+        for key in keys:
+            lists = load_dtr_lists(key, master_all)
+            kpis = reconcile_lists(key, lists, master_all).kpis()
+            del lists
+            tagged = kpis['master_tagged']
+            record = {
+                'dtr_key': key,
+                'feeder': feeder,
+                'dtr': key.split('-', 1)[1],
+                **kpis,
+                'untagged_pct': kpis['untagged'] / tagged * 100 if tagged > 0 else 0.0,
+                'loss_pct': avg_loss_pct(key) if with_loss else None,
+            }
+            yield record
+        del master_all
+
+
+class TopN:
+    """Bounded min-heaps keeping the N worst records for each ranking metric."""
+
+    def __init__(self, n, metrics=tuple(RANK_METRICS)):
+        self.n = n
+        self.heaps = {m: [] for m in metrics}
+        self._tiebreak = itertools.count()
+
+    def push(self, record):
+        for metric, heap in self.heaps.items():
+            value = record.get(metric)
+            if value is None:
+                continue
+            item = (value, -next(self._tiebreak), record)
+            if len(heap) < self.n:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+
+    def ranking(self, metric):
+        """Worst-first DataFrame for one metric."""
+        rows = [rec for _, _, rec in sorted(self.heaps[metric], reverse=True)]
+        df = pd.DataFrame(rows)
+        if not df.empty:
+            df.insert(0, 'rank', range(1, len(df) + 1))
+        return df
+
+
+def rank_dtrs(n=20, feeders=None, with_loss=True):
+    """Stream every DTR's KPIs through a TopN and return it."""
+    top = TopN(n)
+    for record in iter_dtr_kpis(feeders, with_loss=with_loss):
+        top.push(record)
+    return top
+
+
+def export_rankings(top, path):
+    """Write one CSV per ranking metric: <path>_<metric>.csv. Returns the file names."""
+    written = []
+    for metric in top.heaps:
+        fname = f"{path}_{metric}.csv"
+        top.ranking(metric).to_csv(fname, index=False)
+        written.append(fname)
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rank the worst-tagged DTRs across all feeders")
+    parser.add_argument("-n", type=int, default=20, help="How many DTRs to keep per ranking")
+    parser.add_argument("--feeder", action="append", help="Restrict to feeder(s); repeatable")
+    parser.add_argument("--no-loss", action="store_true", help="Skip reading consumption workbooks")
+    parser.add_argument("--out", default="worst_dtrs", help="Output file prefix for the CSVs")
+    args = parser.parse_args()
+
+    top = rank_dtrs(args.n, args.feeder, with_loss=not args.no_loss)
+    for fname in export_rankings(top, args.out):
+        print("Wrote", fname)
@@ -0,0 +1,148 @@
+import argparse
+import os
+import time
+
+import pandas as pd
+import xlsxwriter
+
+from dtr_data import cached_master, cached_value, dtr_info, dtr_version, feeder_to_dtrs, load_dtr_lists
+from reconciliation import reconcile_lists
+
+# Sheet order per DTR, mirroring the hand-built 7088-57.xlsx (master_173, outage_154, ...)
+LIST_SHEETS = [
+    ('master', 'master'),
+    ('outage', 'outage'),
+    ('untagged', 'untagged'),
+    ('wrongly_mapped', 'wrongly_mapped'),
+    ('corrections', 'corrections'),
+]
+
+CORRECTION_COLUMNS = ['msn_id', 'msn', 'event_101_ts', 'current_dtrcode', 'current_msn_id_dtr',
+                      'suggested_dtrcode', 'suggested_msn_id_dtr']
+
+
+def suggested_corrections(key, lists):
+    """Remaps for wrongly mapped meters: seen in this DTR's outage but tagged to another DTR of the feeder."""
+    wrong = lists['wrongly_mapped']
+    master = lists['master']
+    dtr = key.split('-', 1)[1]
+    this_dtr_msn = master['msn_id_dtr'].dropna().iloc[0] if 'msn_id_dtr' in master and master['msn_id_dtr'].notna().any() else None
+    out = pd.DataFrame({
+        'msn_id': wrong.get('msn_id'),
+        'msn': wrong.get('msn'),
+        'event_101_ts': wrong.get('event_101_ts'),
+        'current_dtrcode': wrong.get('dtrcode'),
+        'current_msn_id_dtr': wrong.get('msn_id_dtr'),
+    }, index=wrong.index)
+    out['suggested_dtrcode'] = int(dtr) if dtr.isdigit() else dtr
+    out['suggested_msn_id_dtr'] = this_dtr_msn
+    return out[CORRECTION_COLUMNS].reset_index(drop=True)
+
+
+def sheet_name(dtr, list_name, n_rows):
+    """'57_outage_154' style names, trimmed to Excel's 31-character limit."""
+    return f"{dtr}_{list_name}_{n_rows}"[:31]
+
+
+class _StreamingSheet:
+    """Row-by-row writer for one worksheet; cells are converted as they are written."""
+
+    def __init__(self, workbook, name, columns, formats):
+        self.ws = workbook.add_worksheet(name)
+        self.formats = formats
+        self.row = 0
+        self.ws.write_row(0, 0, [str(c) for c in columns], formats['header'])
+        self.ws.freeze_panes(1, 0)
+        self.widths = [max(10, len(str(c)) + 2) for c in columns]
+        for i, w in enumerate(self.widths):
+            self.ws.set_column(i, i, w)
+
+    def write(self, values):
+        self.row += 1
+        for col, v in enumerate(values):
+            if v is None or v is pd.NaT or (isinstance(v, float) and v != v) or v is pd.NA:
+                continue
+            if isinstance(v, pd.Timestamp):
+                self.ws.write_datetime(self.row, col, v.to_pydatetime(), self.formats['datetime'])
+            elif hasattr(v, 'item'):  # numpy scalar
+                self.ws.write(self.row, col, v.item())
+            else:
+                self.ws.write(self.row, col, v)
+
+
+def _write_frame(workbook, name, df, formats):
+    sheet = _StreamingSheet(workbook, name, df.columns, formats)
+    for values in df.itertuples(index=False, name=None):
+        sheet.write(values)
+    return sheet.row
+
+
+def _dtr_lists_and_kpis(key):
+    """
+    A DTR's lists and KPIs, taken from the shared cache when current there, else
+    read and reconciled without being cached, so an export of a feeder holds one
+    DTR's lists at a time.
+    """
+    version = dtr_version(key)
+    master_all = cached_master(dtr_info[key]['feeder'])
+    lists = cached_value('lists', key, version)
+    if lists is None:
+        lists = load_dtr_lists(key, master_all)
+    result = cached_value('reconciliation', key, version)
+    if result is None:
+        result = reconcile_lists(key, lists, master_all)
+    return lists, result.kpis()
+
+
+def export_feeder(feeder, path, keys=None):
+    """
+    Feeder-wide workbook: a summary sheet, then for every DTR one sheet per list
+    (master, outage, untagged, wrongly mapped, suggested corrections).
+
+    DTRs are processed one at a time (load, write, release) and the workbook is
+    written in xlsxwriter's constant_memory mode, which flushes each row to disk
+    as soon as the next one starts; the summary sheet fills up alongside. Memory
+    is bounded by the largest DTR, not the feeder. Returns {sheet name: rows written}.
+    """
+    keys = keys or feeder_to_dtrs().get(str(feeder), [])
+    if not keys:
+        raise ValueError(f"No DTRs configured for feeder {feeder}")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+    formats = {
+        'header': workbook.add_format({'bold': True, 'bg_color': '#dfe6e9', 'border': 1}),
+        'datetime': workbook.add_format({'num_format': 'yyyy-mm-dd hh:mm'}),
+    }
+    written = {}
+    try:
+        summary = _StreamingSheet(workbook, 'summary', ['dtr_key', 'master_tagged', 'connected_outage', 'untagged',
+                                                        'wrongly_mapped', 'total_corrected'], formats)
+        for key in keys:
+            lists, k = _dtr_lists_and_kpis(key)
+            summary.write([key, k['master_tagged'], k['connected_outage'], k['untagged'],
+                           k['wrongly_mapped'], k['total_corrected']])
+            lists = dict(lists, corrections=suggested_corrections(key, lists))
+            dtr = key.split('-', 1)[1]
+            for list_key, list_name in LIST_SHEETS:
+                df = lists[list_key]
+                name = sheet_name(dtr, list_name, len(df))
+                written[name] = _write_frame(workbook, name, df, formats)
+            del lists
+        written = {'summary': summary.row, **written}
+    finally:
+        workbook.close()
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a feeder-wide workbook of DTR lists and suggested corrections")
+    parser.add_argument("feeder", help="Feeder code, e.g. 7088")
+    parser.add_argument("--out", help="Output .xlsx (default Feeder_<feeder>_export.xlsx)")
+    args = parser.parse_args()
+
+    out = args.out or f"Feeder_{args.feeder}_export.xlsx"
+    t0 = time.perf_counter()
+    written = export_feeder(args.feeder, out)
+    for name, rows in written.items():
+        print(f"{name}: {rows} rows")
+    print(f"Wrote {out} in {time.perf_counter() - t0:.2f}s")
@@ -1,7 +1,9 @@
 import streamlit as st
-import pandas as pd
 import plotly.graph_objs as go
 
+from detail_table import detail_table
+from dtr_data import cached_sheet, file_version
+
 st.set_page_config(page_title="DTR Outage KPIs Dashboard", layout="wide")
 
 # === Mapping DTRs, feeders, and their file/sheet structure ===
@@ -66,11 +68,11 @@ d = dtr_info[key]
 
 # --- LOAD DATA ---
 # Master (always filter for this DTR)
-master_all = pd.read_excel(d['master_file'], sheet_name=d['master_sheet'])
+master_all = cached_sheet(d['master_file'], d['master_sheet'])
 master = master_all[(master_all['dtrcode'] == int(d['dtr'])) & (master_all['Feedercode'] == int(d['feeder']))]
-outage = pd.read_excel(d['outage_file'], sheet_name=d['outage_sheet'])
-untagged = pd.read_excel(d['outage_file'], sheet_name=d['untagged_sheet'])
-wrongly_mapped = pd.read_excel(d['outage_file'], sheet_name=d['wrongly_mapped_sheet'])
+outage = cached_sheet(d['outage_file'], d['outage_sheet'])
+untagged = cached_sheet(d['outage_file'], d['untagged_sheet'])
+wrongly_mapped = cached_sheet(d['outage_file'], d['wrongly_mapped_sheet'])
 
 # --- Calculate KPIs ---
 kpi1_master_tagged = len(master)
@@ -135,7 +137,7 @@ st.plotly_chart(fig, use_container_width=True)
 st.markdown("### 🗂️ Downloadable Detailed Lists")
 
 with st.expander("Master Tagged Consumers (Sheet1, filtered for selected DTR)"):
-    st.dataframe(master, use_container_width=True)
+    detail_table(master, version=file_version(d['master_file']), key=f"{selected_feeder}-{selected_dtr}_master")
     st.download_button(
         "Download as CSV",
         data=master.to_csv(index=False),
@@ -144,7 +146,7 @@ with st.expander("Master Tagged Consumers (Sheet1, filtered for selected DTR)"):
     )
 
 with st.expander("Connected (Outage File)"):
-    st.dataframe(outage, use_container_width=True)
+    detail_table(outage, version=file_version(d['outage_file']), key=f"{selected_feeder}-{selected_dtr}_outage")
     st.download_button(
         "Download as CSV",
         data=outage.to_csv(index=False),
@@ -153,7 +155,7 @@ with st.expander("Connected (Outage File)"):
     )
 
 with st.expander("Untagged (Master Only)"):
-    st.dataframe(untagged, use_container_width=True)
+    detail_table(untagged, version=file_version(d['outage_file']), key=f"{selected_feeder}-{selected_dtr}_untagged")
     st.download_button(
         "Download as CSV",
         data=untagged.to_csv(index=False),
@@ -162,7 +164,7 @@ with st.expander("Untagged (Master Only)"):
     )
 
 with st.expander("Wrongly Mapped (Other DTR, Same Feeder)"):
-    st.dataframe(wrongly_mapped, use_container_width=True)
+    detail_table(wrongly_mapped, version=file_version(d['outage_file']), key=f"{selected_feeder}-{selected_dtr}_wrongly_mapped")
     st.download_button(
         "Download as CSV",
         data=wrongly_mapped.to_csv(index=False),
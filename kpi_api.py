@@ -0,0 +1,177 @@
+"""
+Read-only JSON API over the DTR reconciliation results.
+
+  GET /dtrs                                   DTR keys with their data versions
+  GET /kpis                                   KPI block for every DTR
+  GET /dtrs/<key>/kpis                        KPI block for one DTR
+  GET /dtrs/<key>/lists/<list>?page=&page_size=
+                                              master | outage | untagged | wrongly_mapped
+  GET /dtrs/<key>/consumption                 daily meter count and %Loss_DLP series
+
+Every response carries an ETag derived from the data version of the workbooks
+behind it; a request whose If-None-Match matches gets a 304 without any
+workbook being read or any result being recomputed.
+"""
+import argparse
+import hashlib
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+from dtr_data import cached, cached_consumption, cached_dtr_lists, dtr_info, dtr_version, find_column
+from reconciliation import dtr_kpis
+
+LISTS = ('master', 'outage', 'untagged', 'wrongly_mapped')
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 5000
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _records(df):
+    return json.loads(df.to_json(orient='records', date_format='iso'))
+
+
+# ---- RESOURCES: (key, version, build) so the ETag is known before building ----
+# key identifies the response by its parsed parameters only; unknown or
+# reordered query parameters map to the same key and the same cached body.
+def _check_key(key):
+    if key not in dtr_info:
+        raise ApiError(404, f"Unknown DTR '{key}'")
+
+
+def dtrs_resource(query):
+    versions = {key: dtr_version(key) for key in dtr_info}
+    version = hashlib.sha1(json.dumps(versions, sort_keys=True).encode()).hexdigest()[:16]
+    return ('dtrs',), version, lambda: [
+        {'dtr_key': key, 'feeder': d['feeder'], 'dtr': d['dtr'], 'version': versions[key]}
+        for key, d in dtr_info.items()
+    ]
+
+
+def kpis_resource(key):
+    _check_key(key)
+    return ('kpis', key), dtr_version(key), lambda: cached(
+        'kpis', key, dtr_version(key), lambda: {'dtr_key': key, **dtr_kpis(key)}
+    )
+
+
+def all_kpis_resource(query):
+    _, version, _ = dtrs_resource(query)
+    return ('kpis',), version, lambda: [kpis_resource(key)[2]() for key in dtr_info]
+
+
+def list_resource(key, name, query):
+    _check_key(key)
+    if name not in LISTS:
+        raise ApiError(404, f"Unknown list '{name}', expected one of {', '.join(LISTS)}")
+    try:
+        page = max(int(query.get('page', ['1'])[0]), 1)
+        page_size = min(max(int(query.get('page_size', [str(DEFAULT_PAGE_SIZE)])[0]), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        raise ApiError(400, "page and page_size must be integers")
+
+    def build():
+        df = cached_dtr_lists(key)[name]
+        pages = (len(df) + page_size - 1) // page_size
+        if page > max(pages, 1):
+            raise ApiError(404, f"Page {page} out of range, list has {pages} pages")
+        start = (page - 1) * page_size
+        return {
+            'dtr_key': key, 'list': name, 'page': page, 'page_size': page_size,
+            'total': len(df), 'pages': pages,
+            'rows': _records(df.iloc[start:start + page_size]),
+        }
+    return ('list', key, name, page, page_size), dtr_version(key), build
+
+
+def consumption_resource(key):
+    _check_key(key)
+
+    def build():
+        df_cons = cached_consumption(key)
+        if df_cons is None:
+            raise ApiError(404, f"No consumption file for DTR '{key}'")
+        date_col = find_column(df_cons, "date")
+        meter_col = find_column(df_cons, "meter_count", "meter count")
+        loss_col = find_column(df_cons, "loss")
+        if not (date_col and meter_col and loss_col):
+            raise ApiError(422, "Consumption file found but required columns not detected")
+        table_df = df_cons[[date_col, meter_col, loss_col]].copy()
+        table_df.columns = ['date', 'meter_count', 'loss_pct']
+        table_df['date'] = pd.to_datetime(table_df['date']).dt.strftime('%Y-%m-%d')
+        return {'dtr_key': key, 'rows': _records(table_df)}
+    return ('consumption', key), dtr_version(key), build
+
+
+def route(path, query):
+    parts = [p for p in path.split('/') if p]
+    if parts == ['dtrs']:
+        return dtrs_resource(query)
+    if parts == ['kpis']:
+        return all_kpis_resource(query)
+    if len(parts) == 3 and parts[0] == 'dtrs' and parts[2] == 'kpis':
+        return kpis_resource(parts[1])
+    if len(parts) == 4 and parts[0] == 'dtrs' and parts[2] == 'lists':
+        return list_resource(parts[1], parts[3], query)
+    if len(parts) == 3 and parts[0] == 'dtrs' and parts[2] == 'consumption':
+        return consumption_resource(parts[1])
+    raise ApiError(404, f"No route for {path}")
+
+
+# ---- HTTP ----
+class KpiApiHandler(BaseHTTPRequestHandler):
+    server_version = "DTRKpiApi/1.0"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        try:
+            key, version, build = route(url.path, query)
+            etag = '"' + hashlib.sha1(f"{version}|{key}".encode()).hexdigest()[:20] + '"'
+            if etag in [t.strip() for t in self.headers.get('If-None-Match', '').split(',')]:
+                self._send(304, etag=etag)
+                return
+            body = cached('body', key, version, lambda: json.dumps(build()).encode())
+            self._send(200, body, etag=etag)
+        except ApiError as e:
+            self._send(e.status, json.dumps({'error': str(e)}).encode())
+        except Exception as e:
+            self._send(500, json.dumps({'error': f"{type(e).__name__}: {e}"}).encode())
+
+    def _send(self, status, body=b'', etag=None):
+        self.send_response(status)
+        if etag:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+        if status != 304:
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(body)
+
+
+def serve(host='127.0.0.1', port=8600):
+    server = ThreadingHTTPServer((host, port), KpiApiHandler)
+    print(f"DTR KPI API on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local JSON API for DTR KPIs and detail lists")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    args = parser.parse_args()
+    serve(args.host, args.port)
@@ -0,0 +1,265 @@
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from bench_history import append_row
+from dtr_data import consumption_files, data_dir, dtr_info, feeder_to_dtrs
+
+try:
+    import psutil
+except ImportError:  # RSS/CPU then come from resource.getrusage (peak RSS only)
+    psutil = None
+
+FIELDS = ['timestamp', 'app', 'sessions', 'actions', 'meters_per_dtr', 'reruns', 'errors',
+          'p50_s', 'p95_s', 'p99_s', 'max_s', 'first_run_p50_s', 'wall_s', 'throughput_rps',
+          'rss_start_mb', 'rss_peak_mb', 'cpu_pct']
+
+_opened = []  # every file this process opens once the first load test starts (audit hook)
+_hooked = False
+
+
+def _record_open(event, args):
+    if event == 'open' and isinstance(args[0], (str, bytes, os.PathLike)):
+        _opened.append(os.path.abspath(os.fsdecode(args[0])))
+
+
+def _check_workbooks(workbook_dir, since):
+    """
+    Fail unless the apps read the synthetic workbooks: some DTR workbook under
+    workbook_dir has been opened, and no workbook of the same name elsewhere
+    (e.g. the real ones in the current directory) was opened during this run.
+    """
+    names = {os.path.basename(d[f]) for d in dtr_info.values() for f in ('master_file', 'outage_file')}
+    names |= {os.path.basename(p) for p in consumption_files.values()}
+    workbooks = [p for p in _opened if os.path.basename(p) in names]
+    if not any(os.path.dirname(p) == workbook_dir for p in workbooks):
+        raise RuntimeError(f"No synthetic workbook under {workbook_dir} was opened")
+    elsewhere = sorted({p for p in workbooks[since:] if os.path.dirname(p) != workbook_dir})
+    if elsewhere:
+        raise RuntimeError(f"Apps read workbooks outside {workbook_dir}: {elsewhere}")
+
+
+# ---- SYNTHETIC DATA ----
+def write_synthetic_workbooks(out_dir, meters_per_dtr=200, days=30, seed=0):
+    """
+    Master, outage and consumption workbooks for every DTR in dtr_info, with the
+    real file names, sheet names and columns, filled with random meters.
+    Each feeder also gets two extra DTRs that supply the wrongly mapped meters.
+    """
+    rng = np.random.default_rng(seed)
+    next_id = 17000000
+    event = pd.Timestamp('2025-06-08 13:48')
+    for feeder, keys in feeder_to_dtrs().items():
+        dtrs = [int(dtr_info[k]['dtr']) for k in keys] + [901, 902]
+        frames = []
+        for i, dtr in enumerate(dtrs):
+            ids = np.arange(next_id, next_id + meters_per_dtr)
+            next_id += meters_per_dtr
+            frames.append(pd.DataFrame({
+                'Feedercode': int(feeder),
+                'dtrcode': dtr,
+                'dtrname': f"DTR {dtr}",
+                'dtr_msn': 1572000 + dtr,
+                'msn_id_dtr': 18257000 + dtr,
+                'locationname': rng.choice(['Main road', 'Temple road', 'School lane', 'Market'], len(ids)),
+                'Meter_Serial_Number': [f"EZ{n:07d}" for n in ids - 16000000],
+                'MeterLookup_TblRefID': ids,
+                'meterphase_name': rng.choice(['1 PH', '3PH WC'], len(ids), p=[0.85, 0.15]),
+            }))
+        master = pd.concat(frames, ignore_index=True)
+        d0 = dtr_info[keys[0]]
+        with pd.ExcelWriter(os.path.join(out_dir, d0['master_file']), engine='xlsxwriter') as writer:
+            master.to_excel(writer, sheet_name=d0['master_sheet'], index=False)
+
+        others = master[master['dtrcode'] >= 900]
+        for key in keys:
+            d = dtr_info[key]
+            mine = master[master['dtrcode'] == int(d['dtr'])]
+            seen = rng.random(len(mine)) < 0.9
+            wrong = others.sample(max(1, meters_per_dtr // 20), random_state=int(rng.integers(1 << 31)))
+            starts = event + pd.to_timedelta(rng.integers(0, 3, seen.sum()), unit='min')
+            outage = pd.DataFrame({
+                'msn_id': mine['MeterLookup_TblRefID'][seen].to_numpy(),
+                'msn': mine['Meter_Serial_Number'][seen].to_numpy(),
+                'event_101_ts': starts,
+                'event_102_ts': starts + pd.Timedelta(minutes=14),
+                'diff': 14,
+            })
+            wrong_starts = event + pd.to_timedelta(rng.integers(0, 3, len(wrong)), unit='min')
+            wrongly = pd.DataFrame({
+                'msn_id': wrong['MeterLookup_TblRefID'].to_numpy(),
+                'msn': wrong['Meter_Serial_Number'].to_numpy(),
+                'event_101_ts': wrong_starts,
+                'event_102_ts': wrong_starts + pd.Timedelta(minutes=13),
+                'diff': 13,
+                'dtrcode': wrong['dtrcode'].to_numpy(),
+                'msn_id_dtr': wrong['msn_id_dtr'].to_numpy(),
+            })
+            untagged = mine.loc[~seen, ['Meter_Serial_Number', 'MeterLookup_TblRefID']]
+            with pd.ExcelWriter(os.path.join(out_dir, d['outage_file']), engine='xlsxwriter') as writer:
+                outage.to_excel(writer, sheet_name=d['outage_sheet'], index=False)
+                untagged.to_excel(writer, sheet_name=d['untagged_sheet'], index=False)
+                wrongly.to_excel(writer, sheet_name=d['wrongly_mapped_sheet'], index=False)
+
+            if key in consumption_files:
+                dtr_kwh = rng.normal(700, 40, days)
+                consumer_kwh = dtr_kwh * rng.uniform(0.8, 0.95, days)
+                dlp = pd.DataFrame({
+                    'reading_date': pd.date_range('2025-06-01', periods=days, freq='D'),
+                    'msn_id': 18257000 + int(d['dtr']),
+                    'msn': 1572000 + int(d['dtr']),
+                    'diff_consumption_DTR': dtr_kwh,
+                    'meter_count': len(mine) - rng.integers(0, 5, days),
+                    'total_daily_consumption_consumer': consumer_kwh,
+                    'loss%': (dtr_kwh - consumer_kwh) / dtr_kwh * 100,
+                })
+                with pd.ExcelWriter(os.path.join(out_dir, consumption_files[key]), engine='xlsxwriter') as writer:
+                    dlp.to_excel(writer, sheet_name='DLP consumption consumer,DTR', index=False)
+
+
+# ---- RESOURCE SAMPLING ----
+class ResourceSampler(threading.Thread):
+    """Samples this process's RSS (and CPU if psutil is available) while the sessions run."""
+
+    def __init__(self, interval=0.2):
+        super().__init__(name="load-test-sampler", daemon=True)
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.rss_peak = self.rss_start = self._rss()
+        self.proc = psutil.Process() if psutil else None
+        self.cpu_start = self._cpu_time()
+        self.t_start = time.perf_counter()
+
+    @staticmethod
+    def _rss():
+        if psutil:
+            return psutil.Process().memory_info().rss
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # kB on Linux
+
+    def _cpu_time(self):
+        if psutil:
+            t = psutil.Process().cpu_times()
+            return t.user + t.system
+        return time.process_time()
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            self.rss_peak = max(self.rss_peak, self._rss())
+
+    def stop(self):
+        self.stop_event.set()
+        self.join()
+        self.rss_peak = max(self.rss_peak, self._rss())
+        wall = time.perf_counter() - self.t_start
+        return {
+            'rss_start_mb': self.rss_start / 2 ** 20,
+            'rss_peak_mb': self.rss_peak / 2 ** 20,
+            'cpu_pct': 100 * (self._cpu_time() - self.cpu_start) / wall if wall else 0.0,
+        }
+
+
+# ---- SESSIONS ----
+def run_session(app, actions, seed, timeout=120):
+    """
+    One simulated user: a first run, then random feeder/DTR switches and plain
+    reruns (expanders are rendered on every run, so their content is included).
+    Returns (first_run_s, [rerun latencies], errors).
+    """
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed)
+    at = AppTest.from_file(app, default_timeout=timeout)
+    t0 = time.perf_counter()
+    at.run()
+    first = time.perf_counter() - t0
+    errors = len(at.exception)
+    latencies = []
+    for _ in range(actions):
+        boxes = list(at.sidebar.selectbox)
+        if boxes and rng.random() < 0.8:
+            box = boxes[0] if rng.random() < 0.3 else boxes[-1]
+            box.select(rng.choice(box.options))
+        t0 = time.perf_counter()
+        at.run()
+        latencies.append(time.perf_counter() - t0)
+        errors += len(at.exception)
+    return first, latencies, errors
+
+
+def load_test(app="app.py", sessions=8, actions=20, meters_per_dtr=200, workbook_dir=None, seed=0):
+    """
+    Run `sessions` concurrent AppTest sessions against synthetic workbooks and
+    summarise rerun latency percentiles, throughput, RSS and CPU.
+
+    All sessions share this process, like sessions on one Streamlit server, so
+    the process-wide caches and their build locks are exercised as in production.
+    Raises RuntimeError if the apps did not read the synthetic workbooks.
+    """
+    global _hooked
+    if not _hooked:  # audit hooks cannot be removed, so install it once per process
+        sys.addaudithook(_record_open)
+        _hooked = True
+    app = os.path.abspath(app)
+    with tempfile.TemporaryDirectory() as tmp:
+        workbook_dir = os.path.abspath(workbook_dir or tmp)
+        if not os.path.exists(os.path.join(workbook_dir, dtr_info[next(iter(dtr_info))]['master_file'])):
+            write_synthetic_workbooks(workbook_dir, meters_per_dtr, seed=seed)
+        since = len(_opened)
+        with data_dir(workbook_dir):
+            sampler = ResourceSampler()
+            sampler.start()
+            t0 = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=sessions) as pool:
+                results = list(pool.map(lambda i: run_session(app, actions, seed + i), range(sessions)))
+            wall = time.perf_counter() - t0
+            resources = sampler.stop()
+        _check_workbooks(workbook_dir, since)
+
+    latencies = np.array([t for _, lat, _ in results for t in lat]) if actions else np.zeros(1)
+    firsts = np.array([first for first, _, _ in results])
+    return {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'app': os.path.basename(app),
+        'sessions': sessions,
+        'actions': actions,
+        'meters_per_dtr': meters_per_dtr,
+        'reruns': int(len(latencies)),
+        'errors': sum(e for _, _, e in results),
+        'p50_s': float(np.percentile(latencies, 50)),
+        'p95_s': float(np.percentile(latencies, 95)),
+        'p99_s': float(np.percentile(latencies, 99)),
+        'max_s': float(latencies.max()),
+        'first_run_p50_s': float(np.percentile(firsts, 50)),
+        'wall_s': wall,
+        'throughput_rps': (len(latencies) + sessions) / wall,
+        **resources,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for the Streamlit dashboards")
+    parser.add_argument("--app", default="app.py")
+    parser.add_argument("--sessions", type=int, nargs='+', default=[1, 4, 8], help="Concurrent sessions per step")
+    parser.add_argument("--actions", type=int, default=20, help="Feeder/DTR switches per session")
+    parser.add_argument("--meters-per-dtr", type=int, default=200)
+    parser.add_argument("--data-dir", help="Reuse (or create) synthetic workbooks here")
+    parser.add_argument("--out", help="CSV history to append to")
+    args = parser.parse_args()
+
+    for n in args.sessions:
+        row = load_test(args.app, n, args.actions, args.meters_per_dtr, args.data_dir)
+        if args.out:
+            append_row(args.out, row, FIELDS)
+        print(f"{n:>3} sessions | p50 {row['p50_s']:.3f}s p95 {row['p95_s']:.3f}s p99 {row['p99_s']:.3f}s | "
+              f"{row['throughput_rps']:.1f} runs/s | RSS peak {row['rss_peak_mb']:.0f} MB | "
+              f"CPU {row['cpu_pct']:.0f}% | errors {row['errors']}")
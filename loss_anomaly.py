@@ -0,0 +1,194 @@
+import argparse
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from consumption_store import ConsumptionStore, read_consumption_workbook
+from dtr_data import consumption_files
+
+# Metrics tracked per DTR-day, with the smallest MAD used for scoring (avoids divide-by-zero on flat series)
+METRICS = {'loss_pct': 0.5, 'meter_count': 1.0}
+MAD_SCALE = 0.6745  # makes MAD comparable to a standard deviation
+
+
+class LossAnomalyDetector:
+    """
+    Rolling median/MAD anomaly detection for every DTR at once.
+
+    History is a ring buffer of shape (window, metric, n_dtrs); each update scores
+    the new day against the median/MAD of the previous `window` days and then
+    stores it, so a day costs O(window * n_dtrs) regardless of how long the
+    series is.
+    """
+
+    def __init__(self, dtr_keys, window=14, threshold=3.5, min_history=5):
+        self.dtr_keys = list(dtr_keys)
+        self.window = window
+        self.threshold = threshold
+        self.min_history = min_history
+        self.metrics = list(METRICS)
+        self.min_mad = np.array([METRICS[m] for m in self.metrics])[:, None]
+        self.history = np.full((window, len(self.metrics), len(self.dtr_keys)), np.nan)
+        self.pos = 0
+        self.last_date = None
+
+    def update(self, date, values):
+        """
+        Score one day and add it to the history.
+
+        values: {metric: array of len(dtr_keys)} (NaN where a DTR has no reading).
+        Returns a DataFrame of the flagged DTR-days.
+        """
+        date = pd.Timestamp(date).normalize()
+        if self.last_date is not None and date <= self.last_date:
+            raise ValueError(f"Day {date.date()} is not after the last update {self.last_date.date()}")
+        today = np.vstack([np.asarray(values.get(m, np.full(len(self.dtr_keys), np.nan)), dtype=float)
+                           for m in self.metrics])
+
+        seen = np.sum(~np.isnan(self.history), axis=0)
+        with warnings.catch_warnings():
+            # nanmedian warns on all-NaN slices (DTRs with no history yet); expected here
+            warnings.simplefilter('ignore', RuntimeWarning)
+            median = np.nanmedian(self.history, axis=0)
+            mad = np.nanmedian(np.abs(self.history - median), axis=0)
+        mad = np.maximum(np.nan_to_num(mad), self.min_mad)
+        z = MAD_SCALE * (today - median) / mad
+        flagged = (np.abs(z) > self.threshold) & (seen >= self.min_history) & ~np.isnan(today)
+
+        self.history[self.pos] = today
+        self.pos = (self.pos + 1) % self.window
+        self.last_date = date
+
+        m_idx, d_idx = np.nonzero(flagged)
+        return pd.DataFrame({
+            'date': date,
+            'dtr_key': [self.dtr_keys[i] for i in d_idx],
+            'metric': [self.metrics[i] for i in m_idx],
+            'value': today[m_idx, d_idx],
+            'median': median[m_idx, d_idx],
+            'mad': mad[m_idx, d_idx],
+            'z': z[m_idx, d_idx],
+        })
+
+    def run(self, daily):
+        """Replay a tidy (dtr_key, date, loss_pct, meter_count) frame day by day; returns all alerts."""
+        alerts = []
+        for date, values in daily_matrices(daily, self.dtr_keys, self.metrics):
+            if self.last_date is not None and date <= self.last_date:
+                continue
+            alerts.append(self.update(date, values))
+        return pd.concat(alerts, ignore_index=True) if alerts else _empty_alerts()
+
+    # ---- STATE ----
+    def save(self, path):
+        np.savez_compressed(
+            path, history=self.history, pos=self.pos, dtr_keys=np.array(self.dtr_keys),
+            params=np.array([self.window, self.threshold, self.min_history]), metrics=np.array(self.metrics),
+            last_date=np.array(str(self.last_date.date()) if self.last_date is not None else ''),
+        )
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path, allow_pickle=False)
+        metrics = data['metrics'].tolist() if 'metrics' in data else None
+        if metrics != list(METRICS):
+            raise ValueError(f"State {path} was saved for metrics {metrics}, not {list(METRICS)}")
+        window, threshold, min_history = data['params']
+        det = cls(data['dtr_keys'].tolist(), int(window), float(threshold), int(min_history))
+        det.history = data['history']
+        det.pos = int(data['pos'])
+        last = str(data['last_date'])
+        det.last_date = pd.Timestamp(last) if last else None
+        return det
+
+    def mismatch(self, window, threshold, min_history):
+        """Why a saved detector cannot be resumed with these parameters (None if it can)."""
+        saved, wanted = (self.window, self.threshold, self.min_history), (window, threshold, min_history)
+        if saved != wanted:
+            return f"parameters changed (window, threshold, min_history {saved} -> {wanted})"
+        return None
+
+    def with_dtrs(self, dtr_keys):
+        """
+        The detector for another DTR set: DTRs kept keep their history, new DTRs
+        start empty (and are scored once they have min_history days), dropped
+        ones are forgotten.
+        """
+        dtr_keys = list(dtr_keys)
+        if dtr_keys == self.dtr_keys:
+            return self
+        det = type(self)(dtr_keys, self.window, self.threshold, self.min_history)
+        old = {k: i for i, k in enumerate(self.dtr_keys)}
+        kept = [(i, old[k]) for i, k in enumerate(dtr_keys) if k in old]
+        if kept:
+            new_idx, old_idx = map(list, zip(*kept))
+            det.history[:, :, new_idx] = self.history[:, :, old_idx]
+        det.pos, det.last_date = self.pos, self.last_date
+        return det
+
+
+def _empty_alerts():
+    return pd.DataFrame(columns=['date', 'dtr_key', 'metric', 'value', 'median', 'mad', 'z'])
+
+
+def daily_matrices(daily, dtr_keys, metrics=tuple(METRICS)):
+    """Pivot a tidy daily frame to one {metric: vector over dtr_keys} per date, oldest first."""
+    daily = daily.assign(date=pd.to_datetime(daily['date']).dt.normalize())
+    pivots = {m: daily.pivot_table(index='date', columns='dtr_key', values=m, aggfunc='mean')
+              .reindex(columns=dtr_keys) for m in metrics if m in daily.columns}
+    dates = sorted(set().union(*[p.index for p in pivots.values()])) if pivots else []
+    for date in dates:
+        yield date, {m: p.loc[date].to_numpy() if date in p.index else np.full(len(dtr_keys), np.nan)
+                     for m, p in pivots.items()}
+
+
+def load_daily_loss(keys=None, store=None):
+    """Tidy (dtr_key, date, loss_pct, meter_count) from the store's dlp_loss_pct series or the workbooks."""
+    store = store or ConsumptionStore()
+    frames = []
+    for key in keys or list(consumption_files):
+        df = store.dtr_frame(key, 'dlp_loss_pct')
+        if df.empty:
+            df = read_consumption_workbook(key)
+            df = df[df['series'] == 'dlp_loss_pct']
+        frames.append(df)
+    if not frames:
+        return pd.DataFrame(columns=['dtr_key', 'date', 'loss_pct', 'meter_count'])
+    df = pd.concat(frames, ignore_index=True)
+    return df.rename(columns={'ts': 'date', 'value': 'loss_pct'})[['dtr_key', 'date', 'loss_pct', 'meter_count']]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Flag anomalous DTR-days in daily loss % and meter count")
+    parser.add_argument("--window", type=int, default=14)
+    parser.add_argument("--threshold", type=float, default=3.5)
+    parser.add_argument("--min-history", type=int, default=5)
+    parser.add_argument("--state", help="npz file to resume from and save to (incremental runs)")
+    parser.add_argument("--out", help="Write alerts CSV")
+    args = parser.parse_args()
+
+    daily = load_daily_loss()
+    dtr_keys = sorted(daily['dtr_key'].unique())
+    try:
+        det = LossAnomalyDetector.load(args.state) if args.state else None
+    except FileNotFoundError:
+        det = None
+    except ValueError as e:
+        print(f"Starting fresh: {e}")
+        det = None
+    reason = det and det.mismatch(args.window, args.threshold, args.min_history)
+    if reason:
+        print(f"Starting fresh: state {args.state} does not match, {reason}")
+        det = None
+    if det is not None and det.dtr_keys != dtr_keys:
+        added, dropped = set(dtr_keys) - set(det.dtr_keys), set(det.dtr_keys) - set(dtr_keys)
+        print(f"DTR set changed: {len(added)} added (no history yet), {len(dropped)} dropped")
+        det = det.with_dtrs(dtr_keys)
+    det = det or LossAnomalyDetector(dtr_keys, args.window, args.threshold, args.min_history)
+    alerts = det.run(daily)
+    print(alerts.to_string(index=False) if len(alerts) else "No anomalies")
+    if args.state:
+        det.save(args.state)
+    if args.out:
+        alerts.to_csv(args.out, index=False)
@@ -0,0 +1,164 @@
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from consumption_store import tidy_consumption
+from dtr_data import consumption_files, dtr_info
+from outage_sketches import circle_of
+from reconciliation import dtr_kpis
+
+DAILY_COLUMNS = ['circle', 'feeder', 'dtr_key', 'date', 'meter_count', 'dtr_kwh', 'consumer_kwh', 'loss_pct',
+                 'corrected_meter_count', 'corrected_consumer_kwh', 'corrected_loss_pct']
+SUM_COLUMNS = ['meter_count', 'dtr_kwh', 'consumer_kwh', 'corrected_meter_count', 'corrected_consumer_kwh']
+
+
+def _loss_pct(dtr_kwh, consumer_kwh):
+    return (dtr_kwh - consumer_kwh) / dtr_kwh.where(dtr_kwh != 0) * 100
+
+
+def daily_loss(key, tidy, kpis=None):
+    """
+    Daily loss table of one DTR from its tidy consumption frame.
+
+    loss_pct is the workbook's %Loss_DLP (computed from the DTR and consumer
+    consumption where the sheet has none). The corrected series (given the DTR's
+    reconciliation KPIs) is measured against the population the sheet reports,
+    its largest daily meter_count, not the master-tagged meters: the meters that
+    report on a day are taken as a fair sample of that population, so the day's
+    meter count and consumption are scaled by total_corrected / population. A
+    corrected meter count thus never exceeds total_corrected, and a sheet that
+    already reports the corrected population is left as it is. Without KPIs it
+    equals the raw series.
+    """
+    dlp = tidy[tidy['series'].isin(['dlp_dtr', 'dlp_consumer', 'dlp_loss_pct'])]
+    values = dlp.pivot_table(index='ts', columns='series', values='value', aggfunc='last')
+    meters = pd.to_numeric(dlp['meter_count'], errors='coerce').groupby(dlp['ts']).max()
+    out = pd.DataFrame({
+        'date': values.index,
+        'meter_count': meters.reindex(values.index).to_numpy(),
+        'dtr_kwh': values.get('dlp_dtr', pd.Series(np.nan, index=values.index)).to_numpy(),
+        'consumer_kwh': values.get('dlp_consumer', pd.Series(np.nan, index=values.index)).to_numpy(),
+    })
+    computed = _loss_pct(out['dtr_kwh'], out['consumer_kwh'])
+    loss = values['dlp_loss_pct'].to_numpy() if 'dlp_loss_pct' in values else computed
+    out['loss_pct'] = pd.Series(loss).fillna(computed).to_numpy()
+    population = out['meter_count'].max()
+    share = kpis['total_corrected'] / population if kpis and population > 0 else 1.0
+    out['corrected_meter_count'] = out['meter_count'] * share
+    out['corrected_consumer_kwh'] = out['consumer_kwh'] * share
+    out['corrected_loss_pct'] = _loss_pct(out['dtr_kwh'], out['corrected_consumer_kwh'])
+    out['dtr_key'] = key
+    out['feeder'] = dtr_info[key]['feeder'] if key in dtr_info else key.split('-', 1)[0]
+    out['circle'] = circle_of(key)
+    return out[DAILY_COLUMNS]
+
+
+def _workbook_loss(task):
+    """Worker: parse one consumption workbook and compute its daily loss. Returns (key, frame, error)."""
+    key, path = task
+    try:
+        tidy = tidy_consumption(key, pd.read_excel(path, sheet_name=None))
+        return key, daily_loss(key, tidy, dtr_kpis(key) if key in dtr_info else None), None
+    except Exception as e:
+        return key, None, f"{type(e).__name__}: {e}"
+
+
+def batch_loss(tasks=None, workers=None):
+    """
+    Daily loss for many DTR workbooks ({key: path} or (key, path) pairs, default
+    consumption_files) in a process pool. Tasks are ordered by feeder and handed out
+    in chunks, so a worker reuses the feeder master it has cached. Returns (daily
+    frame, failures).
+    """
+    tasks = consumption_files if tasks is None else tasks
+    tasks = list(tasks.items() if hasattr(tasks, 'items') else tasks)
+    items = sorted(((k, p) for k, p in tasks if os.path.exists(p)), key=lambda kp: kp[0].split('-', 1)[0])
+    failures = {k: "Consumption file not found" for k, p in tasks if not os.path.exists(p)}
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(items) // (workers * 8))
+    frames = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for key, frame, error in pool.map(_workbook_loss, items, chunksize=chunksize):
+            if error:
+                failures[key] = error
+            else:
+                frames.append(frame)
+    daily = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=DAILY_COLUMNS)
+    return daily.sort_values(['circle', 'feeder', 'dtr_key', 'date'], kind='stable').reset_index(drop=True), failures
+
+
+def feeder_table(daily, by=('circle', 'feeder'), complete_only=True):
+    """
+    Daily loss per feeder (or circle): consumption summed over DTRs, loss recomputed from the sums.
+
+    A DTR counts on a day only when both its DTR and consumer kWh are present;
+    `dtrs` is that coverage next to `dtrs_total`, the group's DTRs. Days some DTRs
+    miss are dropped unless complete_only is False.
+    """
+    by = list(by)
+    valid = daily[daily['dtr_kwh'].notna() & daily['consumer_kwh'].notna()]
+    grouped = valid.groupby(by + ['date'], sort=True)
+    table = grouped[SUM_COLUMNS].sum(min_count=1)
+    table.insert(0, 'dtrs', grouped['dtr_key'].nunique())
+    totals = daily.groupby(by)['dtr_key'].nunique()
+    table.insert(1, 'dtrs_total', totals.reindex(table.index.droplevel('date')).to_numpy())
+    if complete_only:
+        table = table[table['dtrs'] == table['dtrs_total']]
+    table['loss_pct'] = _loss_pct(table['dtr_kwh'], table['consumer_kwh'])
+    table['corrected_loss_pct'] = _loss_pct(table['dtr_kwh'], table['corrected_consumer_kwh'])
+    return table.reset_index()
+
+
+def _synthetic_tasks(out_dir, n):
+    """
+    n (key, path) copies of the real consumption workbooks, each under its real DTR
+    key, so workers reconcile against dtr_info and reuse the cached feeder masters
+    as the real batch does.
+    """
+    sources = [(k, p) for k, p in consumption_files.items() if os.path.exists(p)]
+    tasks = []
+    for i in range(n):
+        key, source = sources[i % len(sources)]
+        path = os.path.join(out_dir, f"{i}_{os.path.basename(source)}")
+        shutil.copyfile(source, path)
+        tasks.append((key, path))
+    return tasks
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Daily loss and corrected loss for every consumption workbook")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--by", nargs='+', default=['circle', 'feeder'], help="Levels of the merged table")
+    parser.add_argument("--partial", action='store_true', help="Keep days that some DTRs of a group miss")
+    parser.add_argument("--out", help="Write the merged table to this CSV")
+    parser.add_argument("--daily-out", help="Write the per-DTR daily table to this parquet file")
+    parser.add_argument("--bench", type=int, metavar="N", help="Time N synthetic workbooks for 1..CPU workers")
+    args = parser.parse_args()
+
+    if args.bench:
+        with tempfile.TemporaryDirectory() as tmp:
+            tasks = _synthetic_tasks(tmp, args.bench)
+            cpus = os.cpu_count() or 1
+            counts = sorted({2 ** i for i in range(cpus.bit_length())} | {cpus, args.workers or 1})
+            for workers in counts:
+                t0 = time.perf_counter()
+                daily, failures = batch_loss(tasks, workers)
+                seconds = time.perf_counter() - t0
+                print(f"{workers:>3} workers: {seconds:6.2f}s  {len(tasks) / seconds:7.1f} workbooks/s  "
+                      f"{len(daily)} rows, {len(failures)} failures")
+    else:
+        daily, failures = batch_loss(workers=args.workers)
+        table = feeder_table(daily, args.by, complete_only=not args.partial)
+        print(table.to_string(index=False))
+        for key, err in failures.items():
+            print(f"FAILED {key}: {err}")
+        if args.out:
+            table.to_csv(args.out, index=False)
+        if args.daily_out:
+            daily.to_parquet(args.daily_out, index=False)
@@ -0,0 +1,266 @@
+import argparse
+import contextlib
+import datetime
+import glob
+import json
+import os
+import re
+import time
+
+import pandas as pd
+
+import dtr_data
+from dtr_data import dtr_info, file_version, invalidate, read_master
+
+METER_ID = 'MeterLookup_TblRefID'
+# Columns that describe the DTR a meter hangs off; a remap takes them from the new DTR's rows
+DTR_COLUMNS = ['dtrcode', 'dtrname', 'dtr_msn', 'msn_id_dtr']
+LOCK_TIMEOUT = 30.0  # seconds to wait for another writer before giving up
+COMPACT_EVERY = 500  # log entries after which record() compacts, bounding what every read parses
+
+
+def apply_remaps(master, entries):
+    """
+    Master with the remaps applied in log order (the last remap of a meter wins).
+
+    Copy-on-write: only the DTR columns are replaced, the rest of the frame is
+    shared with the base version.
+    """
+    if not entries:
+        return master
+    new_dtr = pd.DataFrame(entries).drop_duplicates('meter_id', keep='last').set_index('meter_id')['new_dtr']
+    ids = pd.to_numeric(master[METER_ID], errors='coerce')
+    target = ids.map(new_dtr)
+    moved = target.notna()
+    if not moved.any():
+        return master
+
+    # Attributes of each DTR (name, DTR meter) from any of its rows in the base
+    cols = [c for c in DTR_COLUMNS if c in master.columns]
+    dtr_attrs = master[cols].drop_duplicates('dtrcode').set_index('dtrcode')
+    out = master.copy(deep=False)
+    for col in cols:
+        values = target[moved].astype(master['dtrcode'].dtype) if col == 'dtrcode' else \
+            target[moved].map(dtr_attrs[col])
+        column = out[col].copy()
+        column[moved] = values
+        out[col] = column
+    return out
+
+
+class CorrectionLog:
+    """
+    Append-only log of confirmed remaps for one feeder's master.
+
+      corrections/<feeder>/log.jsonl         remaps since the last compaction, one per line:
+                                             seq, meter, old/new DTR, who, when
+      corrections/<feeder>/log_<v>.jsonl     the remaps folded into base version v (history)
+      corrections/<feeder>/base.json         current compacted base version and the last seq it contains
+      corrections/<feeder>/base_<v>.parquet  compacted master (base + log up to that seq); the
+                                             previous version is kept until the next compaction
+      corrections/<feeder>/touched/<dtr>     marker per DTR, part of dtr_data.dtr_version
+      corrections/<feeder>/log.lock          held (O_EXCL) while a process appends or compacts
+
+    The effective master is the base version with the later log entries applied
+    on read; the Excel master is never rewritten. root defaults to
+    dtr_data.CORRECTIONS_ROOT, the root dtr_version reads the markers from.
+    """
+
+    def __init__(self, feeder, root=None):
+        self.feeder = str(feeder)
+        self.dir = os.path.join(dtr_data.CORRECTIONS_ROOT if root is None else root, self.feeder)
+        self.log_path = os.path.join(self.dir, 'log.jsonl')
+        self.base_meta_path = os.path.join(self.dir, 'base.json')
+        self.lock_path = os.path.join(self.dir, 'log.lock')
+
+    def marker_path(self, dtr):
+        return os.path.join(self.dir, 'touched', str(dtr))
+
+    @contextlib.contextmanager
+    def _locked(self, timeout=LOCK_TIMEOUT):
+        """Exclusive across processes and threads: the lock file is created with O_EXCL and removed on exit."""
+        os.makedirs(self.dir, exist_ok=True)
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"{self.lock_path} is held by another writer; "
+                                       f"remove it if no correction is being recorded")
+                time.sleep(0.05)
+        try:
+            os.write(fd, str(os.getpid()).encode())
+            yield
+        finally:
+            os.close(fd)
+            os.remove(self.lock_path)
+
+    # ---- BASE VERSION ----
+    def base_meta(self):
+        if not os.path.exists(self.base_meta_path):
+            return {'version': 0, 'applied_seq': 0, 'path': None}
+        with open(self.base_meta_path) as f:
+            return json.load(f)
+
+    def _master_file(self):
+        return next(d['master_file'] for d in dtr_info.values() if d['feeder'] == self.feeder)
+
+    def base_version(self):
+        meta = self.base_meta()
+        return file_version(meta['path'] or self._master_file(), self.base_meta_path)
+
+    def read_base(self):
+        """The compacted base master, or the Excel master before the first compaction."""
+        meta = self.base_meta()
+        return pd.read_parquet(meta['path']) if meta['path'] else read_master(self.feeder)
+
+    def version(self):
+        """Version of the effective master: base version plus log."""
+        return self.base_version() + file_version(self.log_path)
+
+    # ---- LOG ----
+    def _history_path(self, version):
+        return os.path.join(self.dir, f'log_{version}.jsonl')
+
+    @staticmethod
+    def _read_log(path):
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def entries(self, after_seq=0):
+        """Remaps in log.jsonl (those since the last compaction) newer than after_seq."""
+        return [e for e in self._read_log(self.log_path) if e['seq'] > after_seq]
+
+    def history(self):
+        """Every remap ever recorded, compacted ones included, in seq order."""
+        paths = sorted(glob.glob(os.path.join(self.dir, 'log_*.jsonl')),
+                       key=lambda p: int(re.search(r'log_(\d+)\.jsonl$', p).group(1)))
+        by_seq = {e['seq']: e for path in paths + [self.log_path] for e in self._read_log(path)}
+        return [by_seq[seq] for seq in sorted(by_seq)]
+
+    def effective(self, base=None):
+        """Effective master: base + log entries newer than the base."""
+        base = self.read_base() if base is None else base
+        return apply_remaps(base, self.entries(after_seq=self.base_meta()['applied_seq']))
+
+    def _dtr_keys(self, *dtrs):
+        dtrs = {str(d) for d in dtrs}
+        return [k for k, d in dtr_info.items() if d['feeder'] == self.feeder and d['dtr'] in dtrs]
+
+    def record(self, meter_id, new_dtr, who, old_dtr=None, when=None, note=''):
+        """
+        Append one confirmed remap and invalidate only the two DTRs it touches.
+        Raises ValueError for an unknown meter or DTR, or an old DTR that does not match.
+        The meter's current DTR is checked under the lock, against the master as
+        of the last recorded remap. Compacts once COMPACT_EVERY remaps are pending.
+        """
+        with self._locked():
+            meta = self.base_meta()
+            pending = self.entries(after_seq=meta['applied_seq'])
+            master = apply_remaps(self.read_base(), pending)
+            ids = pd.to_numeric(master[METER_ID], errors='coerce')
+            rows = master[ids == int(meter_id)]
+            if rows.empty:
+                raise ValueError(f"Meter {meter_id} is not in the feeder {self.feeder} master")
+            current = int(rows['dtrcode'].iloc[0])
+            if old_dtr is not None and int(old_dtr) != current:
+                raise ValueError(f"Meter {meter_id} is tagged to DTR {current}, not {old_dtr}")
+            if int(new_dtr) == current:
+                raise ValueError(f"Meter {meter_id} is already tagged to DTR {new_dtr}")
+            if int(new_dtr) not in set(master['dtrcode'].dropna().astype(int)):
+                raise ValueError(f"DTR {new_dtr} does not exist on feeder {self.feeder}")
+
+            entry = {
+                'seq': (pending[-1]['seq'] if pending else meta['applied_seq']) + 1,
+                'meter_id': int(meter_id),
+                'serial': str(rows['Meter_Serial_Number'].iloc[0]) if 'Meter_Serial_Number' in rows else None,
+                'old_dtr': current,
+                'new_dtr': int(new_dtr),
+                'who': who,
+                'when': when or datetime.datetime.now().isoformat(timespec='seconds'),
+                'note': note,
+            }
+            with open(self.log_path, 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            if len(pending) + 1 >= COMPACT_EVERY:
+                self._compact()
+
+        for dtr in (current, new_dtr):
+            marker = self.marker_path(dtr)
+            os.makedirs(os.path.dirname(marker), exist_ok=True)
+            with open(marker, 'w') as f:
+                f.write(str(entry['seq']))
+        invalidate(self._dtr_keys(current, new_dtr))
+        return entry
+
+    def compact(self):
+        """
+        Write base + log as a new parquet base version and move the folded entries
+        from log.jsonl to log_<version>.jsonl, so reads only parse the remaps since.
+        The previous base stays on disk for readers that resolved it before the switch
+        and is removed by the next compaction; older ones are removed now.
+        """
+        with self._locked():
+            return self._compact()
+
+    def _compact(self):
+        meta = self.base_meta()
+        pending = self.entries(after_seq=meta['applied_seq'])
+        if not pending:
+            return meta
+        effective = apply_remaps(self.read_base(), pending)
+        version = meta['version'] + 1
+        path = os.path.join(self.dir, f'base_{version}.parquet')
+        # Serial columns mix ints and strings in the Excel masters; store them as text
+        text_cols = effective.select_dtypes(include=['object', 'string']).columns
+        effective = effective.assign(**{c: effective[c].where(effective[c].isna(), effective[c].astype(str))
+                                        for c in text_cols})
+        effective.to_parquet(path, index=False)
+        new_meta = {'version': version, 'applied_seq': pending[-1]['seq'], 'path': path}
+        tmp = self.base_meta_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(new_meta, f)
+        os.replace(tmp, self.base_meta_path)
+        # Rotate the log: entries up to applied_seq move to this version's history file
+        # (re-running after a crash between the two replaces only duplicates seqs, which history() drops)
+        entries = self._read_log(self.log_path)
+        for path, keep in ((self._history_path(version), [e for e in entries if e['seq'] <= new_meta['applied_seq']]),
+                           (self.log_path, [e for e in entries if e['seq'] > new_meta['applied_seq']])):
+            with open(path + '.tmp', 'w') as f:
+                f.writelines(json.dumps(e) + '\n' for e in keep)
+            os.replace(path + '.tmp', path)
+        for old in glob.glob(os.path.join(self.dir, 'base_*.parquet')):
+            old_version = re.search(r'base_(\d+)\.parquet$', old)
+            if old_version and int(old_version.group(1)) < meta['version']:
+                os.remove(old)
+        return new_meta
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record, list and compact master corrections for a feeder")
+    parser.add_argument("feeder")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("remap", help="Move a meter to another DTR")
+    p.add_argument("meter_id", type=int, help="MeterLookup_TblRefID")
+    p.add_argument("new_dtr", type=int)
+    p.add_argument("--who", required=True)
+    p.add_argument("--old-dtr", type=int)
+    p.add_argument("--note", default='')
+    sub.add_parser("log", help="Print the correction log")
+    sub.add_parser("compact", help="Fold the log into a new parquet base version")
+    args = parser.parse_args()
+
+    log = CorrectionLog(args.feeder)
+    if args.cmd == "remap":
+        print(log.record(args.meter_id, args.new_dtr, args.who, args.old_dtr, note=args.note))
+    elif args.cmd == "log":
+        for e in log.history():
+            print(f"#{e['seq']} {e['when']} {e['who']}: meter {e['meter_id']} ({e['serial']}) DTR {e['old_dtr']} -> {e['new_dtr']}")
+    else:
+        print(log.compact())
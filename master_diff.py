@@ -0,0 +1,117 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from dtr_data import find_column, normalize_serials
+
+KEY = 'Meter_Serial_Number'
+TAG_FIELDS = ['dtrcode', 'Feedercode', 'meterphase_name']
+
+
+def _prepare(master):
+    """Normalized serial key, last row wins for repeated serials."""
+    df = master.copy()
+    df[KEY] = normalize_serials(df[KEY]).values
+    return df.drop_duplicates(KEY, keep='last')
+
+
+def diff_masters(old, new, fields=TAG_FIELDS):
+    """
+    Compare two master versions on the normalized Meter_Serial_Number.
+
+    Returns a dict of DataFrames:
+      added      meters only in the new master
+      retired    meters only in the old master
+      changed    meters whose tagging fields differ (<field>_old / <field>_new, changed_fields)
+      invalidated  (Feedercode, dtrcode) pairs whose KPIs must be recomputed, with counts
+    """
+    old, new = _prepare(old), _prepare(new)
+    fields = [f for f in fields if f in old.columns and f in new.columns]
+
+    # Hash join: factorize both key columns together into one integer code space,
+    # then align the two versions by code with plain array indexing.
+    codes, uniques = pd.factorize(pd.concat([old[KEY], new[KEY]], ignore_index=True))
+    old_codes, new_codes = codes[:len(old)], codes[len(old):]
+    pos_in_new = np.full(len(uniques), -1, dtype=np.int64)
+    pos_in_new[new_codes] = np.arange(len(new))
+    in_old = np.zeros(len(uniques), dtype=bool)
+    in_old[old_codes] = True
+
+    old_match = pos_in_new[old_codes]
+    added = new[~in_old[new_codes]]
+    retired = old[old_match < 0]
+
+    both_old = np.flatnonzero(old_match >= 0)
+    both_new = old_match[both_old]
+    diff_mask = {}
+    for f in fields:
+        a = old[f].iloc[both_old].reset_index(drop=True)
+        b = new[f].iloc[both_new].reset_index(drop=True)
+        diff_mask[f] = (a.ne(b) & ~(a.isna() & b.isna())).to_numpy()
+    any_diff = np.logical_or.reduce(list(diff_mask.values())) if fields else np.zeros(len(both_old), bool)
+
+    changed = pd.DataFrame({KEY: old[KEY].iloc[both_old[any_diff]].to_numpy()})
+    for f in fields:
+        changed[f + '_old'] = old[f].iloc[both_old[any_diff]].to_numpy()
+        changed[f + '_new'] = new[f].iloc[both_new[any_diff]].to_numpy()
+    changed['changed_fields'] = pd.Series([''] * len(changed), dtype=object)
+    for f in fields:
+        hit = diff_mask[f][any_diff]
+        changed.loc[hit, 'changed_fields'] = changed.loc[hit, 'changed_fields'] + ', ' + f
+    changed['changed_fields'] = changed['changed_fields'].str.lstrip(', ')
+
+    invalidated = invalidated_dtrs(added, retired, changed)
+    return {'added': added, 'retired': retired, 'changed': changed, 'invalidated': invalidated}
+
+
+def _dtr_of(df, suffix=''):
+    """Serial, Feedercode and dtrcode of each row, wherever the frame keeps them (missing columns are NaN)."""
+    feeder_col = find_column(df, 'feedercode' + suffix)
+    dtr_col = find_column(df, 'dtrcode' + suffix)
+    return pd.DataFrame({
+        KEY: df[KEY].to_numpy(),
+        'Feedercode': df[feeder_col].to_numpy() if feeder_col else np.nan,
+        'dtrcode': df[dtr_col].to_numpy() if dtr_col else np.nan,
+    })
+
+
+def invalidated_dtrs(added, retired, changed):
+    """
+    DTRs gaining or losing meters: new meters, retired meters, and both sides of
+    every re-tag. Each meter counts once per DTR, so a change that keeps the
+    meter on its DTR (e.g. phase only) is not counted twice.
+    """
+    parts = [_dtr_of(added).assign(reason='added'), _dtr_of(retired).assign(reason='retired')]
+    if len(changed) and find_column(changed, 'dtrcode_old'):
+        parts += [_dtr_of(changed, '_old').assign(reason='changed'), _dtr_of(changed, '_new').assign(reason='changed')]
+    touched = pd.concat(parts, ignore_index=True).dropna(subset=['dtrcode'])
+    touched = touched.drop_duplicates([KEY, 'Feedercode', 'dtrcode', 'reason'])
+    if touched.empty:
+        return pd.DataFrame(columns=['Feedercode', 'dtrcode', 'added', 'retired', 'changed'])
+    counts = touched.groupby(['Feedercode', 'dtrcode', 'reason'], dropna=False).size().unstack(fill_value=0)
+    counts = counts.reindex(columns=['added', 'retired', 'changed'], fill_value=0).reset_index()
+    counts.columns.name = None
+    return counts.sort_values(['Feedercode', 'dtrcode']).reset_index(drop=True)
+
+
+def diff_summary(diff):
+    return {name: len(df) for name, df in diff.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Diff two master versions (xlsx or csv)")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--out", help="Write added/retired/changed/invalidated CSVs with this prefix")
+    args = parser.parse_args()
+
+    def read(path):
+        return pd.read_csv(path) if path.lower().endswith('.csv') else pd.read_excel(path)
+
+    result = diff_masters(read(args.old), read(args.new))
+    print(diff_summary(result))
+    print(result['invalidated'].to_string(index=False))
+    if args.out:
+        for name, df in result.items():
+            df.to_csv(f"{args.out}_{name}.csv", index=False)
@@ -0,0 +1,149 @@
+import argparse
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+from pyroaring import BitMap
+
+from dtr_data import dtr_info, feeder_to_dtrs, load_dtr_lists, read_master
+from reconciliation import seen_ids
+from snapshot_history import snapshot_date
+
+# Integer meter IDs: MeterLookup_TblRefID in the masters is the same ID as msn_id in outage sheets
+MASTER_ID = 'MeterLookup_TblRefID'
+
+
+def id_array(values):
+    """Meter IDs as a uint32 array (rows without a valid ID are dropped)."""
+    ids = pd.to_numeric(pd.Series(values), errors='coerce').dropna()
+    ids = ids[(ids >= 0) & (ids < 2 ** 32)]
+    return ids.astype(np.uint32).to_numpy()
+
+
+class MembershipIndex:
+    """
+    Compressed (Roaring) meter-ID sets for DTR membership and outage events.
+
+      dtrs[(feeder, dtr)]  meters tagged to a DTR in the master
+      feeders[feeder]      meters tagged anywhere on the feeder
+      events[event_id]     meters seen in one outage event, with event_meta[event_id]
+
+    Reconciliation is then bitmap algebra: intersections and differences of
+    compressed sets, independent of how the serials are spelled.
+    """
+
+    def __init__(self):
+        self.dtrs = {}
+        self.feeders = {}
+        self.events = {}
+        self.event_meta = {}
+
+    # ---- BUILD ----
+    def add_master(self, master):
+        """Index a master frame: one bitmap per (Feedercode, dtrcode), one per feeder."""
+        df = master[['Feedercode', 'dtrcode', MASTER_ID]].copy()
+        df[MASTER_ID] = pd.to_numeric(df[MASTER_ID], errors='coerce')
+        df = df.dropna()
+        for (feeder, dtr), rows in df.groupby(['Feedercode', 'dtrcode']).indices.items():
+            key = (str(int(feeder)), str(int(dtr)))
+            self.dtrs[key] = BitMap(id_array(df[MASTER_ID].to_numpy()[rows]))
+        for feeder in df['Feedercode'].unique():
+            feeder = str(int(feeder))
+            self.feeders[feeder] = BitMap.union(*[bm for (f, _), bm in self.dtrs.items() if f == feeder])
+
+    def add_event(self, event_id, meter_ids, dtr_key=None, date=None):
+        self.events[event_id] = BitMap(id_array(meter_ids))
+        self.event_meta[event_id] = {'dtr_key': dtr_key, 'date': None if date is None else str(pd.Timestamp(date).date())}
+
+    def events_for(self, dtr_key=None, start=None, end=None):
+        """Event ids for a DTR (all if None) whose date falls in [start, end]."""
+        start = str(pd.Timestamp(start).date()) if start is not None else None
+        end = str(pd.Timestamp(end).date()) if end is not None else None
+        return [e for e, meta in self.event_meta.items()
+                if (dtr_key is None or meta['dtr_key'] == dtr_key)
+                and (start is None or (meta['date'] or '') >= start)
+                and (end is None or (meta['date'] or '') <= end)]
+
+    # ---- QUERIES ----
+    def seen(self, event_ids):
+        """Union of the meters seen in the given events."""
+        bitmaps = [self.events[e] for e in event_ids]
+        return BitMap.union(*bitmaps) if bitmaps else BitMap()
+
+    def reconcile(self, dtr_key, event_ids=None):
+        """KPI bitmaps for one DTR against the union of its (or the given) outage events."""
+        d = dtr_info[dtr_key]
+        tagged = self.dtrs.get((d['feeder'], d['dtr']), BitMap())
+        feeder_all = self.feeders.get(d['feeder'], BitMap())
+        outage = self.seen(self.events_for(dtr_key) if event_ids is None else event_ids)
+        return {
+            'master_tagged': tagged,
+            'connected': tagged & outage,
+            'untagged': tagged - outage,
+            'wrongly_mapped': (outage - tagged) & feeder_all,
+            'not_in_feeder_master': outage - feeder_all,
+        }
+
+    def reconcile_counts(self, dtr_key, event_ids=None):
+        return {name: len(bm) for name, bm in self.reconcile(dtr_key, event_ids).items()}
+
+    def memory_bytes(self):
+        """Serialized size of all bitmaps (close to their in-memory footprint)."""
+        return sum(len(bm.serialize()) for group in (self.dtrs, self.feeders, self.events) for bm in group.values())
+
+    # ---- PERSISTENCE ----
+    def save(self, path):
+        state = {
+            'dtrs': {k: bm.serialize() for k, bm in self.dtrs.items()},
+            'feeders': {k: bm.serialize() for k, bm in self.feeders.items()},
+            'events': {k: bm.serialize() for k, bm in self.events.items()},
+            'event_meta': self.event_meta,
+        }
+        with open(path, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path):
+        """Load an index written by save() (a local, trusted file)."""
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        index = cls()
+        index.dtrs = {k: BitMap.deserialize(b) for k, b in state['dtrs'].items()}
+        index.feeders = {k: BitMap.deserialize(b) for k, b in state['feeders'].items()}
+        index.events = {k: BitMap.deserialize(b) for k, b in state['events'].items()}
+        index.event_meta = state['event_meta']
+        return index
+
+
+def build_index(keys=None):
+    """MembershipIndex over the feeder masters and the outage workbooks in dtr_info."""
+    index = MembershipIndex()
+    for feeder, feeder_keys in feeder_to_dtrs().items():
+        feeder_keys = [k for k in feeder_keys if keys is None or k in keys]
+        if not feeder_keys:
+            continue
+        master_all = read_master(feeder)
+        index.add_master(master_all)
+        for key in feeder_keys:
+            lists = load_dtr_lists(key, master_all)
+            date = snapshot_date(lists)
+            event_id = f"{key}@{date.date() if date is not None else 'unknown'}"
+            index.add_event(event_id, id_array(seen_ids(lists)), key, date)
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build Roaring-bitmap membership sets and reconcile DTRs")
+    parser.add_argument("--save", help="Write the index to this file")
+    parser.add_argument("--load", help="Read an index instead of building it from the workbooks")
+    args = parser.parse_args()
+
+    index = MembershipIndex.load(args.load) if args.load else build_index()
+    for key in dtr_info:
+        t0 = time.perf_counter()
+        counts = index.reconcile_counts(key)
+        print(f"{key}: {counts} ({(time.perf_counter() - t0) * 1e6:.0f} µs)")
+    print(f"{len(index.dtrs)} DTR sets, {len(index.events)} events, {index.memory_bytes()} bytes serialized")
+    if args.save:
+        index.save(args.save)
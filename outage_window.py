@@ -0,0 +1,153 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from pyroaring import BitMap
+
+from dtr_data import cached, dtr_info, dtr_version
+from meter_bitmaps import MembershipIndex, build_index
+
+
+class WindowReconciler:
+    """
+    Reconciliation of one DTR over a date window of outage events.
+
+    A meter counts as seen if any event in the window saw it. The window keeps
+    a count array (events in the window that saw each meter, indexed by the
+    meter's position among all meters of the DTR's events), so sliding it only
+    adds the entering days' events and retires the leaving days', each as one
+    vectorized update. The KPI counts are updated from the meters that became
+    seen or stopped being seen, never recomputed from scratch.
+    """
+
+    def __init__(self, index, dtr_key):
+        d = dtr_info[dtr_key]
+        self.index = index
+        self.dtr_key = dtr_key
+        self.tagged = index.dtrs.get((d['feeder'], d['dtr']), BitMap())
+        self.feeder_all = index.feeders.get(d['feeder'], BitMap())
+        self.days = {}  # 'YYYY-MM-DD' -> [event ids]
+        for event_id in index.events_for(dtr_key):
+            day = index.event_meta[event_id]['date']
+            if day is not None:
+                self.days.setdefault(day, []).append(event_id)
+        events = [index.events[e] for day_events in self.days.values() for e in day_events]
+        self.universe = np.array(BitMap().union(*events), dtype=np.uint32)
+        self.multiplicity = np.zeros(len(self.universe), dtype=np.int32)
+        self._event_positions = {}
+        self.seen = BitMap()
+        self.in_window = set()
+        self.start = self.end = None
+        self.connected = self.wrongly_mapped = self.not_in_feeder_master = 0
+
+    def dates(self):
+        return sorted(self.days)
+
+    def _classify(self, meters, sign):
+        self.connected += sign * len(meters & self.tagged)
+        other = meters - self.tagged
+        self.wrongly_mapped += sign * len(other & self.feeder_all)
+        self.not_in_feeder_master += sign * len(other - self.feeder_all)
+
+    def _positions(self, event_id):
+        positions = self._event_positions.get(event_id)
+        if positions is None:
+            meters = np.array(self.index.events[event_id], dtype=np.uint32)
+            positions = self._event_positions[event_id] = np.searchsorted(self.universe, meters)
+        return positions
+
+    def _add_day(self, day):
+        for event_id in self.days.get(day, []):
+            self.multiplicity[self._positions(event_id)] += 1
+            entering = self.index.events[event_id] - self.seen
+            self.seen |= entering
+            self._classify(entering, +1)
+        self.in_window.add(day)
+
+    def _retire_day(self, day):
+        for event_id in self.days.get(day, []):
+            positions = self._positions(event_id)
+            self.multiplicity[positions] -= 1
+            leaving = BitMap(self.universe[positions[self.multiplicity[positions] == 0]])
+            self.seen -= leaving
+            self._classify(leaving, -1)
+        self.in_window.discard(day)
+
+    def set_window(self, start, end):
+        """Move the window to [start, end]; only days entering or leaving it are touched."""
+        start, end = str(pd.Timestamp(start).date()), str(pd.Timestamp(end).date())
+        wanted = {day for day in self.days if start <= day <= end}
+        for day in sorted(self.in_window - wanted):
+            self._retire_day(day)
+        for day in sorted(wanted - self.in_window):
+            self._add_day(day)
+        self.start, self.end = start, end
+        return self.counts()
+
+    def counts(self):
+        connected = self.connected
+        return {
+            'master_tagged': len(self.tagged),
+            'connected': connected,
+            'untagged': len(self.tagged) - connected,
+            'wrongly_mapped': self.wrongly_mapped,
+            'not_in_feeder_master': self.not_in_feeder_master,
+            'total_corrected': connected + self.wrongly_mapped,
+            'events': sum(len(self.days[d]) for d in self.in_window),
+        }
+
+
+def cached_index():
+    """Membership bitmaps for all DTRs and outage events, rebuilt once per data version."""
+    version = '|'.join(dtr_version(key) for key in dtr_info)
+    return cached('bitmaps', 'all', version, build_index)
+
+
+def _synthetic_index(dtr_key, days, seed=0):
+    """The real DTR membership plus `days` synthetic daily events (each seeing ~90% of its meters)."""
+    real = cached_index()
+    rng = np.random.default_rng(seed)
+    index = MembershipIndex()
+    index.dtrs, index.feeders = real.dtrs, real.feeders
+    d = dtr_info[dtr_key]
+    tagged = np.array(real.dtrs[(d['feeder'], d['dtr'])], dtype=np.uint32)
+    others = np.array(real.feeders[d['feeder']] - real.dtrs[(d['feeder'], d['dtr'])], dtype=np.uint32)
+    for i, day in enumerate(pd.date_range('2025-01-01', periods=days, freq='D')):
+        meters = np.concatenate([tagged[rng.random(len(tagged)) < 0.9], rng.choice(others, min(5, len(others)))])
+        index.add_event(f"{dtr_key}@{day.date()}", meters, dtr_key, day)
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Outage reconciliation over a date window")
+    parser.add_argument("dtr", help="DTR key, e.g. 7088-57")
+    parser.add_argument("--start")
+    parser.add_argument("--end")
+    parser.add_argument("--bench", type=int, metavar="DAYS",
+                        help="Slide a 30-day window (shorter if DAYS is) over DAYS synthetic daily events and time each step")
+    args = parser.parse_args()
+
+    if args.bench:
+        window = WindowReconciler(_synthetic_index(args.dtr, args.bench), args.dtr)
+        dates = window.dates()
+        width = min(30, len(dates))
+        window.set_window(dates[0], dates[width - 1])
+        steps = []
+        for i in range(1, len(dates) - width + 1):
+            t0 = time.perf_counter()
+            window.set_window(dates[i], dates[i + width - 1])
+            steps.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        fresh = WindowReconciler(window.index, args.dtr).set_window(dates[-width], dates[-1])
+        rebuild = time.perf_counter() - t0
+        assert fresh == window.counts(), (fresh, window.counts())
+        median = f"median {np.median(steps) * 1e3:.2f} ms" if steps else "no slides"
+        print(f"{len(steps)} slides of {width} days: {median} vs rebuild {rebuild * 1e3:.2f} ms")
+        print(window.counts())
+    else:
+        window = WindowReconciler(cached_index(), args.dtr)
+        dates = window.dates()
+        if not dates:
+            raise SystemExit(f"No dated outage events for {args.dtr}")
+        print(window.set_window(args.start or dates[0], args.end or dates[-1]))
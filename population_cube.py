@@ -0,0 +1,107 @@
+import argparse
+
+import pandas as pd
+
+from dtr_data import cached, cached_dtr_lists, cached_master, dtr_info, dtr_version
+
+DIMENSIONS = ['feeder', 'dtr', 'phase', 'location', 'status']
+STATUSES = ['connected', 'untagged', 'wrongly_mapped']
+
+
+def _ids(values):
+    return pd.to_numeric(pd.Series(values), errors='coerce')
+
+
+def dtr_population(key):
+    """
+    One row per meter relevant to a DTR, with its phase, location and status:
+    master meters of the DTR are 'connected' when seen in the outage list, else
+    'untagged'; meters of other DTRs seen in its outage are 'wrongly_mapped'
+    (phase and location from their own master row).
+    """
+    d = dtr_info[key]
+    lists = cached_dtr_lists(key)
+    master = lists['master']
+    seen = set(_ids(lists['outage']['msn_id']).dropna().astype('int64'))
+    master_ids = _ids(master['MeterLookup_TblRefID'])
+    own = pd.DataFrame({
+        'phase': master['meterphase_name'].to_numpy(),
+        'location': master['locationname'].to_numpy(),
+        'status': master_ids.isin(seen).map({True: 'connected', False: 'untagged'}).to_numpy(),
+    })
+
+    master_all = cached_master(d['feeder'])
+    wrong_ids = set(_ids(lists['wrongly_mapped']['msn_id']).dropna().astype('int64'))
+    wrong = master_all[_ids(master_all['MeterLookup_TblRefID']).isin(wrong_ids).to_numpy()]
+    wrong = pd.DataFrame({
+        'phase': wrong['meterphase_name'].to_numpy(),
+        'location': wrong['locationname'].to_numpy(),
+        'status': 'wrongly_mapped',
+    })
+    return pd.concat([own, wrong], ignore_index=True).assign(feeder=d['feeder'], dtr=d['dtr'])
+
+
+def build_cube(keys=None):
+    """
+    feeder × DTR × phase × location × status meter counts, from one groupby over
+    all DTR populations. Dimensions are categoricals and counts uint32, so the
+    cube stays a few bytes per non-empty cell.
+    """
+    keys = list(dtr_info) if keys is None else keys
+    rows = pd.concat([dtr_population(key) for key in keys], ignore_index=True)
+    rows['phase'] = rows['phase'].fillna('Unknown').astype(str).str.strip()
+    rows['location'] = rows['location'].fillna('Unknown').astype(str).str.strip()
+    for dim in DIMENSIONS:
+        rows[dim] = rows[dim].astype('category')
+    rows['status'] = rows['status'].cat.set_categories(STATUSES)
+    cube = rows.groupby(DIMENSIONS, observed=True).size().rename('meters').reset_index()
+    cube['meters'] = cube['meters'].astype('uint32')
+    return cube
+
+
+def cached_cube():
+    """The cube for all DTRs, rebuilt only when a DTR's data version changes."""
+    version = '|'.join(dtr_version(key) for key in dtr_info)
+    return cached('cube', 'all', version, build_cube)
+
+
+def slice_cube(cube, **filters):
+    """
+    Cells matching the given dimension values (a value or a list of values each),
+    e.g. slice_cube(cube, dtr='57', phase='3PH WC', location='Mokshdham raod', status='untagged').
+    """
+    mask = pd.Series(True, index=cube.index)
+    for dim, value in filters.items():
+        if dim not in DIMENSIONS:
+            raise ValueError(f"Unknown dimension {dim!r}; expected one of {DIMENSIONS}")
+        if value is None:
+            continue
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        mask &= cube[dim].isin([str(v) for v in values])
+    return cube[mask]
+
+
+def rollup(cube, by, **filters):
+    """Meter counts of a slice summed over every dimension not in `by` (a pivot when by has two)."""
+    sliced = slice_cube(cube, **filters)
+    by = [by] if isinstance(by, str) else list(by)
+    labels = sliced[by].astype(str)  # plain labels for display; the cube itself stays categorical
+    totals = sliced['meters'].astype('int64').groupby([labels[dim] for dim in by]).sum()
+    if len(by) == 2:
+        return totals.unstack(fill_value=0)
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Feeder × DTR × phase × location × status meter cube")
+    parser.add_argument("--by", nargs='+', default=['dtr', 'status'], help="Dimensions to roll up to")
+    for dim in DIMENSIONS:
+        parser.add_argument(f"--{dim}", help=f"Filter on {dim}")
+    parser.add_argument("--out", help="Write the full cube to this parquet file")
+    args = parser.parse_args()
+
+    cube = build_cube()
+    print(f"{len(cube)} cells, {cube.memory_usage(deep=True).sum() / 1024:.1f} KiB")
+    print(rollup(cube, args.by, **{dim: getattr(args, dim) for dim in DIMENSIONS}).to_string())
+    if args.out:
+        cube.to_parquet(args.out, index=False)
@@ -0,0 +1,278 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from dtr_data import (cached, cached_dtr_lists, cached_master, dtr_info, dtr_version, normalize_serials,
+                      sheet_kpis)
+
+try:
+    import duckdb
+except ImportError:  # the DuckDB backend is optional; 'auto' falls back to NumPy
+    duckdb = None
+
+MASTER_ID = 'MeterLookup_TblRefID'
+MASTER_SERIAL = 'Meter_Serial_Number'
+SETS = ['tagged', 'connected', 'untagged', 'wrongly_mapped', 'not_in_feeder', 'other_dtrs']
+
+# 'auto' backend choice by input rows (master + seen)
+DUCKDB_MIN_ROWS = 5_000_000
+PANDAS_MIN_ROWS = 10_000
+
+
+class Reconciliation:
+    """
+    Result of reconciling one DTR: sorted, unique uint64 meter-ID arrays per set.
+
+      tagged          tagged to the DTR in the master
+      connected       tagged and seen in the outage
+      untagged        tagged but not seen
+      wrongly_mapped  seen, not tagged here, tagged to another DTR of the same feeder
+      not_in_feeder   seen but in no DTR of this feeder (other feeder or unknown meter)
+      other_dtrs      feeder meters tagged to other DTRs (the whole population, seen or not)
+
+    `labels` maps IDs back to serials when the reconciliation was keyed by serial.
+    """
+
+    __slots__ = ('dtr_key', 'backend', 'labels') + tuple(SETS)
+
+    def __init__(self, dtr_key, backend, sets, labels=None):
+        self.dtr_key = dtr_key
+        self.backend = backend
+        self.labels = labels
+        for name in SETS:
+            setattr(self, name, np.asarray(sets[name], dtype=np.uint64))
+
+    def count(self, name):
+        return int(len(getattr(self, name)))
+
+    def kpis(self):
+        """The dashboard KPI block (same keys as dtr_data.sheet_kpis)."""
+        return {
+            'master_tagged': self.count('tagged'),
+            'connected_outage': self.count('connected'),
+            'untagged': self.count('untagged'),
+            'wrongly_mapped': self.count('wrongly_mapped'),
+            'total_corrected': self.count('connected') + self.count('wrongly_mapped'),
+        }
+
+    def serials(self, name):
+        """Members of a set as serials (or as IDs when keyed by ID)."""
+        ids = getattr(self, name)
+        return self.labels[ids.astype(np.int64)] if self.labels is not None else ids
+
+    def same_sets(self, other):
+        return all(np.array_equal(getattr(self, n), getattr(other, n)) for n in SETS)
+
+    def __repr__(self):
+        counts = ', '.join(f"{n}={self.count(n)}" for n in SETS)
+        return f"Reconciliation({self.dtr_key!r}, {self.backend}, {counts})"
+
+
+# ---- BACKENDS ----
+# Each takes (tagged, feeder_all, seen) as int64 arrays (duplicates allowed) and returns {set name: sorted IDs}.
+
+def _numpy_backend(tagged, feeder_all, seen):
+    tagged, feeder_all, seen = np.unique(tagged), np.unique(feeder_all), np.unique(seen)
+    other_seen = np.setdiff1d(seen, tagged, assume_unique=True)
+    return {
+        'tagged': tagged,
+        'connected': np.intersect1d(tagged, seen, assume_unique=True),
+        'untagged': np.setdiff1d(tagged, seen, assume_unique=True),
+        'wrongly_mapped': np.intersect1d(other_seen, feeder_all, assume_unique=True),
+        'not_in_feeder': np.setdiff1d(other_seen, feeder_all, assume_unique=True),
+        'other_dtrs': np.setdiff1d(feeder_all, tagged, assume_unique=True),
+    }
+
+
+def _pandas_backend(tagged, feeder_all, seen):
+    tagged, feeder_all, seen = (pd.Index(pd.unique(a)) for a in (tagged, feeder_all, seen))
+    other_seen = seen[~seen.isin(tagged)]
+    sets = {
+        'tagged': tagged,
+        'connected': tagged[tagged.isin(seen)],
+        'untagged': tagged[~tagged.isin(seen)],
+        'wrongly_mapped': other_seen[other_seen.isin(feeder_all)],
+        'not_in_feeder': other_seen[~other_seen.isin(feeder_all)],
+        'other_dtrs': feeder_all[~feeder_all.isin(tagged)],
+    }
+    return {name: np.sort(idx.to_numpy()) for name, idx in sets.items()}
+
+
+def _duckdb_backend(tagged, feeder_all, seen):
+    con = duckdb.connect()
+    try:
+        for name, arr in (('t', tagged), ('f', feeder_all), ('s', seen)):
+            con.register(name, pd.DataFrame({'id': arr}))
+        queries = {
+            'tagged': "SELECT DISTINCT id FROM t",
+            'connected': "SELECT id FROM t INTERSECT SELECT id FROM s",
+            'untagged': "SELECT id FROM t EXCEPT SELECT id FROM s",
+            'wrongly_mapped': "(SELECT id FROM s EXCEPT SELECT id FROM t) INTERSECT SELECT id FROM f",
+            'not_in_feeder': "(SELECT id FROM s EXCEPT SELECT id FROM t) EXCEPT SELECT id FROM f",
+            'other_dtrs': "SELECT id FROM f EXCEPT SELECT id FROM t",
+        }
+        return {name: np.sort(con.execute(f"SELECT id FROM ({q}) ORDER BY id").fetchnumpy()['id'].astype(np.int64))
+                for name, q in queries.items()}
+    finally:
+        con.close()
+
+
+BACKENDS = {'numpy': _numpy_backend, 'pandas': _pandas_backend}
+if duckdb is not None:
+    BACKENDS['duckdb'] = _duckdb_backend
+
+
+def choose_backend(rows):
+    """Backend for 'auto': DuckDB for very large inputs when installed, else pandas hashing, else NumPy sorting."""
+    if rows >= DUCKDB_MIN_ROWS and 'duckdb' in BACKENDS:
+        return 'duckdb'
+    return 'pandas' if rows >= PANDAS_MIN_ROWS else 'numpy'
+
+
+# ---- ENTRY POINTS ----
+def reconcile_ids(tagged, feeder_all, seen, dtr_key=None, backend='auto', labels=None):
+    """Reconcile from integer meter-ID arrays (NaN/negative IDs are dropped)."""
+    arrays = []
+    for values in (tagged, feeder_all, seen):
+        ids = pd.to_numeric(pd.Series(values), errors='coerce').dropna()
+        arrays.append(ids[ids >= 0].astype(np.int64).to_numpy())
+    if backend == 'auto':
+        backend = choose_backend(sum(len(a) for a in arrays))
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown or unavailable backend {backend!r}; available: {sorted(BACKENDS)}")
+    return Reconciliation(dtr_key, backend, BACKENDS[backend](*arrays), labels)
+
+
+def reconcile(master_all, feeder, dtr, seen, by='id', backend='auto', dtr_key=None):
+    """
+    Reconcile one DTR from its feeder's master frame and the meters seen in its outage.
+
+    Only master rows of the feeder count (when the master has a Feedercode column),
+    so a DTR code reused on another feeder neither tags meters nor makes them part
+    of this feeder. by='id' matches MeterLookup_TblRefID against integer msn_id
+    values; by='serial' matches normalized Meter_Serial_Number against serials,
+    and the result's labels turn set members back into serials.
+    """
+    master = master_all
+    if 'Feedercode' in master:
+        master = master[(pd.to_numeric(master['Feedercode'], errors='coerce') == int(feeder)).to_numpy()]
+    on_dtr = (pd.to_numeric(master['dtrcode'], errors='coerce') == int(dtr)).to_numpy()
+    if by == 'id':
+        ids = master[MASTER_ID]
+        return reconcile_ids(ids[on_dtr], ids, seen, dtr_key or f"{feeder}-{dtr}", backend)
+    if by != 'serial':
+        raise ValueError(f"by must be 'id' or 'serial', not {by!r}")
+    master_serials = normalize_serials(master[MASTER_SERIAL]).to_numpy()
+    seen_serials = normalize_serials(seen).to_numpy()
+    codes, labels = pd.factorize(np.concatenate([master_serials, seen_serials]))
+    master_codes, seen_codes = codes[:len(master_serials)], codes[len(master_serials):]
+    return reconcile_ids(master_codes[on_dtr], master_codes, seen_codes, dtr_key or f"{feeder}-{dtr}", backend,
+                         labels=np.asarray(labels, dtype=object))
+
+
+def rows_in(df, result, *names, column=None):
+    """Rows of df whose meter is in any of the named sets (by serial column when the result is keyed by serial)."""
+    wanted = np.concatenate([result.serials(name) for name in names])
+    if result.labels is not None:
+        return df[normalize_serials(df[column or MASTER_SERIAL]).isin(wanted).to_numpy()]
+    return df[pd.to_numeric(df[column or MASTER_ID], errors='coerce').isin(wanted).to_numpy()]
+
+
+def seen_ids(lists):
+    """Meter IDs seen in a DTR's outage event: the outage sheet plus the wrongly mapped sheet."""
+    return pd.concat([lists['outage']['msn_id'], lists['wrongly_mapped']['msn_id']], ignore_index=True)
+
+
+def reconcile_lists(key, lists, master_all, backend='auto'):
+    d = dtr_info[key]
+    return reconcile(master_all, d['feeder'], d['dtr'], seen_ids(lists), 'id', backend, key)
+
+
+def dtr_reconciliation(key, backend='auto'):
+    """Reconciliation of a configured DTR, cached per data version."""
+    return cached('reconciliation', key, dtr_version(key),
+                  lambda: reconcile_lists(key, cached_dtr_lists(key), cached_master(dtr_info[key]['feeder']), backend))
+
+
+def dtr_kpis(key):
+    return dtr_reconciliation(key).kpis()
+
+
+# ---- EQUIVALENCE CHECK ----
+def _reference(tagged, feeder_all, seen):
+    """Plain Python sets, the semantics of dashboard_32dtr.py, as the oracle for every backend."""
+    tagged, feeder_all, seen = set(tagged), set(feeder_all), set(seen)
+    return {
+        'tagged': sorted(tagged),
+        'connected': sorted(tagged & seen),
+        'untagged': sorted(tagged - seen),
+        'wrongly_mapped': sorted((seen - tagged) & feeder_all),
+        'not_in_feeder': sorted(seen - feeder_all),
+        'other_dtrs': sorted(feeder_all - tagged),
+    }
+
+
+def check(trials=300, seed=0):
+    """Every backend against the set reference on random inputs, and on every configured DTR. Returns failures."""
+    failures = []
+    rng = np.random.default_rng(seed)
+    for trial in range(trials):
+        universe = int(rng.integers(1, 5000))
+        feeder_all = rng.integers(0, universe, int(rng.integers(0, 3000)))
+        tagged = rng.choice(feeder_all, int(rng.integers(0, len(feeder_all) + 1))) if len(feeder_all) else feeder_all
+        seen = np.concatenate([rng.choice(tagged, int(rng.integers(0, len(tagged) + 1))) if len(tagged) else tagged,
+                               rng.integers(0, 2 * universe, int(rng.integers(0, 500)))])
+        expected = Reconciliation('ref', 'reference', _reference(tagged, feeder_all, seen))
+        for backend in BACKENDS:
+            result = reconcile_ids(tagged, feeder_all, seen, 'synthetic', backend)
+            if not result.same_sets(expected):
+                failures.append(f"trial {trial}: {backend} != reference")
+
+    for key in dtr_info:
+        lists = cached_dtr_lists(key)
+        master_all = cached_master(dtr_info[key]['feeder'])
+        results = {b: reconcile_lists(key, lists, master_all, b) for b in BACKENDS}
+        first = next(iter(results.values()))
+        for backend, result in results.items():
+            if not result.same_sets(first):
+                failures.append(f"{key}: {backend} differs from {first.backend}")
+        d = dtr_info[key]
+        by_serial = reconcile(master_all, d['feeder'], d['dtr'],
+                              pd.concat([lists['outage']['msn'], lists['wrongly_mapped']['msn']]), 'serial')
+        if by_serial.kpis() != first.kpis():
+            failures.append(f"{key}: serial keys {by_serial.kpis()} != ID keys {first.kpis()}")
+        if sheet_kpis(lists) != first.kpis():
+            failures.append(f"{key}: sheet counts {sheet_kpis(lists)} != reconciliation {first.kpis()}")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="DTR reconciliation core: KPIs, backend equivalence and timings")
+    parser.add_argument("dtr", nargs='?', help="DTR key (all if omitted)")
+    parser.add_argument("--backend", default='auto', choices=['auto'] + sorted(BACKENDS))
+    parser.add_argument("--check", action='store_true', help="Run the backend equivalence suite")
+    parser.add_argument("--bench", type=int, metavar="ROWS", help="Time every backend on ROWS synthetic master rows")
+    args = parser.parse_args()
+
+    if args.check:
+        failures = check()
+        print("\n".join(failures) if failures else f"OK: {len(BACKENDS)} backends ({', '.join(BACKENDS)}) agree")
+        sys.exit(1 if failures else 0)
+    elif args.bench:
+        rng = np.random.default_rng(0)
+        feeder_all = rng.choice(10 * args.bench, args.bench, replace=False)
+        tagged = feeder_all[: args.bench // 10]
+        seen = np.concatenate([tagged[rng.random(len(tagged)) < 0.9], rng.choice(feeder_all, len(tagged) // 20)])
+        for backend in BACKENDS:
+            t0 = time.perf_counter()
+            result = reconcile_ids(tagged, feeder_all, seen, 'bench', backend)
+            print(f"{backend:>7}: {(time.perf_counter() - t0) * 1e3:8.1f} ms  {result.kpis()}")
+        print(f"auto picks {choose_backend(len(feeder_all) + len(tagged) + len(seen))}")
+    else:
+        for key in ([args.dtr] if args.dtr else dtr_info):
+            d = dtr_info[key]
+            result = reconcile_lists(key, cached_dtr_lists(key), cached_master(d['feeder']), args.backend)
+            print(result)
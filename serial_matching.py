@@ -0,0 +1,191 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from dtr_data import cached_dtr_lists, cached_master, dtr_info, normalize_serials
+
+
+def canonical_serials(values):
+    """
+    Serials reduced to their comparable core: normalize_serials, then no 'EZ'
+    prefix, letter O read as digit 0, and no leading zeros.
+    EZ0171557, ez171557, 171557.0 and EZO171557 all become '171557'.
+    """
+    s = normalize_serials(values)
+    s = s.str.replace(r'^EZ', '', regex=True).str.replace('O', '0', regex=False)
+    return s.str.lstrip('0')
+
+
+def levenshtein(a, b, max_distance=None):
+    """Edit distance between two short strings (stops early once max_distance is exceeded)."""
+    if abs(len(a) - len(b)) > (max_distance if max_distance is not None else len(a) + len(b)):
+        return max_distance + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if max_distance is not None and min(cur) > max_distance:
+            return max_distance + 1
+        prev = cur
+    return prev[-1]
+
+
+def _deletions(canon, depth):
+    """
+    (key, row, pos) rows: every string reachable from canon by up to `depth`
+    single-character deletions. pos is the deleted position for one deletion,
+    -1 for the serial itself and -2 for deeper deletions.
+    """
+    frames = [pd.DataFrame({'key': canon.to_numpy(), 'row': np.arange(len(canon)), 'pos': -1})]
+    current = frames[0]
+    for level in range(depth):
+        keys = current['key'].astype(str)
+        lengths = keys.str.len().to_numpy()
+        max_len = int(lengths.max()) if len(keys) else 0
+        step = [pd.DataFrame({'key': keys.str.slice(0, i) + keys.str.slice(i + 1),
+                              'row': current['row'].to_numpy(),
+                              'pos': i if level == 0 else -2})[lengths > i] for i in range(max_len)]
+        current = pd.concat(step, ignore_index=True) if step else current.iloc[:0]
+        frames.append(current)
+    return pd.concat(frames, ignore_index=True).drop_duplicates()
+
+
+class SerialIndex:
+    """
+    Deletion-neighbourhood index over canonical master serials (an n-gram style
+    index where the grams are the serial minus up to max_distance characters).
+
+    Two serials within edit distance d share at least one key, so candidates
+    come from one hash join instead of a pairwise scan. With max_distance=1 the
+    distance follows from the deleted positions and is fully vectorized; larger
+    distances score each candidate with levenshtein() and are much slower.
+    """
+
+    def __init__(self, serials, max_distance=1):
+        self.serials = normalize_serials(serials).reset_index(drop=True)
+        self.canonical = canonical_serials(self.serials)
+        self.max_distance = max_distance
+        self.keys = _deletions(self.canonical, max_distance)
+
+    def match(self, serials):
+        """
+        Best master serial for each query serial, or no row if none is within max_distance.
+        Columns: serial, matched_serial, master_pos, method ('canonical' or 'fuzzy'),
+        distance, score (1 - distance / length) and ambiguous (several equally close matches).
+        """
+        query = normalize_serials(serials).reset_index(drop=True)
+        canon = canonical_serials(query)
+        pairs = _deletions(canon, self.max_distance).merge(self.keys, on='key', suffixes=('_q', '_m'))
+        if pairs.empty:
+            return pd.DataFrame(columns=['serial', 'matched_serial', 'master_pos', 'method', 'distance', 'score',
+                                         'ambiguous'])
+        if self.max_distance <= 1:
+            # Distance straight from the deleted positions: none on either side is an exact
+            # match, one side only an insertion/deletion, the same position a substitution
+            pos_q, pos_m = pairs['pos_q'].to_numpy(), pairs['pos_m'].to_numpy()
+            distance = np.where((pos_q < 0) & (pos_m < 0), 0,
+                                np.where((pos_q < 0) | (pos_m < 0) | (pos_q == pos_m), 1, 2))
+            pairs = pairs[['row_q', 'row_m']].assign(distance=distance)
+            pairs = pairs.groupby(['row_q', 'row_m'], as_index=False)['distance'].min()
+        else:
+            pairs = pairs[['row_q', 'row_m']].drop_duplicates()
+            q_canon = canon.to_numpy()[pairs['row_q'].to_numpy()]
+            m_canon = self.canonical.to_numpy()[pairs['row_m'].to_numpy()]
+            pairs['distance'] = [levenshtein(a, b, self.max_distance) for a, b in zip(q_canon, m_canon)]
+        pairs = pairs[pairs['distance'] <= self.max_distance]
+
+        best = pairs.groupby('row_q')['distance'].transform('min')
+        pairs = pairs[pairs['distance'] == best]
+        n_best = pairs.groupby('row_q')['row_m'].transform('size')
+        pairs = pairs.assign(ambiguous=n_best > 1).drop_duplicates('row_q')
+
+        lengths = np.maximum(canon.str.len().to_numpy()[pairs['row_q'].to_numpy()], 1)
+        return pd.DataFrame({
+            'serial': query.to_numpy()[pairs['row_q'].to_numpy()],
+            'matched_serial': self.serials.to_numpy()[pairs['row_m'].to_numpy()],
+            'master_pos': pairs['row_m'].to_numpy(),
+            'method': np.where(pairs['distance'].to_numpy() == 0, 'canonical', 'fuzzy'),
+            'distance': pairs['distance'].to_numpy(),
+            'score': 1 - pairs['distance'].to_numpy() / lengths,
+            'ambiguous': pairs['ambiguous'].to_numpy(),
+        }).reset_index(drop=True)
+
+
+def resolve_leftovers(key, max_distance=1):
+    """
+    Fuzzy stage after the exact join for one DTR: outage serials (outage and
+    wrongly mapped sheets) with no exact match in this DTR's master are matched
+    against the feeder master serials that no outage serial matched exactly.
+
+    Each suggestion says which DTR the matched master meter is tagged to, so a
+    match on this DTR removes a false 'untagged' and a false 'wrongly mapped'.
+    """
+    d = dtr_info[key]
+    lists = cached_dtr_lists(key)
+    master_all = cached_master(d['feeder'])
+    seen = pd.concat([lists['outage']['msn'], lists['wrongly_mapped']['msn']], ignore_index=True)
+    seen_norm = normalize_serials(seen)
+    dtr_norm = set(normalize_serials(lists['master']['Meter_Serial_Number']))
+    left = seen_norm[~seen_norm.isin(dtr_norm)].drop_duplicates()
+
+    feeder_norm = normalize_serials(master_all['Meter_Serial_Number'])
+    candidates = master_all[~feeder_norm.isin(set(seen_norm)).to_numpy()]
+    left = left[~left.isin(set(feeder_norm))]  # exact hits elsewhere on the feeder are real wrong mappings
+    if left.empty or candidates.empty:
+        return pd.DataFrame(columns=['serial', 'matched_serial', 'method', 'distance', 'score', 'ambiguous',
+                                     'matched_dtrcode', 'same_dtr'])
+
+    matches = SerialIndex(candidates['Meter_Serial_Number'], max_distance).match(left)
+    matched_dtr = candidates['dtrcode'].to_numpy()[matches['master_pos'].to_numpy()]
+    return matches.drop(columns='master_pos').assign(
+        matched_dtrcode=matched_dtr,
+        same_dtr=matched_dtr == int(d['dtr']),
+    )
+
+
+def _synthetic(n, seed=0):
+    """n master serials and n perturbed copies (dropped zero, O/0 swap, missing prefix, one typo)."""
+    rng = np.random.default_rng(seed)
+    master = pd.Series([f"EZ{v:07d}" for v in rng.choice(10 ** 7, n, replace=False)])
+    kind = rng.integers(0, 4, n)
+    noisy = master.copy()
+    noisy[kind == 0] = noisy[kind == 0].str.replace('EZ0', 'EZ', n=1, regex=False)
+    noisy[kind == 1] = noisy[kind == 1].str.replace('0', 'O', n=1, regex=False)
+    noisy[kind == 2] = noisy[kind == 2].str.slice(2)
+    typo = kind == 3
+    pos = rng.integers(2, 9, typo.sum())
+    digits = rng.integers(0, 10, typo.sum()).astype(str)
+    noisy[typo] = [s[:p] + c + s[p + 1:] for s, p, c in zip(noisy[typo], pos, digits)]
+    return master, noisy
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fuzzy matching of serials left over after the exact join")
+    parser.add_argument("dtr", nargs='?', help="DTR key, e.g. 7088-57 (all DTRs if omitted)")
+    parser.add_argument("--max-distance", type=int, default=1)
+    parser.add_argument("--bench", type=int, nargs='+', help="Benchmark on N synthetic serials instead")
+    args = parser.parse_args()
+
+    if args.bench:
+        for n in args.bench:
+            master, noisy = _synthetic(n)
+            t0 = time.perf_counter()
+            index = SerialIndex(master, args.max_distance)
+            t1 = time.perf_counter()
+            matches = index.match(noisy)
+            t2 = time.perf_counter()
+            truth = dict(zip(noisy, master))
+            hit = matches['matched_serial'] == matches['serial'].map(truth)
+            unique = ~matches['ambiguous'].astype(bool)
+            print(f"{n:>8} serials | index {t1 - t0:.2f}s | match {t2 - t1:.2f}s | matched {len(matches) / n:.1%} | "
+                  f"unambiguous {unique.mean():.1%}, of which correct {hit[unique].mean():.1%}")
+    else:
+        for key in ([args.dtr] if args.dtr else dtr_info):
+            result = resolve_leftovers(key, args.max_distance)
+            print(f"{key}: {len(result)} leftover serials matched "
+                  f"({int(result['same_dtr'].sum()) if len(result) else 0} to this DTR)")
+            if len(result):
+                print(result.to_string(index=False))
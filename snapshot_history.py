@@ -0,0 +1,204 @@
+import argparse
+import glob
+import json
+import os
+
+import pandas as pd
+import pyarrow.dataset as ds
+
+from dtr_data import dtr_info, load_dtr_lists, normalize_serials
+
+# Per-meter tagging status codes stored in the history
+STATUS = {1: "connected", 2: "untagged", 3: "wrongly_mapped"}
+STATUS_CODE = {v: k for k, v in STATUS.items()}
+
+RUN_COLUMNS = ['dtr_key', 'meter', 'status', 'start', 'end']
+
+
+def snapshot_status(lists):
+    """(meter, status) rows for one DTR snapshot built from load_dtr_lists() output."""
+    master = set(normalize_serials(lists['master']['Meter_Serial_Number']))
+    outage = set(normalize_serials(lists['outage']['msn']))
+    wrongly = set(normalize_serials(lists['wrongly_mapped']['msn'])) - master
+    parts = [
+        pd.DataFrame({'meter': sorted(master & outage), 'status': STATUS_CODE['connected']}),
+        pd.DataFrame({'meter': sorted(master - outage), 'status': STATUS_CODE['untagged']}),
+        pd.DataFrame({'meter': sorted(wrongly), 'status': STATUS_CODE['wrongly_mapped']}),
+    ]
+    df = pd.concat(parts, ignore_index=True)
+    df['status'] = df['status'].astype('int8')
+    return df
+
+
+def snapshot_date(lists):
+    """Date of the outage event in a DTR snapshot (first event_101_ts), or None."""
+    ts_col = next((c for c in lists['outage'].columns if str(c).startswith('event_101')), None)
+    if ts_col is None:
+        return None
+    ts = pd.to_datetime(lists['outage'][ts_col], errors='coerce').dropna()
+    return ts.min().normalize() if len(ts) else None
+
+
+class SnapshotHistory:
+    """
+    Run-length-encoded per-meter tagging status over a sequence of dated snapshots.
+
+    A run (dtr_key, meter, status, start, end) is extended while the meter keeps the
+    same status in consecutive snapshots of its DTR, so storage grows with status
+    changes, not with days. Layout under `root`:
+      open/<dtr_key>.parquet   runs still open at the DTR's latest snapshot; an
+                               ingest rewrites only the files of the DTRs it covers
+      runs/<date>_<n>.parquet  runs closed by that ingest (append-only)
+      daily/<date>_<n>.parquet per-DTR status counts for that ingest
+      dtrs.json              latest ingested date per DTR
+    """
+
+    def __init__(self, root="history"):
+        self.root = root
+        self.runs_dir = os.path.join(root, "runs")
+        self.daily_dir = os.path.join(root, "daily")
+        self.open_dir = os.path.join(root, "open")
+        self.dtrs_path = os.path.join(root, "dtrs.json")
+        os.makedirs(self.runs_dir, exist_ok=True)
+        os.makedirs(self.daily_dir, exist_ok=True)
+        os.makedirs(self.open_dir, exist_ok=True)
+
+    # ---- STATE ----
+    def last_dates(self):
+        if not os.path.exists(self.dtrs_path):
+            return {}
+        with open(self.dtrs_path) as f:
+            return {k: pd.Timestamp(v) for k, v in json.load(f).items()}
+
+    def _open_path(self, key):
+        return os.path.join(self.open_dir, f"{key}.parquet")
+
+    def open_runs(self, keys=None):
+        """Open runs of the given DTRs (all if None)."""
+        paths = sorted(glob.glob(os.path.join(self.open_dir, "*.parquet"))) if keys is None else \
+            [p for p in map(self._open_path, keys) if os.path.exists(p)]
+        if not paths:
+            return pd.DataFrame({c: pd.Series(dtype=t) for c, t in
+                                 zip(RUN_COLUMNS, ['str', 'str', 'int8', 'datetime64[ns]', 'datetime64[ns]'])})
+        return pd.concat([pd.read_parquet(p) for p in paths], ignore_index=True)
+
+    def _write_open(self, key, runs):
+        path = self._open_path(key)
+        if len(runs):
+            runs[RUN_COLUMNS].to_parquet(path, index=False)
+        elif os.path.exists(path):
+            os.remove(path)
+
+    def _part_name(self, folder, date):
+        stem = pd.Timestamp(date).strftime('%Y%m%d')
+        n = len(glob.glob(os.path.join(folder, f"{stem}_*.parquet")))
+        return os.path.join(folder, f"{stem}_{n}.parquet")
+
+    # ---- INGEST ----
+    def ingest(self, date, snapshots):
+        """
+        Add one dated snapshot for one or more DTRs.
+
+        snapshots: {dtr_key: DataFrame(meter, status)} as built by snapshot_status().
+        The date must be given and later than the last snapshot ingested for each DTR.
+        """
+        if date is None or pd.isna(date):
+            raise ValueError("Snapshot date is required")
+        date = pd.Timestamp(date).normalize()
+        last = self.last_dates()
+        stale = [k for k in snapshots if k in last and last[k] >= date]
+        if stale:
+            raise ValueError(f"Snapshots for {stale} already ingested up to {date.date()} or later")
+
+        new = pd.concat([df.assign(dtr_key=k) for k, df in snapshots.items()], ignore_index=True)
+        new['meter'] = new['meter'].astype(str)
+        current = self.open_runs(list(snapshots))
+
+        # Hash join of open runs with today's status on (dtr_key, meter)
+        merged = current.merge(new, on=['dtr_key', 'meter'], how='outer',
+                               suffixes=('', '_new'), indicator=True)
+        same = (merged['_merge'] == 'both') & (merged['status'] == merged['status_new'])
+        closes = (merged['_merge'] == 'left_only') | ((merged['_merge'] == 'both') & ~same)
+        opens = (merged['_merge'] == 'right_only') | ((merged['_merge'] == 'both') & ~same)
+
+        extended = merged.loc[same, RUN_COLUMNS].assign(end=date)
+        closed = merged.loc[closes, RUN_COLUMNS]
+        opened = merged.loc[opens, ['dtr_key', 'meter', 'status_new']].rename(columns={'status_new': 'status'})
+        opened = opened.assign(start=date, end=date)
+
+        if len(closed):
+            closed = closed.astype({'status': 'int8'}).sort_values(['meter', 'start'])
+            closed.to_parquet(self._part_name(self.runs_dir, date), index=False)
+
+        open_new = pd.concat([extended, opened], ignore_index=True)
+        open_new = open_new.astype({'status': 'int8'}).sort_values(['dtr_key', 'meter'])
+        for key in snapshots:
+            self._write_open(key, open_new[open_new['dtr_key'] == key])
+
+        daily = (new.groupby(['dtr_key', 'status']).size().unstack(fill_value=0)
+                 .reindex(columns=list(STATUS), fill_value=0).rename(columns=STATUS).reset_index())
+        daily.insert(1, 'date', date)
+        daily.to_parquet(self._part_name(self.daily_dir, date), index=False)
+
+        last.update({k: date for k in snapshots})
+        with open(self.dtrs_path, 'w') as f:
+            json.dump({k: v.strftime('%Y-%m-%d') for k, v in last.items()}, f, indent=1)
+        return {'extended': int(same.sum()), 'closed': int(closes.sum()), 'opened': int(opens.sum())}
+
+    # ---- QUERIES ----
+    def _read_parts(self, folder, column, value):
+        files = sorted(glob.glob(os.path.join(folder, "*.parquet")))
+        if not files:
+            return pd.DataFrame()
+        return ds.dataset(files, format="parquet").to_table(filter=ds.field(column) == value).to_pandas()
+
+    def meter_timeline(self, serial):
+        """All status runs of one meter, oldest first."""
+        serial = normalize_serials([serial]).iloc[0]
+        runs = pd.concat([self._read_parts(self.runs_dir, 'meter', serial),
+                          self._read_parts(self.open_dir, 'meter', serial)], ignore_index=True)
+        if runs.empty:
+            return runs
+        runs['status'] = runs['status'].map(STATUS)
+        return runs.sort_values(['start', 'dtr_key']).reset_index(drop=True)
+
+    def dtr_trend(self, key):
+        """Daily status counts and tagging accuracy % for one DTR."""
+        daily = self._read_parts(self.daily_dir, 'dtr_key', key)
+        if daily.empty:
+            return daily
+        daily = daily.sort_values('date').reset_index(drop=True)
+        population = daily[list(STATUS.values())].sum(axis=1)
+        daily['accuracy_pct'] = (daily['connected'] / population * 100).where(population > 0, 0.0)
+        return daily
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Daily outage snapshot history")
+    parser.add_argument("--root", default="history")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_ingest = sub.add_parser("ingest", help="Ingest the current outage workbooks")
+    p_ingest.add_argument("--date", help="Snapshot date (default: outage event date of each DTR; "
+                                         "required when a DTR's outage sheet has no event timestamps)")
+    p_ingest.add_argument("--dtr", action="append", help="DTR key(s) like 7088-57; default all")
+    p_timeline = sub.add_parser("timeline", help="Status timeline for a meter")
+    p_timeline.add_argument("serial")
+    p_trend = sub.add_parser("trend", help="Tagging accuracy trend for a DTR")
+    p_trend.add_argument("dtr_key")
+    args = parser.parse_args()
+
+    history = SnapshotHistory(args.root)
+    if args.cmd == "ingest":
+        by_date = {}
+        for key in args.dtr or list(dtr_info):
+            lists = load_dtr_lists(key)
+            date = args.date or snapshot_date(lists)
+            if date is None:
+                raise SystemExit(f"No outage event date for {key}; pass --date")
+            by_date.setdefault(pd.Timestamp(date).normalize(), {})[key] = snapshot_status(lists)
+        for date in sorted(by_date):
+            print(date.date(), history.ingest(date, by_date[date]))
+    elif args.cmd == "timeline":
+        print(history.meter_timeline(args.serial).to_string(index=False))
+    else:
+        print(history.dtr_trend(args.dtr_key).to_string(index=False))
@@ -0,0 +1,40 @@
+import pandas as pd
+import pytest
+
+import dtr_data
+from bulk_loader import IncompleteLoad, load_dashboard_files, load_workbooks
+
+
+@pytest.fixture
+def specs(tmp_path):
+    pd.DataFrame({'Meter_Serial_Number': ['EZ1']}).to_excel(tmp_path / 'master.xlsx', index=False)
+    pd.DataFrame({'Meter_Serial_Number': ['EZ1']}).to_excel(tmp_path / '57.xlsx', index=False)
+    return {('7088', 'master'): str(tmp_path / 'master.xlsx'), ('7088', '57'): str(tmp_path / '57.xlsx'),
+            ('7088', '32'): str(tmp_path / 'missing.xlsx')}
+
+
+def test_partial_load_is_reported_or_raised(specs):
+    files, report = load_dashboard_files(specs, workers=1)
+    assert list(files['7088']) == ['master', '57'] and list(report.errors) == [('7088', '32')]
+
+    with pytest.raises(IncompleteLoad) as failed:
+        load_dashboard_files(specs, workers=1, strict=True)
+    assert list(failed.value.data['7088']) == ['master', '57']
+    assert list(failed.value.report.errors) == [('7088', '32')]
+
+
+def test_failed_load_is_not_cached(specs, tmp_path):
+    builds = []
+
+    def build():
+        builds.append(1)
+        return load_workbooks(specs, workers=1, strict=True)
+
+    for _ in range(2):
+        with pytest.raises(IncompleteLoad):
+            dtr_data.cached('test_sheets', 'k', 'v1', build)
+    pd.DataFrame({'Meter_Serial_Number': ['EZ2']}).to_excel(tmp_path / 'missing.xlsx', index=False)
+    data, report = dtr_data.cached('test_sheets', 'k', 'v1', build)
+
+    assert len(builds) == 3 and not report.errors and len(data) == 3
+    dtr_data.invalidate(['k'])
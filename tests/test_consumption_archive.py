@@ -0,0 +1,55 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from consumption_archive import COLUMNS, ConsumptionArchive, write_archive
+
+
+def _tidy():
+    ts = pd.to_datetime(['2025-05-30', '2025-05-31', '2025-06-01', '2025-06-02'])
+    return pd.DataFrame({
+        'dtr_key': ['7088-57'] * 4 + ['7088-32'] * 4,
+        'series': ['register'] * 4 + ['dlp_loss_pct'] * 4,
+        'msn': ['EZ1', 'EZ1', 'EZ2', 'EZ2', None, None, None, None],
+        'ts': list(ts) * 2,
+        'value': [1000.125, np.nan, 1010.5, 1011.0, -31.418, -33.181, 18.229, np.nan],
+        'meter_count': [np.nan] * 4 + [69.0, 69.0, np.nan, 68.0],
+    })[COLUMNS]
+
+
+def test_round_trip_keeps_nan_negative_and_null_msn(tmp_path):
+    tidy = _tidy()
+    write_archive(tidy, str(tmp_path))
+    archive = ConsumptionArchive(str(tmp_path))
+
+    for key in ('7088-57', '7088-32'):
+        expected = tidy[tidy['dtr_key'] == key].sort_values(['series', 'msn', 'ts']).reset_index(drop=True)
+        got = archive.query(key).sort_values(['series', 'msn', 'ts']).reset_index(drop=True)
+        for df in (got, expected):  # null serials: None in the archive, NaN in a pandas string column
+            df['msn'] = df['msn'].astype(object).where(df['msn'].notna(), None)
+        pd.testing.assert_frame_equal(got, expected, check_dtype=False)
+    assert archive.verify()
+
+
+def test_range_query_reads_only_the_months_asked_for(tmp_path):
+    write_archive(_tidy(), str(tmp_path))
+    archive = ConsumptionArchive(str(tmp_path))
+
+    june = archive.query('7088-32', '2025-06-01', '2025-06-30')
+    assert [c['month'] for c in archive.chunks_for('7088-32', '2025-06-01', '2025-06-30')] == ['2025-06']
+    assert june['value'].tolist()[0] == 18.229 and np.isnan(june['value'].tolist()[1])
+    assert archive.query('7088-57', '2025-05-31', '2025-06-01', series='register')['msn'].tolist() == ['EZ1', 'EZ2']
+
+
+def test_rewrite_keeps_the_previous_blob_for_open_readers(tmp_path):
+    tidy = _tidy()
+    write_archive(tidy, str(tmp_path))
+    old = ConsumptionArchive(str(tmp_path))
+    write_archive(tidy.assign(value=tidy['value'] + 1), str(tmp_path))
+    write_archive(tidy.assign(value=tidy['value'] + 2), str(tmp_path))
+    new = ConsumptionArchive(str(tmp_path))
+
+    assert not os.path.exists(old.blob_path)
+    assert len([f for f in os.listdir(tmp_path) if f.endswith('.bin')]) == 2
+    assert new.verify() and new.query('7088-57')['value'].tolist()[0] == 1002.125
@@ -0,0 +1,51 @@
+import os
+
+import pandas as pd
+import pytest
+
+import consumption_store
+from consumption_store import ConsumptionStore
+
+KEY = '7088-57'
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    workbook = tmp_path / 'consumption.xlsx'
+    workbook.write_bytes(b'v1')
+    monkeypatch.setitem(consumption_store.consumption_files, KEY, str(workbook))
+    monkeypatch.setattr(consumption_store, 'read_consumption_workbook', lambda key: pd.DataFrame({
+        'dtr_key': [key] * 2, 'series': ['dlp_loss_pct'] * 2, 'msn': [None, None],
+        'ts': pd.to_datetime(['2025-06-01', '2025-06-02']), 'value': [4.0, 5.0], 'meter_count': [10.0, 11.0],
+    }))
+    consumption_store.build_store(str(tmp_path / 'store'), [KEY])
+    return ConsumptionStore(str(tmp_path / 'store')), workbook
+
+
+def test_current_dtr_reads_from_the_store(store):
+    store, _ = store
+    assert store.is_current(KEY)
+    assert store.dlp_table(KEY)['loss%'].tolist() == [4.0, 5.0]
+
+
+def test_changed_workbook_reads_as_not_stored(store):
+    store, workbook = store
+    workbook.write_bytes(b'v2, rewritten')
+    os.utime(workbook, ns=(0, 0))
+
+    assert not store.is_current(KEY)
+    assert store.dlp_table(KEY) is None
+    assert store.series(KEY) == []
+
+
+def test_rebuild_swaps_rows_and_offsets_together(store, tmp_path, monkeypatch):
+    store, _ = store
+    store.dlp_table(KEY)
+    monkeypatch.setattr(consumption_store, 'read_consumption_workbook', lambda key: pd.DataFrame({
+        'dtr_key': [key] * 2, 'series': ['dlp_consumer', 'dlp_loss_pct'], 'msn': [None, None],
+        'ts': pd.to_datetime(['2025-06-03'] * 2), 'value': [90.0, 6.0], 'meter_count': [12.0, 12.0],
+    }))
+    consumption_store.build_store(str(tmp_path / 'store'), [KEY])
+
+    assert os.listdir(tmp_path / 'store') == ['7088.arrow']
+    assert store.dlp_table(KEY)['loss%'].tolist() == [6.0]
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from daily_consumption import derive_daily
+
+
+def _readings(values, dates=None, msn='EZ1'):
+    dates = dates or pd.date_range('2025-06-01', periods=len(values)).strftime('%Y-%m-%d').tolist()
+    return pd.DataFrame({'msn': msn, 'ts': pd.to_datetime(dates), 'reading': values})
+
+
+def test_ordinary_drop_is_a_reset_not_a_rollover():
+    daily = derive_daily(_readings([9500.0, 9600.0, 20.0, 45.0]))
+
+    assert daily['flag'].tolist() == ['ok', 'reset', 'ok']
+    assert daily['consumption_kwh'].tolist()[0] == 100.0
+    assert np.isnan(daily['consumption_kwh'].tolist()[1])
+    assert daily['consumption_kwh'].tolist()[2] == 25.0
+
+
+def test_drop_from_capacity_wraps_as_rollover():
+    daily = derive_daily(_readings([999_900.0, 999_980.0, 30.0]), digits=6)
+
+    assert daily['flag'].tolist() == ['ok', 'rollover']
+    assert daily['consumption_kwh'].tolist() == [80.0, 50.0]
+
+
+def test_per_meter_digits_column():
+    readings = _readings([99_990.0, 15.0]).assign(digits=5)
+
+    assert derive_daily(readings)['flag'].tolist() == ['rollover']
+    assert derive_daily(readings.drop(columns='digits'))['flag'].tolist() == ['reset']
+
+
+def test_gaps_are_spread_or_dropped():
+    daily = derive_daily(_readings([100.0, 130.0, 1000.0], ['2025-06-01', '2025-06-04', '2025-06-20']),
+                         max_gap_days=7)
+
+    assert daily['flag'].tolist() == ['interpolated'] * 3 + ['gap_too_long']
+    assert daily['consumption_kwh'].tolist()[:3] == [10.0, 10.0, 10.0]
+    assert daily['date'].dt.strftime('%m-%d').tolist() == ['06-01', '06-02', '06-03', '06-19']
+    assert np.isnan(daily['consumption_kwh'].tolist()[3])
@@ -0,0 +1,39 @@
+import pandas as pd
+
+import data_quality
+from data_quality import dtr_issues, scan_masters
+
+
+def _master(rows):
+    return pd.DataFrame(rows, columns=['Feedercode', 'dtrcode', 'Meter_Serial_Number'])
+
+
+def test_null_dtrcode_keeps_integer_codes():
+    master = _master([
+        (7088, 57, 'EZ0000001'),
+        (7088, 57, 'EZ0000001'),
+        (7088, 32, 'EZ0000002'),
+        (7088, 57, 'EZ0000002'),
+        (7088, None, 'EZ0000003'),
+    ])
+    report = scan_masters({'7088': master})
+
+    assert report.loc[report['check'] == 'null_dtrcode', 'serial'].tolist() == ['EZ0000003']
+    conflict = report[report['check'] == 'conflicting_dtr']
+    assert conflict['detail'].tolist() == ["DTRs 32, 57"]
+    dup = report[report['check'] == 'duplicate_in_master']
+    assert dup['dtrcode'].astype(str).tolist() == ['57']
+
+
+def test_dtr_issues_matches_own_rows_despite_null_dtrcode(monkeypatch):
+    master = _master([
+        (7088, 57, 'EZ0000001'),
+        (7088, 57, 'EZ0000001'),
+        (7088, None, 'EZ0000003'),
+    ])
+    report = scan_masters({'7088': master})
+    monkeypatch.setitem(data_quality.dtr_info, '7088-57', {'feeder': '7088', 'dtr': '57'})
+    monkeypatch.setattr(data_quality, 'cached_dtr_lists', lambda key: {'master': master[master['dtrcode'] == 57]})
+
+    issues = dtr_issues('7088-57', report)
+    assert issues['check'].tolist() == ['duplicate_in_master']
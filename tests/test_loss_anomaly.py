@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from loss_anomaly import LossAnomalyDetector
+
+KEYS = ['7088-32', '7088-57']
+
+
+def _daily(days=20, spike_day=None, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2025-06-01', periods=days)
+    rows = []
+    for key, base in zip(KEYS, (18.0, 25.0)):
+        loss = base + rng.normal(0, 0.8, days)
+        if spike_day is not None and key == '7088-57':
+            loss[spike_day] = base + 30
+        rows.append(pd.DataFrame({'dtr_key': key, 'date': dates, 'loss_pct': loss,
+                                  'meter_count': 150 + rng.integers(-2, 3, days)}))
+    return pd.concat(rows, ignore_index=True)
+
+
+@pytest.fixture
+def saved(tmp_path):
+    det = LossAnomalyDetector(KEYS, window=7)
+    det.update('2025-06-01', {'loss_pct': np.array([4.0, 5.0]), 'meter_count': np.array([40.0, 150.0])})
+    path = str(tmp_path / 'state.npz')
+    det.save(path)
+    return path
+
+
+def test_normal_series_raises_no_alerts():
+    assert LossAnomalyDetector(KEYS).run(_daily()).empty
+
+
+def test_spike_is_flagged():
+    alerts = LossAnomalyDetector(KEYS).run(_daily(spike_day=12))
+
+    assert alerts[['dtr_key', 'metric']].values.tolist() == [['7088-57', 'loss_pct']]
+    assert alerts['date'].iloc[0] == pd.Timestamp('2025-06-13')
+    assert alerts['z'].iloc[0] > 3.5
+
+
+def test_spike_before_min_history_is_not_flagged():
+    assert LossAnomalyDetector(KEYS, min_history=5).run(_daily(spike_day=3)).empty
+
+
+def test_resumed_run_matches_a_single_run(tmp_path):
+    daily = _daily(spike_day=15)
+    first = LossAnomalyDetector(KEYS)
+    first.run(daily[daily['date'] < '2025-06-10'])
+    first.save(str(tmp_path / 'state.npz'))
+
+    resumed = LossAnomalyDetector.load(str(tmp_path / 'state.npz')).run(daily)
+    pd.testing.assert_frame_equal(resumed, LossAnomalyDetector(KEYS).run(daily).iloc[-len(resumed):]
+                                  .reset_index(drop=True))
+
+
+def test_resumes_with_same_params(saved):
+    det = LossAnomalyDetector.load(saved)
+    assert det.mismatch(7, 3.5, 5) is None
+    assert 'parameters' in det.mismatch(14, 3.5, 5)
+    assert str(det.last_date.date()) == '2025-06-01'
+
+
+def test_new_dtr_keeps_the_others_history(saved):
+    det = LossAnomalyDetector.load(saved).with_dtrs(['7088-57', '7088-86'])
+
+    assert det.dtr_keys == ['7088-57', '7088-86']
+    assert det.history[0, :, 0].tolist() == [5.0, 150.0]
+    assert np.isnan(det.history[:, :, 1]).all()
+    assert str(det.last_date.date()) == '2025-06-01'
+
+
+def test_state_without_metrics_is_rejected(saved):
+    data = dict(np.load(saved))
+    del data['metrics']
+    np.savez(saved, **data)
+    with pytest.raises(ValueError):
+        LossAnomalyDetector.load(saved)
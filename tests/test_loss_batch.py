@@ -0,0 +1,45 @@
+import os
+
+import pandas as pd
+import pytest
+
+from dtr_data import consumption_files
+from loss_batch import _loss_pct, _workbook_loss, daily_loss
+from reconciliation import dtr_kpis
+
+KPIS = {'master_tagged': 41, 'connected_outage': 37, 'untagged': 4, 'wrongly_mapped': 32, 'total_corrected': 69}
+
+
+def _tidy(meter_counts, dtr_kwh, consumer_kwh):
+    ts = pd.date_range('2025-06-01', periods=len(meter_counts))
+    rows = [(s, t, v, m) for t, m, d, c in zip(ts, meter_counts, dtr_kwh, consumer_kwh)
+            for s, v in (('dlp_dtr', d), ('dlp_consumer', c))]
+    return pd.DataFrame(rows, columns=['series', 'ts', 'value', 'meter_count'])
+
+
+def test_scales_against_the_reported_population():
+    daily = daily_loss('7088-32', _tidy([60, 30], [1000.0, 500.0], [800.0, 400.0]), KPIS)
+
+    assert daily['corrected_meter_count'].tolist() == [69.0, 34.5]
+    assert daily['corrected_consumer_kwh'].tolist() == pytest.approx([920.0, 460.0])
+    assert daily['corrected_loss_pct'].tolist() == pytest.approx([8.0, 8.0])
+
+
+def test_sheet_of_the_corrected_population_is_unchanged():
+    daily = daily_loss('7088-32', _tidy([69, 40], [1000.0, 500.0], [800.0, 400.0]), KPIS)
+
+    assert daily['corrected_loss_pct'].tolist() == pytest.approx(daily['loss_pct'].tolist())
+
+
+@pytest.mark.parametrize('key', sorted(consumption_files))
+def test_real_workbooks(key):
+    if not os.path.exists(consumption_files[key]):
+        pytest.skip(f"{consumption_files[key]} not present")
+    key, daily, error = _workbook_loss((key, consumption_files[key]))
+    assert error is None
+    total = dtr_kpis(key)['total_corrected']
+
+    assert (daily['corrected_meter_count'].dropna() <= total + 1e-9).all()
+    assert daily['corrected_loss_pct'].dropna().between(-50, 60).all()
+    raw = _loss_pct(daily['dtr_kwh'], daily['consumer_kwh'])  # the sheet's %Loss_DLP column can be shifted
+    assert (daily['corrected_loss_pct'] - raw).abs().max() < 5
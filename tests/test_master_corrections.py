@@ -0,0 +1,81 @@
+import os
+
+import pandas as pd
+import pytest
+
+import dtr_data
+import master_corrections
+from master_corrections import CorrectionLog
+
+MASTER = pd.DataFrame({
+    'Feedercode': [7088] * 4,
+    'dtrcode': [57, 57, 32, 32],
+    'MeterLookup_TblRefID': [1, 2, 3, 4],
+    'Meter_Serial_Number': ['EZ1', 'EZ2', 'EZ3', 'EZ4'],
+})
+
+
+@pytest.fixture
+def log(tmp_path, monkeypatch):
+    monkeypatch.setattr(dtr_data, 'CORRECTIONS_ROOT', str(tmp_path / 'default_root'))
+    monkeypatch.setattr(master_corrections, 'read_master', lambda feeder: MASTER)
+    monkeypatch.setattr(master_corrections, 'invalidate', lambda keys: None)
+    return CorrectionLog('7088', root=str(tmp_path / 'custom'))
+
+
+def test_record_writes_markers_under_its_own_root(log, tmp_path):
+    log.record(1, 32, who='test')
+
+    assert sorted(os.listdir(os.path.join(log.dir, 'touched'))) == ['32', '57']
+    assert not os.path.exists(tmp_path / 'default_root')
+    assert not os.path.exists(log.lock_path)
+
+
+def test_compact_keeps_the_previous_base(log):
+    bases = []
+    for meter, new_dtr in ((1, 32), (3, 57), (2, 32)):
+        log.record(meter, new_dtr, who='test')
+        bases.append(log.compact()['path'])
+
+    assert not os.path.exists(bases[0])
+    assert os.path.exists(bases[1]) and os.path.exists(bases[2])
+    assert log.effective()['dtrcode'].tolist() == [32, 32, 57, 32]
+
+
+def test_second_writer_waits_for_the_lock(log):
+    with log._locked():
+        with pytest.raises(TimeoutError):
+            with log._locked(timeout=0.1):
+                pass
+    with log._locked(timeout=0.1):
+        pass
+
+
+def test_validation_sees_the_latest_remap(log):
+    log.record(1, 32, who='a')
+    with pytest.raises(ValueError, match='already tagged'):
+        log.record(1, 32, who='b')
+    with pytest.raises(ValueError, match='tagged to DTR 32, not 57'):
+        log.record(1, 57, who='b', old_dtr=57)
+
+
+def test_compaction_rotates_the_log(log):
+    log.record(1, 32, who='test')
+    log.record(3, 57, who='test')
+    log.compact()
+    entry = log.record(2, 32, who='test')
+
+    assert entry['seq'] == 3
+    assert [e['seq'] for e in log.entries()] == [3]
+    assert [e['seq'] for e in log.history()] == [1, 2, 3]
+    assert log.effective()['dtrcode'].tolist() == [32, 32, 57, 32]
+
+
+def test_record_compacts_every_n_entries(log, monkeypatch):
+    monkeypatch.setattr(master_corrections, 'COMPACT_EVERY', 2)
+    log.record(1, 32, who='test')
+    log.record(3, 57, who='test')
+
+    assert log.base_meta()['applied_seq'] == 2
+    assert log.entries() == []
+    assert log.effective()['dtrcode'].tolist() == [32, 57, 57, 32]
@@ -0,0 +1,25 @@
+import pandas as pd
+
+from master_diff import diff_masters
+
+
+def _master(rows, columns=('Feedercode', 'dtrcode', 'Meter_Serial_Number', 'meterphase_name')):
+    return pd.DataFrame(rows, columns=list(columns))
+
+
+def test_phase_only_change_counts_once():
+    old = _master([(7088, 57, 'EZ1', '1 PH'), (7088, 57, 'EZ2', '1 PH'), (7088, 32, 'EZ3', '1 PH')])
+    new = _master([(7088, 57, 'EZ1', '3PH WC'), (7088, 32, 'EZ2', '1 PH'), (7088, 32, 'EZ3', '1 PH')])
+    diff = diff_masters(old, new)
+
+    inv = diff['invalidated'].set_index('dtrcode')
+    assert inv.loc[57, 'changed'] == 2  # EZ1 (phase) and EZ2 (left)
+    assert inv.loc[32, 'changed'] == 1  # EZ2 (joined)
+
+
+def test_master_without_feedercode():
+    old = _master([(57, 'EZ1'), (57, 'EZ2')], columns=('dtrcode', 'Meter_Serial_Number'))
+    new = _master([(57, 'EZ1'), (32, 'EZ3')], columns=('dtrcode', 'Meter_Serial_Number'))
+    diff = diff_masters(old, new)
+
+    assert diff['invalidated'][['dtrcode', 'added', 'retired']].values.tolist() == [[32, 1, 0], [57, 0, 1]]
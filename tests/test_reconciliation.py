@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import reconciliation
+from reconciliation import BACKENDS, Reconciliation, _reference, reconcile, reconcile_ids, rows_in
+
+ALL_BACKENDS = [
+    'numpy',
+    'pandas',
+    pytest.param('duckdb', marks=pytest.mark.skipif('duckdb' not in BACKENDS, reason="duckdb not installed")),
+]
+
+
+def _master(rows):
+    return pd.DataFrame(rows, columns=['Feedercode', 'dtrcode', 'MeterLookup_TblRefID', 'Meter_Serial_Number'])
+
+
+MASTER = _master([
+    (7088, 57, 1, ' ez0001'),
+    (7088, 57, 2, 'EZ0002'),
+    (7088, 57, 3, 'EZ0003'),
+    (7088, 32, 4, 'EZ0004'),
+    (7088, 32, 5, 'EZ0005'),
+    (9999, 57, 6, 'EZ0006'),  # same DTR code on another feeder
+])
+
+
+@pytest.mark.parametrize('backend', ALL_BACKENDS)
+def test_backends_match_reference(backend):
+    rng = np.random.default_rng(1)
+    for _ in range(50):
+        feeder_all = rng.integers(0, 200, int(rng.integers(0, 120)))
+        tagged = rng.choice(feeder_all, int(rng.integers(0, len(feeder_all) + 1))) if len(feeder_all) else feeder_all
+        seen = np.concatenate([tagged[: len(tagged) // 2], rng.integers(0, 400, int(rng.integers(0, 40)))])
+        expected = Reconciliation('ref', 'reference', _reference(tagged, feeder_all, seen))
+        assert reconcile_ids(tagged, feeder_all, seen, 'synthetic', backend).same_sets(expected)
+
+
+def test_ids_drop_nan_and_negative():
+    result = reconcile_ids([1, 2, None], [1, 2, 3, -1], [2, 3, float('nan')], backend='numpy')
+    assert result.kpis() == {'master_tagged': 2, 'connected_outage': 1, 'untagged': 1,
+                             'wrongly_mapped': 1, 'total_corrected': 2}
+
+
+@pytest.mark.parametrize('backend', ALL_BACKENDS)
+def test_reconcile_filters_on_feeder(backend):
+    result = reconcile(MASTER, '7088', '57', [2, 4, 6, 7], backend=backend)
+
+    assert result.tagged.tolist() == [1, 2, 3]
+    assert result.connected.tolist() == [2]
+    assert result.untagged.tolist() == [1, 3]
+    assert result.wrongly_mapped.tolist() == [4]
+    assert result.not_in_feeder.tolist() == [6, 7]  # 6 is DTR 57 of feeder 9999
+    assert result.other_dtrs.tolist() == [4, 5]
+
+
+def test_serial_keys_match_id_keys():
+    by_id = reconcile(MASTER, '7088', '57', [2, 4, 6])
+    by_serial = reconcile(MASTER, '7088', '57', ['ez0002 ', 'EZ0004', 'EZ0006'], by='serial')
+
+    assert by_serial.kpis() == by_id.kpis()
+    assert sorted(by_serial.serials('untagged')) == ['EZ0001', 'EZ0003']
+    assert by_serial.serials('not_in_feeder').tolist() == ['EZ0006']
+
+
+def test_rows_in_selects_by_id_and_serial():
+    by_id = reconcile(MASTER, '7088', '57', [2, 4])
+    assert rows_in(MASTER, by_id, 'untagged')['MeterLookup_TblRefID'].tolist() == [1, 3]
+
+    by_serial = reconcile(MASTER, '7088', '57', ['EZ0002', 'EZ0004'], by='serial')
+    assert rows_in(MASTER, by_serial, 'untagged', 'wrongly_mapped')['MeterLookup_TblRefID'].tolist() == [1, 3, 4]
+
+
+def test_unknown_backend_and_key_type_raise():
+    with pytest.raises(ValueError):
+        reconcile_ids([1], [1], [1], backend='sqlite')
+    with pytest.raises(ValueError):
+        reconcile(MASTER, '7088', '57', [1], by='msn')
+
+
+def test_auto_backend_by_size(monkeypatch):
+    assert reconciliation.choose_backend(reconciliation.PANDAS_MIN_ROWS - 1) == 'numpy'
+    assert reconciliation.choose_backend(reconciliation.PANDAS_MIN_ROWS) == 'pandas'
+    monkeypatch.setitem(BACKENDS, 'duckdb', BACKENDS['numpy'])
+    assert reconciliation.choose_backend(reconciliation.DUCKDB_MIN_ROWS) == 'duckdb'
@@ -0,0 +1,58 @@
+import os
+
+import pandas as pd
+import pytest
+
+from snapshot_history import STATUS_CODE, SnapshotHistory
+
+CONNECTED, UNTAGGED = STATUS_CODE['connected'], STATUS_CODE['untagged']
+
+
+def _snapshot(**status):
+    return pd.DataFrame({'meter': list(status), 'status': pd.Series(list(status.values()), dtype='int8')})
+
+
+@pytest.fixture
+def history(tmp_path):
+    return SnapshotHistory(str(tmp_path / 'history'))
+
+
+def test_runs_extend_close_and_reopen(history):
+    history.ingest('2025-06-01', {'7088-57': _snapshot(EZ1=CONNECTED, EZ2=CONNECTED)})
+    counts = history.ingest('2025-06-02', {'7088-57': _snapshot(EZ1=CONNECTED, EZ2=UNTAGGED)})
+    history.ingest('2025-06-03', {'7088-57': _snapshot(EZ1=CONNECTED)})
+
+    assert counts == {'extended': 1, 'closed': 1, 'opened': 1}
+    ez1 = history.meter_timeline('ez1')
+    assert ez1[['status', 'start', 'end']].values.tolist() == [
+        ['connected', pd.Timestamp('2025-06-01'), pd.Timestamp('2025-06-03')]]
+    ez2 = history.meter_timeline('EZ2')
+    assert ez2[['status', 'start', 'end']].values.tolist() == [
+        ['connected', pd.Timestamp('2025-06-01'), pd.Timestamp('2025-06-01')],
+        ['untagged', pd.Timestamp('2025-06-02'), pd.Timestamp('2025-06-02')]]
+    assert history.open_runs()['meter'].tolist() == ['EZ1']
+
+
+def test_reingesting_a_date_is_rejected(history):
+    history.ingest('2025-06-02', {'7088-57': _snapshot(EZ1=CONNECTED)})
+    with pytest.raises(ValueError, match='already ingested'):
+        history.ingest('2025-06-02', {'7088-57': _snapshot(EZ1=UNTAGGED)})
+    with pytest.raises(ValueError, match='already ingested'):
+        history.ingest('2025-06-01', {'7088-57': _snapshot(EZ1=UNTAGGED)})
+    with pytest.raises(ValueError, match='required'):
+        history.ingest(None, {'7088-57': _snapshot(EZ1=UNTAGGED)})
+
+    assert history.open_runs()['status'].tolist() == [CONNECTED]
+    assert history.dtr_trend('7088-57')['connected'].tolist() == [1]
+
+
+def test_ingest_rewrites_only_its_dtrs_open_runs(history):
+    history.ingest('2025-06-01', {'7088-57': _snapshot(EZ1=CONNECTED), '7088-32': _snapshot(EZ9=UNTAGGED)})
+    other = history._open_path('7088-32')
+    before = os.stat(other).st_mtime_ns
+    history.ingest('2025-06-02', {'7088-57': _snapshot(EZ1=UNTAGGED)})
+
+    assert os.stat(other).st_mtime_ns == before
+    assert history.open_runs(['7088-32'])[['meter', 'end']].values.tolist() == [['EZ9', pd.Timestamp('2025-06-01')]]
+    assert history.open_runs(['7088-57'])[['meter', 'status']].values.tolist() == [['EZ1', UNTAGGED]]
+    assert history.last_dates() == {'7088-57': pd.Timestamp('2025-06-02'), '7088-32': pd.Timestamp('2025-06-01')}